@@ -0,0 +1,89 @@
+"""
+Módulo arvore_caminhos.py
+Árvore de menores caminhos de uma origem, para consultas a muitos destinos
+"""
+
+
+class ArvoreCaminhos:
+    """Distâncias e predecessores de todos os vértices a partir de uma origem"""
+
+    def __init__(self, dijkstra, origem_id, distancias, predecessores, indices=None, ids=None):
+        """
+        Inicializa a árvore com o resultado de uma busca completa
+
+        Args:
+            dijkstra: objeto Dijkstra que calculou a árvore (usado nos detalhes)
+            origem_id: id do vértice de origem
+            distancias: distância de cada vértice (infinito se inalcançável)
+            predecessores: predecessor de cada vértice no menor caminho
+            indices: dicionário id -> posição, quando distancias e predecessores
+                são listas indexadas por inteiros (GrafoCSR, com -1 = nenhum);
+                se None, ambos são dicionários indexados por id (None = nenhum)
+            ids: lista posição -> id (obrigatória junto com indices)
+        """
+        self.dijkstra = dijkstra
+        self.origem_id = origem_id
+        self.distancias = distancias
+        self.predecessores = predecessores
+        self.indices = indices
+        self.ids = ids
+        # Versão dos pesos usada no cálculo; a árvore expira quando ela muda
+        self.versao = dijkstra.grafo.versao
+
+    def distancia(self, destino_id):
+        """
+        Retorna o custo do menor caminho até um destino
+
+        Args:
+            destino_id: id do vértice de destino
+
+        Returns:
+            custo total ou None se o destino não for alcançável
+        """
+        if self.indices is None:
+            distancia = self.distancias.get(destino_id)
+        else:
+            posicao = self.indices.get(destino_id)
+            distancia = None if posicao is None else self.distancias[posicao]
+        if distancia is None or distancia == float('infinity'):
+            return None
+        return distancia
+
+    def caminho_para(self, destino_id):
+        """
+        Extrai a rota até um destino, em tempo proporcional ao caminho
+
+        Args:
+            destino_id: id do vértice de destino
+
+        Returns:
+            tupla (caminho, custo_total, detalhes), como
+            Dijkstra.calcular_menor_caminho
+        """
+        custo_total = self.distancia(destino_id)
+        if custo_total is None:
+            return None, None, None
+
+        if self.indices is None:
+            caminho = self.dijkstra._reconstruir_caminho(self.predecessores, self.origem_id, destino_id)
+        else:
+            caminho = []
+            atual = self.indices[destino_id]
+            while atual != -1:
+                caminho.append(self.ids[atual])
+                atual = self.predecessores[atual]
+            caminho.reverse()
+
+        return caminho, custo_total, self.dijkstra._obter_detalhes_caminho(caminho)
+
+    def caminhos_para(self, destinos):
+        """
+        Extrai as rotas para vários destinos
+
+        Args:
+            destinos: lista de ids de destino
+
+        Returns:
+            dicionário destino_id -> (caminho, custo_total, detalhes)
+        """
+        return {destino_id: self.caminho_para(destino_id) for destino_id in destinos}
@@ -0,0 +1,251 @@
+"""
+Módulo banco_sqlite.py
+Armazenamento do grafo e dos pesos atuais em um banco SQLite local
+
+Alternativa aos arquivos JSON para cidades grandes: vértices e arestas
+dirigidas ficam em tabelas indexadas, cada mudança de peso é um UPDATE de
+uma linha (agrupado em transações) e é possível carregar só a parte do mapa
+dentro de um retângulo de coordenadas, sem ler a cidade inteira.
+
+As colunas de id, coordenadas e peso não têm tipo declarado, para o SQLite
+guardar os valores como vieram (inteiros continuam inteiros, textos
+continuam textos). Peso NULL significa aresta sem peso salvo ainda.
+"""
+
+import sqlite3
+
+from grafo import Vertice, Grafo
+from grafo_csr import GrafoCSR
+
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS vertices (
+    id PRIMARY KEY,
+    nome TEXT NOT NULL,
+    x NOT NULL,
+    y NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vertices_xy ON vertices (x, y);
+CREATE TABLE IF NOT EXISTS arestas (
+    origem NOT NULL,
+    destino NOT NULL,
+    peso,
+    motivo TEXT,
+    PRIMARY KEY (origem, destino)
+) WITHOUT ROWID;
+"""
+
+
+class BancoSQLite:
+    """Vértices, arestas e pesos atuais em um arquivo SQLite"""
+
+    # Mudanças de peso acumuladas antes de gravar uma transação
+    TAMANHO_LOTE = 256
+
+    def __init__(self, arquivo, tamanho_lote=None):
+        """
+        Abre (ou cria) o banco
+
+        Args:
+            arquivo: caminho do arquivo do banco
+            tamanho_lote: mudanças de peso por transação (None = TAMANHO_LOTE;
+                1 = grava cada mudança na hora)
+        """
+        self.arquivo = arquivo
+        self.tamanho_lote = tamanho_lote or self.TAMANHO_LOTE
+        # O servidor de rotas grava pelas threads das requisições, uma de
+        # cada vez (sob a trava de escrita do ServicoRotas)
+        self.conexao = sqlite3.connect(arquivo, check_same_thread=False)
+        # WAL: leitores não bloqueiam a escrita e cada transação custa pouco
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(_ESQUEMA)
+        # Mudanças de peso ainda não gravadas: (peso, motivo, origem, destino)
+        self._pendentes = []
+
+    def tem_grafo(self):
+        """Indica se já há vértices salvos"""
+        return self.conexao.execute("SELECT 1 FROM vertices LIMIT 1").fetchone() is not None
+
+    def salvar_grafo_estrutura(self, grafo):
+        """
+        Grava vértices e arestas, em uma única transação
+
+        Arestas que já existiam mantêm o peso salvo; arestas novas ficam sem
+        peso até o próximo salvar_pesos_atuais; as que sumiram do grafo são
+        apagadas.
+
+        Args:
+            grafo: objeto Grafo a ser salvo
+        """
+        self.confirmar()
+        with self.conexao:
+            self.conexao.execute("DELETE FROM vertices")
+            self.conexao.executemany(
+                "INSERT INTO vertices (id, nome, x, y) VALUES (?, ?, ?, ?)",
+                ((v.id, v.nome, v.x, v.y) for v in grafo.vertices.values())
+            )
+            self.conexao.execute("CREATE TEMP TABLE arestas_atuais (origem, destino, PRIMARY KEY (origem, destino)) WITHOUT ROWID")
+            try:
+                self.conexao.executemany(
+                    "INSERT OR IGNORE INTO arestas_atuais (origem, destino) VALUES (?, ?)",
+                    ((origem_id, vizinho['destino'])
+                     for origem_id, vizinhos in grafo.adjacencias.items() for vizinho in vizinhos)
+                )
+                self.conexao.execute(
+                    "DELETE FROM arestas WHERE NOT EXISTS (SELECT 1 FROM arestas_atuais t "
+                    "WHERE t.origem = arestas.origem AND t.destino = arestas.destino)"
+                )
+                self.conexao.execute("INSERT OR IGNORE INTO arestas (origem, destino) SELECT origem, destino FROM arestas_atuais")
+            finally:
+                self.conexao.execute("DROP TABLE arestas_atuais")
+
+    def carregar_grafo_estrutura(self):
+        """
+        Monta o grafo com todos os vértices e arestas (pesos padrão)
+
+        Returns:
+            objeto Grafo ou None se o banco estiver vazio
+        """
+        if not self.tem_grafo():
+            return None
+        grafo = Grafo()
+        for v_id, nome, x, y in self.conexao.execute("SELECT id, nome, x, y FROM vertices"):
+            grafo.adicionar_vertice(Vertice(v_id, nome, x, y))
+        for origem_id, destino_id in self.conexao.execute("SELECT origem, destino FROM arestas"):
+            grafo.adicionar_aresta(origem_id, destino_id, peso=1, motivo="Condição normal", bidirecional=False)
+        return grafo
+
+    def salvar_pesos_atuais(self, grafo):
+        """
+        Grava o peso e o motivo de todas as arestas, em uma única transação
+
+        Args:
+            grafo: objeto Grafo com os pesos atuais
+        """
+        self._pendentes.clear()
+        with self.conexao:
+            self.conexao.executemany(
+                "UPDATE arestas SET peso = ?, motivo = ? WHERE origem = ? AND destino = ?",
+                ((vizinho['peso'], vizinho['motivo'], origem_id, vizinho['destino'])
+                 for origem_id, vizinhos in grafo.adjacencias.items() for vizinho in vizinhos)
+            )
+
+    def carregar_pesos_atuais(self, grafo):
+        """
+        Aplica ao grafo os pesos salvos
+
+        Args:
+            grafo: objeto Grafo a ter seus pesos atualizados
+
+        Returns:
+            True se havia pesos salvos, False caso contrário
+        """
+        self.confirmar()
+        carregou = False
+        for origem_id, destino_id, peso, motivo in self.conexao.execute(
+                "SELECT origem, destino, peso, motivo FROM arestas WHERE peso IS NOT NULL"):
+            grafo.atualizar_peso(origem_id, destino_id, peso, motivo, bidirecional=False)
+            carregou = True
+        return carregou
+
+    def registrar_peso(self, origem_id, destino_id, novo_peso, novo_motivo, bidirecional=True):
+        """
+        Agenda a gravação de uma mudança de peso
+
+        As mudanças são gravadas juntas, numa transação, a cada tamanho_lote
+        mudanças ou em confirmar().
+
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            novo_peso: novo peso da aresta
+            novo_motivo: novo motivo do peso
+            bidirecional: se True, vale também para destino -> origem
+        """
+        self._pendentes.append((novo_peso, novo_motivo, origem_id, destino_id))
+        if bidirecional:
+            self._pendentes.append((novo_peso, novo_motivo, destino_id, origem_id))
+        if len(self._pendentes) >= self.tamanho_lote:
+            self.confirmar()
+
+    def confirmar(self):
+        """Grava as mudanças de peso pendentes"""
+        if not self._pendentes:
+            return
+        with self.conexao:
+            self.conexao.executemany(
+                "UPDATE arestas SET peso = ?, motivo = ? WHERE origem = ? AND destino = ?",
+                self._pendentes
+            )
+        self._pendentes.clear()
+
+    def carregar_subgrafo(self, x_min, y_min, x_max, y_max):
+        """
+        Carrega só os vértices dentro de um retângulo e as arestas entre eles
+
+        Usa o índice de coordenadas: o custo depende do tamanho da região,
+        não da cidade.
+
+        Args:
+            x_min, y_min, x_max, y_max: limites do retângulo (inclusivos)
+
+        Returns:
+            objeto Grafo com os pesos salvos (peso padrão onde não houver)
+        """
+        self.confirmar()
+        grafo = Grafo()
+        for v_id, nome, x, y in self.conexao.execute(
+                "SELECT id, nome, x, y FROM vertices WHERE x BETWEEN ? AND ? AND y BETWEEN ? AND ?",
+                (x_min, x_max, y_min, y_max)):
+            grafo.adicionar_vertice(Vertice(v_id, nome, x, y))
+        for origem_id, destino_id, peso, motivo in self.conexao.execute(
+                "SELECT a.origem, a.destino, a.peso, a.motivo FROM vertices v "
+                "JOIN arestas a ON a.origem = v.id "
+                "JOIN vertices w ON w.id = a.destino "
+                "WHERE v.x BETWEEN ? AND ? AND v.y BETWEEN ? AND ? "
+                "AND w.x BETWEEN ? AND ? AND w.y BETWEEN ? AND ?",
+                (x_min, x_max, y_min, y_max) * 2):
+            if peso is None:
+                peso, motivo = 1, "Condição normal"
+            grafo.adicionar_aresta(origem_id, destino_id, peso=peso, motivo=motivo, bidirecional=False)
+        return grafo
+
+    def carregar_csr(self):
+        """
+        Monta a representação compacta direto das tabelas
+
+        Returns:
+            objeto GrafoCSR ou None se o banco estiver vazio
+        """
+        if not self.tem_grafo():
+            return None
+        self.confirmar()
+        ids = []
+        nomes = []
+        xs = []
+        ys = []
+        for v_id, nome, x, y in self.conexao.execute("SELECT id, nome, x, y FROM vertices"):
+            ids.append(v_id)
+            nomes.append(nome)
+            xs.append(x)
+            ys.append(y)
+        indices = {v_id: i for i, v_id in enumerate(ids)}
+
+        motivos = ["Condição normal"]
+        codigos = {"Condição normal": 0}
+        arestas = []
+        for origem_id, destino_id, peso, motivo in self.conexao.execute(
+                "SELECT origem, destino, peso, motivo FROM arestas"):
+            if peso is None:
+                peso, motivo = 1, "Condição normal"
+            if motivo not in codigos:
+                codigos[motivo] = len(motivos)
+                motivos.append(motivo)
+            arestas.append((indices[origem_id], indices[destino_id], peso, codigos[motivo]))
+        return GrafoCSR._montar(ids, nomes, xs, ys, arestas, motivos)
+
+    def fechar(self):
+        """Grava o que estiver pendente e fecha a conexão"""
+        self.confirmar()
+        self.conexao.close()
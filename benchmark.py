@@ -0,0 +1,409 @@
+"""
+Módulo benchmark.py
+Medição de desempenho sobre cidades sintéticas de vários tamanhos
+
+Para cada tamanho, gera uma cidade em grade (gerador_cidade) e mede:
+rotas do Dijkstra entre pares sorteados (latência p50/p99 e consultas por
+segundo), GeradorPesos.gerar_pesos_para_grafo, salvar/carregar do
+SistemaPersistencia (JSON e binário), SimulacaoRotas com 10 mil cenários
+(cenários por segundo) e VisualizadorMapa.desenhar_mapa sem janela (backend
+Agg). Cada tamanho roda num processo novo, para o pico de memória (RSS) de
+um não contaminar o do outro.
+
+O resultado é um JSON; passando um resultado anterior como referência, as
+etapas que pioraram além do limite são listadas e o código de saída é 1.
+
+Uso:
+    python benchmark.py [--tamanhos 1000 10000 100000] [--cenarios 10000]
+                        [--saida resultado.json] [--referencia base.json]
+                        [--limite 0.2]
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from dijkstra import Dijkstra
+from gerador_cidade import gerar_cidade
+from gerador_pesos import GeradorPesos
+from persistencia import SistemaPersistencia
+from simulacao_rotas import SimulacaoRotas
+
+
+VERSAO_RELATORIO = 1
+TAMANHOS = (1000, 10000, 100000)
+# Acima disto o desenho (um artista do matplotlib por aresta) não é medido
+LIMITE_DESENHO = 2000
+# Cenários da simulação e maior cidade em que ela é medida (cada cenário
+# resolve todas as origens no próprio processo)
+CENARIOS = 10000
+LIMITE_SIMULACAO = 2000
+# Piora relativa a partir da qual uma métrica conta como regressão
+LIMITE_REGRESSAO = 0.2
+# Tempos abaixo disto (nas duas medições) são ruído e não são comparados
+MINIMO_SEGUNDOS = 0.005
+
+# Métricas em que maior é pior e em que maior é melhor
+METRICAS_CUSTO = ('segundos', 'p50_ms', 'p99_ms', 'pico_memoria_mb')
+METRICAS_VAZAO = ('consultas_por_segundo', 'cenarios_por_segundo')
+
+
+def _pico_memoria_mb():
+    """Maior memória residente do processo até agora, em MB (None se indisponível)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _medir(funcao):
+    """
+    Executa funcao uma vez e mede o tempo
+
+    Returns:
+        tupla (retorno de funcao, dicionário com segundos e pico_memoria_mb)
+    """
+    inicio = time.perf_counter()
+    retorno = funcao()
+    segundos = time.perf_counter() - inicio
+    return retorno, {'segundos': round(segundos, 6), 'pico_memoria_mb': _pico_memoria_mb()}
+
+
+def dimensoes_grade(vertices):
+    """
+    Linhas e colunas da grade mais quadrada com pelo menos tantos vértices
+
+    Returns:
+        tupla (linhas, colunas)
+    """
+    linhas = max(1, round(math.sqrt(vertices)))
+    return linhas, max(1, math.ceil(vertices / linhas))
+
+
+def _medir_rotas(grafo, ids, consultas, semente):
+    """
+    Mede calcular_menor_caminho entre pares sorteados de vértices
+
+    Returns:
+        dicionário com consultas, encontradas, p50_ms, p99_ms,
+        consultas_por_segundo, segundos e pico_memoria_mb
+    """
+    sorteio = random.Random(semente)
+    pares = [(sorteio.choice(ids), sorteio.choice(ids)) for _ in range(consultas)]
+    dijkstra = Dijkstra(grafo)
+
+    latencias = []
+    encontradas = 0
+    inicio = time.perf_counter()
+    for origem_id, destino_id in pares:
+        antes = time.perf_counter()
+        caminho, _, _ = dijkstra.calcular_menor_caminho(origem_id, destino_id)
+        latencias.append(time.perf_counter() - antes)
+        encontradas += caminho is not None
+    segundos = time.perf_counter() - inicio
+
+    p50, p99 = np.percentile(latencias, (50, 99)) * 1000
+    return {
+        'consultas': consultas,
+        'encontradas': encontradas,
+        'p50_ms': round(float(p50), 4),
+        'p99_ms': round(float(p99), 4),
+        'consultas_por_segundo': round(consultas / segundos, 2),
+        'segundos': round(segundos, 6),
+        'pico_memoria_mb': _pico_memoria_mb()
+    }
+
+
+def _medir_simulacao(csr, ids, cenarios, semente, limite_simulacao):
+    """
+    Mede SimulacaoRotas.simular com pares sorteados (duas origens, dois
+    destinos cada), num só processo para a medida não depender dos núcleos
+
+    Returns:
+        dicionário com cenarios, pares, cenarios_por_segundo, segundos e
+        pico_memoria_mb, ou com 'ignorado' e o motivo
+    """
+    if csr.num_vertices > limite_simulacao:
+        return {'ignorado': f"mais de {limite_simulacao} vértices"}
+    sorteio = random.Random(semente)
+    pares = [(origem, sorteio.choice(ids)) for origem in sorteio.sample(ids, min(2, len(ids))) for _ in range(2)]
+    simulacao = SimulacaoRotas(csr)
+    _, medidas = _medir(lambda: simulacao.simular(pares, cenarios=cenarios, semente=semente, processos=1))
+    return {
+        'cenarios': cenarios,
+        'pares': len(pares),
+        'cenarios_por_segundo': round(cenarios / medidas['segundos'], 2) if medidas['segundos'] else None,
+        **medidas
+    }
+
+
+def _medir_desenho(grafo, limite_desenho):
+    """
+    Mede VisualizadorMapa.desenhar_mapa com o backend Agg (sem janela)
+
+    Returns:
+        dicionário com segundos e pico_memoria_mb, ou com 'ignorado' e o
+        motivo quando o desenho não foi medido
+    """
+    if len(grafo.vertices) > limite_desenho:
+        return {'ignorado': f"mais de {limite_desenho} vértices"}
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from visualizador import VisualizadorMapa
+    except ImportError as erro:
+        return {'ignorado': f"matplotlib indisponível ({erro})"}
+
+    with warnings.catch_warnings():
+        # plt.show() no Agg só avisa que não há janela
+        warnings.simplefilter('ignore', UserWarning)
+        _, medidas = _medir(lambda: VisualizadorMapa(grafo).desenhar_mapa())
+    plt.close('all')
+    return medidas
+
+
+def medir_tamanho(vertices, consultas=200, semente=0, representacao='compacto', limite_desenho=LIMITE_DESENHO,
+                  cenarios=CENARIOS, limite_simulacao=LIMITE_SIMULACAO):
+    """
+    Roda todas as etapas sobre uma cidade com cerca de vertices vértices
+
+    Args:
+        vertices: tamanho aproximado da cidade
+        consultas: rotas sorteadas para o Dijkstra
+        semente: semente da cidade e dos pares
+        representacao: 'compacto' (GrafoCompacto, arrays CSR) ou 'comum'
+            (Grafo de dicionários, como carregar_grafo_estrutura devolve)
+        limite_desenho: maior cidade em que o desenho é medido
+        cenarios: cenários da simulação de rotas
+        limite_simulacao: maior cidade em que a simulação é medida
+
+    Returns:
+        dicionário etapa -> medidas (além de vertices e arestas)
+    """
+    linhas, colunas = dimensoes_grade(vertices)
+    csr, geracao = _medir(lambda: gerar_cidade(linhas, colunas, semente))
+    resultado = {'vertices': csr.num_vertices, 'arestas': csr.num_arestas, 'gerar_cidade': geracao}
+
+    if representacao == 'comum':
+        grafo, resultado['converter_grafo'] = _medir(csr.para_grafo)
+    else:
+        grafo = csr.como_grafo()
+    ids = list(csr.ids)
+
+    resultado['dijkstra'] = _medir_rotas(grafo, ids, consultas, semente)
+    resultado['simulacao'] = _medir_simulacao(csr, ids, cenarios, semente, limite_simulacao)
+    _, resultado['gerar_pesos'] = _medir(lambda: GeradorPesos.gerar_pesos_para_grafo(grafo))
+
+    with tempfile.TemporaryDirectory(prefix='benchmark_') as diretorio:
+        persistencia = SistemaPersistencia(diretorio)
+        _, resultado['salvar_json'] = _medir(lambda: persistencia.salvar_estado(grafo))
+        _, resultado['carregar_json'] = _medir(persistencia.carregar_grafo_compacto)
+        _, resultado['salvar_binario'] = _medir(lambda: persistencia.salvar_grafo_binario(grafo))
+        _, resultado['carregar_binario'] = _medir(persistencia.carregar_grafo_binario)
+        persistencia.fechar()
+
+    resultado['desenhar_mapa'] = _medir_desenho(grafo, limite_desenho)
+    return resultado
+
+
+def _maquina():
+    """Descrição do ambiente em que as medidas foram feitas"""
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__
+    }
+
+
+def executar(tamanhos=TAMANHOS, consultas=200, semente=0, representacao='compacto',
+             limite_desenho=LIMITE_DESENHO, processo_separado=True, relatar=None, cenarios=CENARIOS):
+    """
+    Mede todos os tamanhos e monta o relatório
+
+    Args:
+        tamanhos: quantidades aproximadas de vértices
+        consultas, semente, representacao, limite_desenho, cenarios: ver
+            medir_tamanho
+        processo_separado: se True, cada tamanho roda num processo novo
+            (pico de memória isolado)
+        relatar: função relatar(tamanho, resultado) chamada ao fim de cada
+            tamanho (opcional)
+
+    Returns:
+        dicionário pronto para json.dump
+    """
+    resultados = {}
+    for tamanho in tamanhos:
+        argumentos = (tamanho, consultas, semente, representacao, limite_desenho, cenarios)
+        if processo_separado:
+            # 'spawn': o processo começa limpo, sem herdar a memória deste
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                resultado = executor.submit(medir_tamanho, *argumentos).result()
+        else:
+            resultado = medir_tamanho(*argumentos)
+        resultados[str(tamanho)] = resultado
+        if relatar is not None:
+            relatar(tamanho, resultado)
+
+    return {
+        'versao': VERSAO_RELATORIO,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'maquina': _maquina(),
+        'parametros': {
+            'consultas': consultas,
+            'semente': semente,
+            'representacao': representacao,
+            'limite_desenho': limite_desenho,
+            'cenarios': cenarios
+        },
+        'resultados': resultados
+    }
+
+
+def comparar(atual, referencia, limite=LIMITE_REGRESSAO):
+    """
+    Compara dois relatórios e lista as métricas que pioraram
+
+    Só entram tamanhos e etapas presentes nos dois. Para tempos e memória,
+    piora = atual / referência - 1; para consultas por segundo, o inverso.
+
+    Args:
+        atual: relatório de executar()
+        referencia: relatório anterior (a base)
+        limite: piora relativa tolerada (0.2 = 20%)
+
+    Returns:
+        lista de dicionários com tamanho, etapa, metrica, referencia,
+        atual e piora (ordenada da maior piora para a menor)
+    """
+    regressoes = []
+    for tamanho, etapas in atual['resultados'].items():
+        base = referencia.get('resultados', {}).get(tamanho)
+        if base is None:
+            continue
+        for etapa, medidas in etapas.items():
+            anteriores = base.get(etapa)
+            if not isinstance(medidas, dict) or not isinstance(anteriores, dict):
+                continue
+            for metrica in METRICAS_CUSTO + METRICAS_VAZAO:
+                valor = medidas.get(metrica)
+                anterior = anteriores.get(metrica)
+                if not valor or not anterior:
+                    continue
+                if metrica == 'segundos' and max(valor, anterior) < MINIMO_SEGUNDOS:
+                    continue
+                if metrica in METRICAS_VAZAO:
+                    piora = anterior / valor - 1
+                else:
+                    piora = valor / anterior - 1
+                if piora > limite:
+                    regressoes.append({
+                        'tamanho': tamanho,
+                        'etapa': etapa,
+                        'metrica': metrica,
+                        'referencia': anterior,
+                        'atual': valor,
+                        'piora': round(piora, 4)
+                    })
+    regressoes.sort(key=lambda r: r['piora'], reverse=True)
+    return regressoes
+
+
+def _resumir(tamanho, resultado):
+    """Imprime uma linha por etapa de um tamanho (em stderr)"""
+    print(f"\n== {tamanho} vértices ({resultado['vertices']} gerados, {resultado['arestas']} arestas) ==", file=sys.stderr)
+    for etapa, medidas in resultado.items():
+        if not isinstance(medidas, dict):
+            continue
+        if 'ignorado' in medidas:
+            print(f"  {etapa:<18} ignorado: {medidas['ignorado']}", file=sys.stderr)
+            continue
+        linha = f"  {etapa:<18} {medidas['segundos']:>10.3f}s  pico {medidas['pico_memoria_mb']} MB"
+        if 'p50_ms' in medidas:
+            linha += (f"  p50 {medidas['p50_ms']:.2f} ms  p99 {medidas['p99_ms']:.2f} ms"
+                      f"  {medidas['consultas_por_segundo']:.1f} consultas/s")
+        if medidas.get('cenarios_por_segundo'):
+            linha += f"  {medidas['cenarios_por_segundo']:.1f} cenários/s"
+        print(linha, file=sys.stderr)
+
+
+def main(argumentos=None):
+    """
+    Executa o benchmark pela linha de comando
+
+    Args:
+        argumentos: lista de argumentos (None = sys.argv)
+
+    Returns:
+        código de saída (0 = sem regressões, 1 = houve regressão)
+    """
+    parser = argparse.ArgumentParser(description="Mede o desempenho do sistema em cidades sintéticas")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=list(TAMANHOS), help="vértices de cada cidade")
+    parser.add_argument('--consultas', type=int, default=200, help="rotas sorteadas por tamanho (padrão: 200)")
+    parser.add_argument('--semente', type=int, default=0, help="semente das cidades e dos pares (padrão: 0)")
+    parser.add_argument('--representacao', choices=('compacto', 'comum'), default='compacto',
+                        help="grafo medido: compacto (CSR) ou comum (dicionários)")
+    parser.add_argument('--limite-desenho', type=int, default=LIMITE_DESENHO,
+                        help=f"maior cidade em que o desenho é medido (padrão: {LIMITE_DESENHO})")
+    parser.add_argument('--cenarios', type=int, default=CENARIOS,
+                        help=f"cenários da simulação de rotas (padrão: {CENARIOS})")
+    parser.add_argument('--mesmo-processo', action='store_true', help="não isola cada tamanho num processo")
+    parser.add_argument('--saida', help="arquivo JSON do resultado (padrão: saída padrão)")
+    parser.add_argument('--referencia', help="resultado anterior a comparar")
+    parser.add_argument('--limite', type=float, default=LIMITE_REGRESSAO,
+                        help=f"piora relativa tolerada (padrão: {LIMITE_REGRESSAO})")
+    args = parser.parse_args(argumentos)
+
+    relatorio = executar(
+        args.tamanhos, args.consultas, args.semente, args.representacao,
+        args.limite_desenho, not args.mesmo_processo, _resumir, args.cenarios
+    )
+
+    if args.referencia:
+        with open(args.referencia, 'r', encoding='utf-8') as f:
+            referencia = json.load(f)
+        relatorio['referencia'] = args.referencia
+        relatorio['regressoes'] = comparar(relatorio, referencia, args.limite)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(relatorio, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+    regressoes = relatorio.get('regressoes', [])
+    if regressoes:
+        print(f"\n❌ {len(regressoes)} regressões acima de {args.limite:.0%}:", file=sys.stderr)
+        for r in regressoes:
+            print(f"  {r['tamanho']} vértices, {r['etapa']}.{r['metrica']}: "
+                  f"{r['referencia']} -> {r['atual']} (+{r['piora']:.0%})", file=sys.stderr)
+        return 1
+    if args.referencia:
+        print(f"\n✅ Nenhuma regressão acima de {args.limite:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Módulo cache_rotas.py
+Cache LRU de rotas calculadas, invalidado pelas mudanças de peso do grafo
+
+Pares muito consultados (hospital, aeroporto, estação...) deixam de refazer o
+Dijkstra e a montagem dos detalhes a cada pedido. Quando um peso sobe (ou só
+o motivo muda), apenas as rotas que passam por aquela rua são descartadas;
+quando um peso desce, qualquer rota pode ter ficado pior que uma alternativa,
+então o cache inteiro é esvaziado.
+"""
+
+from collections import OrderedDict
+
+
+class CacheRotas:
+    """Cache LRU de resultados (caminho, custo_total, detalhes)"""
+
+    def __init__(self, grafo, capacidade=1024):
+        """
+        Inicializa o cache e passa a observar as mudanças de peso do grafo
+
+        Args:
+            grafo: objeto Grafo cujas rotas serão guardadas
+            capacidade: número máximo de rotas guardadas
+        """
+        self.grafo = grafo
+        self.capacidade = capacidade
+        self.rotas = OrderedDict()  # (origem_id, destino_id) -> resultado
+        # Índice reverso: aresta (origem_id, destino_id) -> chaves das rotas que a usam
+        self.rotas_por_aresta = {}
+        # Versão do grafo com a qual o conteúdo está coerente
+        self.versao = grafo.versao
+
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+        grafo.adicionar_observador(self._peso_alterado)
+
+    def obter(self, origem_id, destino_id):
+        """
+        Procura uma rota no cache
+
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+
+        Returns:
+            resultado guardado ou None se não estiver no cache
+        """
+        # Mudanças que não passaram pelos observadores (ex.: novas arestas)
+        if self.versao != self.grafo.versao:
+            self.limpar()
+
+        chave = (origem_id, destino_id)
+        resultado = self.rotas.get(chave)
+        if resultado is None:
+            self.falhas += 1
+            return None
+
+        self.rotas.move_to_end(chave)
+        self.acertos += 1
+        return resultado
+
+    def guardar(self, origem_id, destino_id, resultado):
+        """
+        Guarda uma rota, descartando a menos usada se o cache estiver cheio
+
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            resultado: tupla (caminho, custo_total, detalhes)
+        """
+        if self.capacidade <= 0:
+            return
+        if self.versao != self.grafo.versao:
+            self.limpar()
+
+        chave = (origem_id, destino_id)
+        if chave in self.rotas:
+            self._remover(chave)
+        self.rotas[chave] = resultado
+        for aresta in self._arestas_da_rota(resultado[0]):
+            self.rotas_por_aresta.setdefault(aresta, set()).add(chave)
+
+        while len(self.rotas) > self.capacidade:
+            self._remover(next(iter(self.rotas)))
+
+    def limpar(self):
+        """Descarta todas as rotas guardadas"""
+        if self.rotas:
+            self.invalidacoes += len(self.rotas)
+        self.rotas.clear()
+        self.rotas_por_aresta.clear()
+        self.versao = self.grafo.versao
+
+    def fechar(self):
+        """Deixa de observar o grafo e descarta todas as rotas guardadas"""
+        self.grafo.remover_observador(self._peso_alterado)
+        self.limpar()
+
+    def estatisticas(self):
+        """
+        Retorna os contadores do cache
+
+        Returns:
+            dicionário com acertos, falhas, taxa de acerto, invalidações e tamanho
+        """
+        consultas = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            'invalidacoes': self.invalidacoes,
+            'tamanho': len(self.rotas)
+        }
+
+    @staticmethod
+    def _arestas_da_rota(caminho):
+        """Lista as arestas dirigidas de um caminho (vazio se não houver caminho)"""
+        if not caminho:
+            return []
+        return list(zip(caminho, caminho[1:]))
+
+    def _remover(self, chave):
+        """Remove uma rota e suas entradas no índice reverso"""
+        resultado = self.rotas.pop(chave)
+        for aresta in self._arestas_da_rota(resultado[0]):
+            chaves = self.rotas_por_aresta.get(aresta)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self.rotas_por_aresta[aresta]
+
+    def _peso_alterado(self, origem_id, destino_id, peso_antigo, novo_peso):
+        """Observador do grafo: invalida o que a mudança pode ter afetado"""
+        # Só as mudanças acompanhadas aqui mantêm o cache válido
+        versao_anterior_coerente = self.versao == self.grafo.versao - 1
+        if not versao_anterior_coerente and self.versao != self.grafo.versao:
+            self.limpar()
+            return
+
+        if novo_peso < peso_antigo:
+            # Um atalho mais barato pode melhorar qualquer rota
+            self.limpar()
+            return
+
+        for chave in list(self.rotas_por_aresta.get((origem_id, destino_id), ())):
+            self._remover(chave)
+            self.invalidacoes += 1
+        self.versao = self.grafo.versao
@@ -0,0 +1,179 @@
+"""
+Módulo caminhos_dinamicos.py
+Manutenção incremental dos menores caminhos de origens acompanhadas
+
+Quando uma rua muda de condição, só os vértices cujo menor caminho passa por
+ela (ou que passam a ganhar com ela) precisam ser revistos. Seguindo a ideia
+de Ramalingam e Reps, cada mudança de peso notificada pelo grafo repara
+apenas a parte afetada da árvore de cada origem:
+
+- peso subiu numa aresta da árvore: a subárvore abaixo dela é desligada e
+  religada pelos antecessores que ficaram de fora, com um Dijkstra restrito;
+- peso desceu: o destino da aresta é relaxado e a melhora se propaga;
+- peso subiu fora da árvore: nada muda.
+"""
+
+import heapq
+
+from arvore_caminhos import ArvoreCaminhos
+from dijkstra import Dijkstra
+
+
+class CaminhosDinamicos:
+    """Distâncias e predecessores de origens acompanhadas, sempre atualizados"""
+
+    def __init__(self, grafo):
+        """
+        Inicializa sem origens e passa a observar as mudanças de peso do grafo
+
+        Args:
+            grafo: objeto Grafo (ou GrafoCompacto)
+        """
+        self.dijkstra = Dijkstra(grafo)
+        self.grafo = self.dijkstra.grafo
+        # origem_id -> (distancias, predecessores), dicionários indexados por id
+        self.origens = {}
+        # Versão do grafo com a qual as árvores estão coerentes
+        self.versao = self.grafo.versao
+        # Vértices revistos pelas reparações (para acompanhar o ganho)
+        self.reparados = 0
+
+        self.grafo.adicionar_observador(self._peso_alterado)
+
+    def acompanhar(self, origem_id):
+        """
+        Passa a manter os menores caminhos de uma origem
+
+        Args:
+            origem_id: id do vértice de origem
+        """
+        if origem_id not in self.grafo.vertices:
+            raise KeyError(f"Vértice inexistente: {origem_id!r}")
+        self._garantir_coerente()
+        if origem_id not in self.origens:
+            self.origens[origem_id] = self.dijkstra._busca_dict(origem_id)
+
+    def deixar_de_acompanhar(self, origem_id):
+        """Descarta a árvore de uma origem"""
+        self.origens.pop(origem_id, None)
+
+    def fechar(self):
+        """Deixa de observar o grafo e descarta todas as árvores"""
+        self.grafo.remover_observador(self._peso_alterado)
+        self.origens.clear()
+
+    def arvore(self, origem_id):
+        """
+        Retorna a árvore atual de uma origem acompanhada
+
+        Args:
+            origem_id: id do vértice de origem
+
+        Returns:
+            objeto ArvoreCaminhos sobre as distâncias mantidas
+        """
+        self._garantir_coerente()
+        distancias, predecessores = self.origens[origem_id]
+        return ArvoreCaminhos(self.dijkstra, origem_id, distancias, predecessores)
+
+    def distancia(self, origem_id, destino_id):
+        """
+        Retorna o custo atual do menor caminho
+
+        Returns:
+            custo total ou None se o destino não for alcançável
+        """
+        return self.arvore(origem_id).distancia(destino_id)
+
+    def caminho(self, origem_id, destino_id):
+        """
+        Retorna a rota atual entre uma origem acompanhada e um destino
+
+        Returns:
+            tupla (caminho, custo_total, detalhes), como
+            Dijkstra.calcular_menor_caminho
+        """
+        return self.arvore(origem_id).caminho_para(destino_id)
+
+    def _garantir_coerente(self):
+        """Refaz tudo se o grafo mudou por fora dos observadores (ex.: novas arestas)"""
+        if self.versao != self.grafo.versao:
+            for origem_id in list(self.origens):
+                if origem_id in self.grafo.vertices:
+                    self.origens[origem_id] = self.dijkstra._busca_dict(origem_id)
+                else:
+                    del self.origens[origem_id]
+            self.versao = self.grafo.versao
+
+    def _peso_alterado(self, origem_id, destino_id, peso_antigo, novo_peso):
+        """Observador do grafo: repara as árvores afetadas pela mudança"""
+        # Só as mudanças acompanhadas aqui mantêm as árvores válidas
+        if self.versao not in (self.grafo.versao, self.grafo.versao - 1):
+            self._garantir_coerente()
+            return
+
+        for distancias, predecessores in self.origens.values():
+            self._reparar(distancias, predecessores, origem_id, destino_id, peso_antigo, novo_peso)
+        self.versao = self.grafo.versao
+
+    def _reparar(self, distancias, predecessores, u, v, peso_antigo, novo_peso):
+        """
+        Repara uma árvore após a mudança de peso da aresta u -> v
+
+        Args:
+            distancias: distâncias da origem (alteradas no lugar)
+            predecessores: predecessores na árvore (alterados no lugar)
+            u: id da origem da aresta
+            v: id do destino da aresta
+            peso_antigo: peso anterior da aresta
+            novo_peso: peso atual da aresta
+        """
+        infinito = float('infinity')
+        fila = []
+
+        if novo_peso > peso_antigo and predecessores.get(v) == u:
+            # Desliga a subárvore de v: esses caminhos podem ter piorado
+            afetados = {v}
+            pilha = [v]
+            while pilha:
+                atual = pilha.pop()
+                for aresta in self.grafo.obter_vizinhos(atual):
+                    filho = aresta['destino']
+                    if filho not in afetados and predecessores.get(filho) == atual:
+                        afetados.add(filho)
+                        pilha.append(filho)
+            for atual in afetados:
+                distancias[atual] = infinito
+                predecessores[atual] = None
+
+            # Religa cada vértice afetado pelo melhor antecessor não afetado
+            for atual in afetados:
+                for antecessor, aresta in self.grafo.obter_antecessores(atual):
+                    if antecessor in afetados:
+                        continue
+                    candidata = distancias[antecessor] + aresta['peso']
+                    if candidata < distancias[atual]:
+                        distancias[atual] = candidata
+                        predecessores[atual] = antecessor
+                if distancias[atual] != infinito:
+                    heapq.heappush(fila, (distancias[atual], atual))
+            self.reparados += len(afetados)
+
+        elif novo_peso < peso_antigo and distancias[u] + novo_peso < distancias[v]:
+            distancias[v] = distancias[u] + novo_peso
+            predecessores[v] = u
+            heapq.heappush(fila, (distancias[v], v))
+
+        # Propaga as melhoras (Dijkstra restrito ao que mudou)
+        while fila:
+            distancia_atual, atual = heapq.heappop(fila)
+            if distancia_atual > distancias[atual]:
+                continue
+            self.reparados += 1
+            for aresta in self.grafo.obter_vizinhos(atual):
+                vizinho = aresta['destino']
+                nova_distancia = distancia_atual + aresta['peso']
+                if nova_distancia < distancias[vizinho]:
+                    distancias[vizinho] = nova_distancia
+                    predecessores[vizinho] = atual
+                    heapq.heappush(fila, (nova_distancia, vizinho))
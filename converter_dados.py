@@ -0,0 +1,54 @@
+"""
+Conversão dos dados salvos entre JSON e o instantâneo binário
+
+JSON continua sendo o formato de troca (legível e editável); o binário
+(grafo_cidade.bin) serve para carregar o grafo rapidamente por mmap.
+
+Uso:
+    python converter_dados.py para-binario [--dados DIRETORIO]
+    python converter_dados.py para-json [--dados DIRETORIO]
+"""
+
+import argparse
+import sys
+
+from persistencia import SistemaPersistencia
+
+
+def main(argumentos=None):
+    """
+    Executa a conversão pedida na linha de comando
+
+    Args:
+        argumentos: lista de argumentos (None = sys.argv)
+
+    Returns:
+        código de saída (0 = sucesso)
+    """
+    parser = argparse.ArgumentParser(description="Converte os dados do mapa entre JSON e binário")
+    parser.add_argument('direcao', choices=('para-binario', 'para-json'),
+                        help="para-binario: JSON -> grafo_cidade.bin; para-json: grafo_cidade.bin -> JSON")
+    parser.add_argument('--dados', default='dados', help="diretório dos dados (padrão: dados)")
+    args = parser.parse_args(argumentos)
+
+    persistencia = SistemaPersistencia(args.dados)
+    if args.direcao == 'para-binario':
+        if not persistencia.converter_json_para_binario():
+            print(f"❌ Arquivo não encontrado: {persistencia.arquivo_grafo}")
+            return 1
+        print(f"✅ Instantâneo binário salvo em {persistencia.arquivo_binario}")
+    else:
+        try:
+            convertido = persistencia.converter_binario_para_json()
+        except ValueError as erro:
+            print(f"❌ {erro}")
+            return 1
+        if not convertido:
+            print(f"❌ Arquivo não encontrado: {persistencia.arquivo_binario}")
+            return 1
+        print(f"✅ JSON salvo em {persistencia.arquivo_grafo} e {persistencia.arquivo_pesos}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
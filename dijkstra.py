@@ -4,27 +4,99 @@ Implementa o algoritmo de Dijkstra para encontrar o menor caminho
 """
 
 import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from grafo_csr import GrafoCSR, tipo_array
+from hierarquia_contracao import HierarquiaContracao
+from marcos_alt import TabelaMarcos
+from fila_prioridade import FilaHeap, FilaBaldes
+from cache_rotas import CacheRotas
+from arvore_caminhos import ArvoreCaminhos
+from monitor_busca import EstatisticasBusca, FilaContada
 
 
 class Dijkstra:
     """Classe que implementa o algoritmo de Dijkstra"""
     
-    def __init__(self, grafo):
+    # Algoritmos de busca disponíveis em calcular_menor_caminho
+    ALGORITMOS = ('dijkstra', 'a_estrela', 'bidirecional', 'hierarquia', 'alt')
+    
+    # Quantas árvores de menores caminhos (uma por origem) manter em memória
+    LIMITE_ARVORES = 8
+    
+    def __init__(self, grafo, algoritmo='dijkstra', tamanho_cache=0, persistencia=None):
         """
         Inicializa o algoritmo com um grafo
         
         Args:
-            grafo: objeto Grafo a ser processado
+            grafo: objeto Grafo (ou GrafoCSR) a ser processado
+            algoritmo: algoritmo padrão das buscas (um de ALGORITMOS)
+            tamanho_cache: quantas rotas guardar em cache LRU (0 = sem cache)
+            persistencia: SistemaPersistencia de onde carregar (e onde salvar)
+                a hierarquia de contração e a tabela de marcos já montadas
+                para os pesos atuais (None = só em memória)
         """
+        if isinstance(grafo, GrafoCSR):
+            grafo = grafo.como_grafo()
         self.grafo = grafo
+        # Grafos compactos usam o laço sobre arrays, bem mais rápido
+        self.csr = getattr(grafo, 'csr', None)
+        self.algoritmo = self._validar_algoritmo(algoritmo)
+        # Cache do fator da heurística do A*: (versao_do_grafo, fator)
+        self._fator_heuristica_cache = None
+        # Hierarquia de contração usada pelo algoritmo 'hierarquia'; montada na
+        # primeira consulta ou atribuída (ex.: SistemaPersistencia.carregar_hierarquia)
+        self.hierarquia = None
+        # Tabela de marcos usada pelo algoritmo 'alt' (mesma lógica da hierarquia)
+        self.marcos = None
+        self.persistencia = persistencia
+        # Cache do maior peso inteiro: (versao_do_grafo, maior_peso ou None)
+        self._maior_peso_cache = None
+        # Cache de rotas prontas, invalidado pelas mudanças de peso
+        self.cache = CacheRotas(self.grafo, tamanho_cache) if tamanho_cache > 0 else None
+        # Árvores de menores caminhos por origem (as mais recentes ficam no fim)
+        self._arvores = OrderedDict()
+        # Funções chamadas com as estatísticas de cada consulta (ver adicionar_monitor)
+        self.monitores = []
+        # Estatísticas da última consulta monitorada
+        self.ultimas_estatisticas = None
+        # Consulta monitorada em andamento em cada thread (ver _estatisticas)
+        self._locais = threading.local()
+    
+    @property
+    def _estatisticas(self):
+        """
+        EstatisticasBusca da consulta monitorada em andamento na thread
+        atual (None = não contar)
+        
+        Fica por thread: consultas simultâneas no mesmo objeto não contam
+        uma a busca da outra.
+        """
+        return getattr(self._locais, 'estatisticas', None)
+    
+    @_estatisticas.setter
+    def _estatisticas(self, estatisticas):
+        self._locais.estatisticas = estatisticas
+    
+    def _validar_algoritmo(self, algoritmo):
+        """Garante que o algoritmo pedido existe"""
+        if algoritmo not in self.ALGORITMOS:
+            raise ValueError(f"Algoritmo desconhecido: {algoritmo!r} (opções: {', '.join(self.ALGORITMOS)})")
+        return algoritmo
     
-    def calcular_menor_caminho(self, origem_id, destino_id):
+    def calcular_menor_caminho(self, origem_id, destino_id, algoritmo=None):
         """
         Calcula o menor caminho entre dois vértices usando Dijkstra
         
         Args:
             origem_id: id do vértice de origem
             destino_id: id do vértice de destino
+            algoritmo: sobrescreve o algoritmo padrão só nesta busca
+                ('dijkstra', 'a_estrela', 'bidirecional', 'hierarquia' ou
+                'alt'); o resultado é o mesmo
             
         Returns:
             tupla (caminho, custo_total, detalhes) onde:
@@ -37,18 +109,172 @@ class Dijkstra:
         if origem_id not in self.grafo.vertices or destino_id not in self.grafo.vertices:
             return None, None, None
         
+        algoritmo = self.algoritmo if algoritmo is None else self._validar_algoritmo(algoritmo)
+        
+        if self.monitores:
+            return self._calcular_monitorado(origem_id, destino_id, algoritmo)
+        
+        if self.cache is None:
+            return self._calcular(origem_id, destino_id, algoritmo)
+        
+        resultado = self.cache.obter(origem_id, destino_id)
+        if resultado is None:
+            resultado = self._calcular(origem_id, destino_id, algoritmo)
+            self.cache.guardar(origem_id, destino_id, resultado)
+        return self._copiar_resultado(resultado)
+    
+    def adicionar_monitor(self, monitor):
+        """
+        Registra uma função a ser chamada com as estatísticas de cada consulta
+        
+        Sem monitores as buscas não contam nada; com algum, cada consulta
+        conta vértices, arestas e operações da fila e mede os tempos.
+        
+        Args:
+            monitor: função monitor(estatisticas) que recebe um
+                EstatisticasBusca (ex.: monitor_busca.HistogramaBusca)
+        """
+        self.monitores.append(monitor)
+    
+    def remover_monitor(self, monitor):
+        """Remove um monitor registrado com adicionar_monitor"""
+        if monitor in self.monitores:
+            self.monitores.remove(monitor)
+    
+    def fechar(self):
+        """
+        Libera o cache de rotas, que deixa de observar o grafo
+        
+        O grafo guarda uma referência ao cache enquanto ele o observa; sem
+        fechar, cada Dijkstra com cache descartado continua vivo (e sendo
+        avisado) enquanto o grafo existir. O objeto segue utilizável, sem cache.
+        """
+        if self.cache is not None:
+            self.cache.fechar()
+            self.cache = None
+    
+    def _calcular_monitorado(self, origem_id, destino_id, algoritmo):
+        """
+        Mesma consulta de calcular_menor_caminho, contada e cronometrada
+        
+        Returns:
+            tupla (caminho, custo_total, detalhes), como calcular_menor_caminho
+        """
+        estatisticas = EstatisticasBusca(algoritmo, origem_id, destino_id)
+        self._estatisticas = estatisticas
+        inicio = time.perf_counter()
+        try:
+            resultado = None if self.cache is None else self.cache.obter(origem_id, destino_id)
+            if resultado is not None:
+                estatisticas.fonte = 'cache'
+                estatisticas.sem_contagem()
+                resultado = self._copiar_resultado(resultado)
+            else:
+                resultado = self._calcular(origem_id, destino_id, algoritmo)
+                if self.cache is not None:
+                    self.cache.guardar(origem_id, destino_id, resultado)
+                    resultado = self._copiar_resultado(resultado)
+        finally:
+            self._estatisticas = None
+        estatisticas.tempo_total = time.perf_counter() - inicio
+        estatisticas.encontrado = resultado[0] is not None
+        
+        self.ultimas_estatisticas = estatisticas
+        for monitor in self.monitores:
+            monitor(estatisticas)
+        return resultado
+    
+    @staticmethod
+    def _contar_fechados(estatisticas, visitados, arestas_de, parada=None):
+        """
+        Conta, depois da busca, os vértices fechados e as arestas relaxadas
+        a partir deles (assim o laço da busca não paga pela contagem)
+        
+        Args:
+            estatisticas: EstatisticasBusca da consulta
+            visitados: vértices fechados pela busca
+            arestas_de: função vertice_id -> arestas percorridas a partir dele
+            parada: vértice fechado em que a busca parou sem expandi-lo
+        """
+        estatisticas.vertices_fechados += len(visitados)
+        estatisticas.arestas_relaxadas += sum(len(arestas_de(v_id)) for v_id in visitados if v_id != parada)
+    
+    @staticmethod
+    def _copiar_resultado(resultado):
+        """Copia um resultado do cache para que o chamador possa alterá-lo"""
+        caminho, custo_total, detalhes = resultado
+        if caminho is None:
+            return None, None, None
+        return list(caminho), custo_total, [dict(d) for d in detalhes]
+    
+    def _calcular(self, origem_id, destino_id, algoritmo):
+        """
+        Executa a busca com o algoritmo escolhido, sem passar pelo cache
+        
+        Returns:
+            tupla (caminho, custo_total, detalhes), como calcular_menor_caminho
+        """
+        if algoritmo == 'a_estrela':
+            return self._calcular_a_estrela(origem_id, destino_id)
+        if algoritmo == 'bidirecional':
+            return self._calcular_bidirecional(origem_id, destino_id)
+        if algoritmo == 'hierarquia':
+            return self._calcular_hierarquia(origem_id, destino_id)
+        if algoritmo == 'alt':
+            return self._calcular_a_estrela(origem_id, destino_id, self._heuristica_marcos(destino_id))
+        
+        # Se já existe a árvore de caminhos desta origem, basta percorrê-la
+        arvore = self._arvore_valida(origem_id)
+        if arvore is not None:
+            if self._estatisticas is not None:
+                self._estatisticas.fonte = 'arvore'
+                self._estatisticas.sem_contagem()
+            return arvore.caminho_para(destino_id)
+        
+        if self.csr is not None:
+            return self._calcular_menor_caminho_csr(origem_id, destino_id)
+        
+        distancias, predecessores = self._busca_dict(origem_id, destino_id)
+        
+        # Reconstrói o caminho
+        if distancias[destino_id] == float('infinity'):
+            # Não há caminho
+            return None, None, None
+        
+        caminho = self._reconstruir_caminho(predecessores, origem_id, destino_id)
+        custo_total = distancias[destino_id]
+        detalhes = self._obter_detalhes_caminho(caminho)
+        
+        return caminho, custo_total, detalhes
+    
+    def _busca_dict(self, origem_id, destino_id=None):
+        """
+        Laço do Dijkstra sobre as listas de adjacência do Grafo
+        
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do destino (pára ao fechá-lo); se None, calcula
+                as distâncias para todos os vértices
+            
+        Returns:
+            tupla (distancias, predecessores), dicionários indexados por id
+        """
         # Inicialização
         distancias = {v_id: float('infinity') for v_id in self.grafo.vertices}
         distancias[origem_id] = 0
         predecessores = {v_id: None for v_id in self.grafo.vertices}
         visitados = set()
         
-        # Fila de prioridade: (distancia, vertice_id)
-        fila = [(0, origem_id)]
+        # Fila de prioridade: baldes se os pesos forem inteiros, senão heap
+        fila = self._nova_fila()
+        estatisticas = self._estatisticas
+        if estatisticas is not None:
+            fila = FilaContada(fila, estatisticas)
+        fila.inserir(0, origem_id)
         
         while fila:
             # Extrai o vértice com menor distância
-            distancia_atual, vertice_atual = heapq.heappop(fila)
+            distancia_atual, vertice_atual = fila.extrair()
             
             # Se já foi visitado, ignora
             if vertice_atual in visitados:
@@ -78,18 +304,672 @@ class Dijkstra:
                 if nova_distancia < distancias[vizinho_id]:
                     distancias[vizinho_id] = nova_distancia
                     predecessores[vizinho_id] = vertice_atual
-                    heapq.heappush(fila, (nova_distancia, vizinho_id))
+                    fila.inserir(nova_distancia, vizinho_id)
         
-        # Reconstrói o caminho
-        if distancias[destino_id] == float('infinity'):
-            # Não há caminho
+        if estatisticas is not None:
+            self._contar_fechados(estatisticas, visitados, self.grafo.obter_vizinhos, destino_id)
+        
+        return distancias, predecessores
+    
+    def arvore_caminhos(self, origem_id):
+        """
+        Calcula (ou reaproveita) a árvore de menores caminhos de uma origem
+        
+        A busca roda sem parada antecipada; depois disso a rota para qualquer
+        destino sai da árvore em tempo proporcional ao tamanho do caminho.
+        As árvores ficam em um pequeno cache por origem até os pesos mudarem,
+        e calcular_menor_caminho também passa a usá-las.
+        
+        Args:
+            origem_id: id do vértice de origem
+            
+        Returns:
+            objeto ArvoreCaminhos ou None se a origem não existir
+        """
+        if origem_id not in self.grafo.vertices:
+            return None
+        
+        arvore = self._arvore_valida(origem_id)
+        if arvore is not None:
+            return arvore
+        
+        if self.csr is not None:
+            origem = self.csr.indices[origem_id]
+            csr = self.csr
+            distancias, predecessores, _ = self.buscar_csr(
+                csr.deslocamentos, csr.vizinhos, csr.pesos, origem, (), self._maior_peso_inteiro()
+            )
+            arvore = ArvoreCaminhos(self, origem_id, distancias, predecessores, self.csr.indices, self.csr.ids)
+        else:
+            distancias, predecessores = self._busca_dict(origem_id)
+            arvore = ArvoreCaminhos(self, origem_id, distancias, predecessores)
+        
+        self._arvores[origem_id] = arvore
+        while len(self._arvores) > self.LIMITE_ARVORES:
+            self._arvores.popitem(last=False)
+        return arvore
+    
+    def _arvore_valida(self, origem_id):
+        """
+        Retorna a árvore guardada para a origem, se ainda valer para os pesos atuais
+        
+        Returns:
+            objeto ArvoreCaminhos ou None
+        """
+        arvore = self._arvores.get(origem_id)
+        if arvore is None:
+            return None
+        if arvore.versao != self.grafo.versao:
+            # Pesos mudaram: todas as árvores guardadas expiraram
+            self._arvores.clear()
+            return None
+        self._arvores.move_to_end(origem_id)
+        return arvore
+    
+    def _maior_peso_inteiro(self):
+        """
+        Verifica se todos os pesos são inteiros não negativos
+        
+        Returns:
+            maior peso do grafo, ou None se algum peso for negativo ou não
+            inteiro (o resultado fica em cache até a versão do grafo mudar)
+        """
+        versao = self.grafo.versao
+        if self._maior_peso_cache is not None and self._maior_peso_cache[0] == versao:
+            return self._maior_peso_cache[1]
+        
+        maior_peso = 0
+        if self.csr is not None:
+            pesos = self.csr.pesos
+            if tipo_array(pesos) != 'q' or (len(pesos) and min(pesos) < 0):
+                maior_peso = None
+            elif len(pesos):
+                maior_peso = max(pesos)
+        else:
+            for v_id in self.grafo.vertices:
+                for vizinho in self.grafo.obter_vizinhos(v_id):
+                    peso = vizinho['peso']
+                    if not isinstance(peso, int) or peso < 0:
+                        maior_peso = None
+                        break
+                    maior_peso = max(maior_peso, peso)
+                if maior_peso is None:
+                    break
+        
+        self._maior_peso_cache = (versao, maior_peso)
+        return maior_peso
+    
+    def _nova_fila(self):
+        """
+        Cria a fila de prioridade adequada aos pesos atuais
+        
+        Returns:
+            FilaBaldes se os pesos forem inteiros pequenos, senão FilaHeap
+        """
+        maior_peso = self._maior_peso_inteiro()
+        if FilaBaldes.suporta(maior_peso):
+            return FilaBaldes(maior_peso)
+        return FilaHeap()
+    
+    def _calcular_menor_caminho_csr(self, origem_id, destino_id):
+        """
+        Dijkstra sobre os arrays de um GrafoCSR (índices inteiros)
+        
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            
+        Returns:
+            tupla (caminho, custo_total, detalhes), como calcular_menor_caminho
+        """
+        csr = self.csr
+        origem = csr.indices[origem_id]
+        destino = csr.indices[destino_id]
+        
+        maior_peso = self._maior_peso_inteiro()
+        estatisticas = self._estatisticas
+        if estatisticas is not None:
+            busca = self._busca_csr_fila(origem, destino, FilaContada(self._nova_fila(), estatisticas), estatisticas)
+        else:
+            busca = self.buscar_csr(csr.deslocamentos, csr.vizinhos, csr.pesos, origem, (destino,), maior_peso)
+        distancias, predecessores, arestas_pred = busca
+        pesos = csr.pesos
+        
+        if distancias[destino] == float('infinity'):
+            return None, None, None
+        
+        # Reconstrói caminho e detalhes direto das arestas usadas
+        indices_caminho = []
+        arestas_caminho = []
+        atual = destino
+        while atual != -1:
+            indices_caminho.append(atual)
+            if arestas_pred[atual] != -1:
+                arestas_caminho.append(arestas_pred[atual])
+            atual = predecessores[atual]
+        indices_caminho.reverse()
+        arestas_caminho.reverse()
+        
+        caminho = [csr.ids[i] for i in indices_caminho]
+        if estatisticas is not None:
+            inicio_detalhes = time.perf_counter()
+        detalhes = []
+        for i, k in enumerate(arestas_caminho):
+            detalhes.append({
+                'origem': csr.nomes[indices_caminho[i]],
+                'destino': csr.nomes[indices_caminho[i + 1]],
+                'peso': pesos[k],
+                'motivo': csr.motivos[csr.condicoes[k]]
+            })
+        if estatisticas is not None:
+            estatisticas.tempo_detalhes += time.perf_counter() - inicio_detalhes
+        
+        return caminho, distancias[destino], detalhes
+    
+    @staticmethod
+    def buscar_csr(deslocamentos, vizinhos, pesos, origem, destinos=(), maior_peso=None):
+        """
+        Dijkstra direto sobre arrays CSR, sem objeto Grafo
+        
+        Os pesos são um parâmetro: quem avalia muitos cenários sobre a mesma
+        estrutura (SimulacaoRotas) passa um array de pesos por cenário.
+        
+        Args:
+            deslocamentos: deslocamentos CSR (num_vertices + 1 posições)
+            vizinhos: vértice de destino de cada aresta
+            pesos: peso de cada aresta, na ordem de vizinhos
+            origem: índice do vértice de origem
+            destinos: índices dos vértices procurados; a busca pára quando
+                todos fecham (vazio = árvore completa)
+            maior_peso: maior peso, se todos forem inteiros não negativos
+                (permite os baldes de Dial); None = heap binário
+            
+        Returns:
+            tupla (distancias, predecessores, arestas_pred) indexadas pelo
+            índice do vértice; arestas_pred guarda a posição da aresta usada
+            para chegar em cada vértice (-1 = nenhuma)
+        """
+        if FilaBaldes.suporta(maior_peso):
+            return Dijkstra._busca_csr_baldes(deslocamentos, vizinhos, pesos, origem, destinos, maior_peso)
+        return Dijkstra._busca_csr_heap(deslocamentos, vizinhos, pesos, origem, destinos)
+    
+    @staticmethod
+    def _alvos(n, destinos):
+        """Marca os destinos de uma busca CSR e conta quantos são distintos"""
+        alvos = bytearray(n)
+        for destino in destinos:
+            alvos[destino] = 1
+        return alvos, sum(alvos)
+    
+    @staticmethod
+    def _busca_csr_heap(deslocamentos, vizinhos, pesos, origem, destinos):
+        """
+        Laço do Dijkstra sobre arrays CSR com heap binário
+        
+        Returns:
+            tupla (distancias, predecessores, arestas_pred), como buscar_csr
+        """
+        n = len(deslocamentos) - 1
+        distancias = [float('infinity')] * n
+        distancias[origem] = 0
+        arestas_pred = [-1] * n
+        predecessores = [-1] * n
+        visitados = bytearray(n)
+        alvos, restantes = Dijkstra._alvos(n, destinos)
+        
+        fila = [(0, origem)]
+        while fila:
+            distancia_atual, atual = heapq.heappop(fila)
+            if visitados[atual]:
+                continue
+            visitados[atual] = 1
+            if alvos[atual]:
+                restantes -= 1
+                if not restantes:
+                    break
+            
+            for k in range(deslocamentos[atual], deslocamentos[atual + 1]):
+                vizinho = vizinhos[k]
+                if visitados[vizinho]:
+                    continue
+                nova_distancia = distancia_atual + pesos[k]
+                if nova_distancia < distancias[vizinho]:
+                    distancias[vizinho] = nova_distancia
+                    predecessores[vizinho] = atual
+                    arestas_pred[vizinho] = k
+                    heapq.heappush(fila, (nova_distancia, vizinho))
+        
+        return distancias, predecessores, arestas_pred
+    
+    @staticmethod
+    def _busca_csr_baldes(deslocamentos, vizinhos, pesos, origem, destinos, maior_peso):
+        """
+        Laço do Dijkstra sobre arrays CSR com baldes de Dial
+        
+        É a mesma lógica de FilaBaldes, escrita direto no laço: no caminho
+        mais quente da busca, as chamadas de método custariam mais do que a
+        troca do heap economiza.
+        
+        Returns:
+            tupla (distancias, predecessores, arestas_pred), como buscar_csr
+        """
+        n = len(deslocamentos) - 1
+        distancias = [float('infinity')] * n
+        distancias[origem] = 0
+        arestas_pred = [-1] * n
+        predecessores = [-1] * n
+        visitados = bytearray(n)
+        alvos, restantes = Dijkstra._alvos(n, destinos)
+        
+        tamanho = maior_peso + 1
+        baldes = [[] for _ in range(tamanho)]
+        baldes[0].append(origem)
+        pendentes = 1
+        distancia_atual = 0
+        while pendentes:
+            balde = baldes[distancia_atual % tamanho]
+            while not balde:
+                distancia_atual += 1
+                balde = baldes[distancia_atual % tamanho]
+            atual = balde.pop()
+            pendentes -= 1
+            # Entradas antigas de vértices que já melhoraram são descartadas
+            if visitados[atual] or distancias[atual] != distancia_atual:
+                continue
+            visitados[atual] = 1
+            if alvos[atual]:
+                restantes -= 1
+                if not restantes:
+                    break
+            
+            for k in range(deslocamentos[atual], deslocamentos[atual + 1]):
+                vizinho = vizinhos[k]
+                if visitados[vizinho]:
+                    continue
+                nova_distancia = distancia_atual + pesos[k]
+                if nova_distancia < distancias[vizinho]:
+                    distancias[vizinho] = nova_distancia
+                    predecessores[vizinho] = atual
+                    arestas_pred[vizinho] = k
+                    baldes[nova_distancia % tamanho].append(vizinho)
+                    pendentes += 1
+        
+        return distancias, predecessores, arestas_pred
+    
+    def _busca_csr_fila(self, origem, destino, fila, estatisticas):
+        """
+        Laço do Dijkstra sobre arrays CSR com uma fila de fila_prioridade
+        
+        É a versão com a fila como objeto (e com contagem de vértices e
+        arestas) de _busca_csr_heap e _busca_csr_baldes, que escrevem a fila
+        direto no laço. Só as consultas monitoradas passam por aqui; a ordem
+        de extração é a mesma, então o caminho encontrado também.
+        
+        Args:
+            origem: índice de partida
+            destino: índice de chegada
+            fila: FilaContada sobre a fila de _nova_fila
+            estatisticas: EstatisticasBusca da consulta
+            
+        Returns:
+            tupla (distancias, predecessores, arestas_pred), como _busca_csr_heap
+        """
+        csr = self.csr
+        deslocamentos = csr.deslocamentos
+        vizinhos = csr.vizinhos
+        pesos = csr.pesos
+        
+        n = csr.num_vertices
+        distancias = [float('infinity')] * n
+        distancias[origem] = 0
+        arestas_pred = [-1] * n
+        predecessores = [-1] * n
+        visitados = bytearray(n)
+        
+        fila.inserir(0, origem)
+        while fila:
+            distancia_atual, atual = fila.extrair()
+            if visitados[atual] or distancias[atual] != distancia_atual:
+                continue
+            visitados[atual] = 1
+            estatisticas.vertices_fechados += 1
+            if atual == destino:
+                break
+            
+            inicio, fim = deslocamentos[atual], deslocamentos[atual + 1]
+            estatisticas.arestas_relaxadas += fim - inicio
+            for k in range(inicio, fim):
+                vizinho = vizinhos[k]
+                if visitados[vizinho]:
+                    continue
+                nova_distancia = distancia_atual + pesos[k]
+                if nova_distancia < distancias[vizinho]:
+                    distancias[vizinho] = nova_distancia
+                    predecessores[vizinho] = atual
+                    arestas_pred[vizinho] = k
+                    fila.inserir(nova_distancia, vizinho)
+        
+        return distancias, predecessores, arestas_pred
+    
+    def _fator_heuristica(self):
+        """
+        Calcula o menor peso por unidade de distância entre todas as arestas
+        
+        Multiplicar a distância euclidiana até o destino por esse fator nunca
+        superestima o custo restante, então o A* continua exato mesmo depois
+        que o GeradorPesos sorteia novas condições. O valor fica em cache até
+        a versão do grafo mudar.
+        
+        Returns:
+            fator (0 se não houver arestas com comprimento positivo)
+        """
+        versao = self.grafo.versao
+        if self._fator_heuristica_cache is not None and self._fator_heuristica_cache[0] == versao:
+            return self._fator_heuristica_cache[1]
+        
+        fator = float('infinity')
+        if self.csr is not None:
+            csr = self.csr
+            xs, ys = csr.xs, csr.ys
+            for origem in range(csr.num_vertices):
+                for k in range(csr.deslocamentos[origem], csr.deslocamentos[origem + 1]):
+                    destino = csr.vizinhos[k]
+                    comprimento = math.hypot(xs[destino] - xs[origem], ys[destino] - ys[origem])
+                    if comprimento > 0:
+                        fator = min(fator, csr.pesos[k] / comprimento)
+        else:
+            for origem_id, origem in self.grafo.vertices.items():
+                for vizinho in self.grafo.obter_vizinhos(origem_id):
+                    destino = self.grafo.vertices[vizinho['destino']]
+                    comprimento = math.hypot(destino.x - origem.x, destino.y - origem.y)
+                    if comprimento > 0:
+                        fator = min(fator, vizinho['peso'] / comprimento)
+        
+        if fator == float('infinity') or fator < 0:
+            fator = 0
+        # Margem contra arredondamento, para a heurística seguir consistente
+        fator *= 1 - 1e-9
+        
+        self._fator_heuristica_cache = (versao, fator)
+        return fator
+    
+    def _heuristica_euclidiana(self, destino_id):
+        """
+        Estimativa pelas coordenadas: distância em linha reta vezes o fator
+        
+        Returns:
+            função vertice_id -> estimativa do custo restante (memorizada)
+        """
+        vertices = self.grafo.vertices
+        fator = self._fator_heuristica()
+        alvo = vertices[destino_id]
+        estimativas = {}
+        
+        def heuristica(v_id):
+            h = estimativas.get(v_id)
+            if h is None:
+                v = vertices[v_id]
+                h = fator * math.hypot(v.x - alvo.x, v.y - alvo.y)
+                estimativas[v_id] = h
+            return h
+        
+        return heuristica
+    
+    def preparar_marcos(self, quantidade=8, selecao='distante'):
+        """
+        Garante uma tabela de marcos coerente com os pesos atuais
+        
+        Na primeira chamada a tabela é carregada da persistência (se a
+        assinatura dos pesos bater). Diferente da hierarquia, a tabela é
+        simplesmente refeita quando os pesos mudam, já que o
+        pré-processamento é barato; cada tabela refeita é salva.
+        
+        Args:
+            quantidade: número de marcos, se for preciso montar a tabela
+            selecao: critério de escolha dos marcos ('distante' ou 'planar')
+            
+        Returns:
+            objeto TabelaMarcos
+        """
+        versao = self.grafo.versao
+        if self.marcos is None and self.persistencia is not None:
+            self.marcos = self.persistencia.carregar_marcos(self.grafo)
+        
+        if self.marcos is not None and self.marcos.versao_grafo is None:
+            # Carregada do disco, já validada pela assinatura dos pesos
+            self.marcos.versao_grafo = versao
+        if self.marcos is None or self.marcos.versao_grafo != versao:
+            self.marcos = TabelaMarcos.construir(self.grafo, quantidade, selecao)
+            if self.persistencia is not None:
+                self.persistencia.salvar_marcos(self.marcos)
+        return self.marcos
+    
+    def _heuristica_marcos(self, destino_id):
+        """
+        Estimativa ALT: limite inferior pelas tabelas de marcos
+        
+        Returns:
+            função vertice_id -> estimativa do custo restante (memorizada)
+        """
+        tabela = self.preparar_marcos()
+        indices = tabela.indices
+        alvo = indices[destino_id]
+        estimativas = {}
+        
+        def heuristica(v_id):
+            h = estimativas.get(v_id)
+            if h is None:
+                h = tabela.limite_inferior(indices[v_id], alvo)
+                estimativas[v_id] = h
+            return h
+        
+        return heuristica
+    
+    def _calcular_a_estrela(self, origem_id, destino_id, heuristica=None):
+        """
+        Busca A* guiada por uma estimativa do custo restante
+        
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            heuristica: função vertice_id -> estimativa; se None, usa as
+                coordenadas x/y dos vértices
+            
+        Returns:
+            tupla (caminho, custo_total, detalhes), como calcular_menor_caminho
+        """
+        if heuristica is None:
+            heuristica = self._heuristica_euclidiana(destino_id)
+        
+        distancias = {origem_id: 0}
+        predecessores = {origem_id: None}
+        visitados = set()
+        
+        # Operações do heap (contadas só em consultas monitoradas)
+        estatisticas = self._estatisticas
+        if estatisticas is None:
+            empurrar, retirar = heapq.heappush, heapq.heappop
+        else:
+            empurrar, retirar = estatisticas.empurrar, estatisticas.retirar
+        
+        # Fila de prioridade: (distancia + estimativa, distancia, vertice_id)
+        fila = []
+        empurrar(fila, (heuristica(origem_id), 0, origem_id))
+        
+        while fila:
+            _, distancia_atual, vertice_atual = retirar(fila)
+            
+            if vertice_atual in visitados:
+                continue
+            visitados.add(vertice_atual)
+            
+            if vertice_atual == destino_id:
+                break
+            
+            for vizinho in self.grafo.obter_vizinhos(vertice_atual):
+                vizinho_id = vizinho['destino']
+                # Com heurística consistente, vértice fechado não melhora mais
+                if vizinho_id in visitados:
+                    continue
+                
+                nova_distancia = distancia_atual + vizinho['peso']
+                if nova_distancia < distancias.get(vizinho_id, float('infinity')):
+                    distancias[vizinho_id] = nova_distancia
+                    predecessores[vizinho_id] = vertice_atual
+                    empurrar(fila, (nova_distancia + heuristica(vizinho_id), nova_distancia, vizinho_id))
+        
+        if estatisticas is not None:
+            self._contar_fechados(estatisticas, visitados, self.grafo.obter_vizinhos, destino_id)
+        
+        if destino_id not in visitados:
             return None, None, None
         
         caminho = self._reconstruir_caminho(predecessores, origem_id, destino_id)
-        custo_total = distancias[destino_id]
-        detalhes = self._obter_detalhes_caminho(caminho)
+        return caminho, distancias[destino_id], self._obter_detalhes_caminho(caminho)
+    
+    def _calcular_bidirecional(self, origem_id, destino_id):
+        """
+        Dijkstra bidirecional: uma busca parte da origem pelas arestas de saída
+        e outra parte do destino pelas arestas de entrada (antecessores), o que
+        respeita ruas de mão única.
         
-        return caminho, custo_total, detalhes
+        A busca para quando a soma dos menores rótulos das duas filas alcança o
+        melhor caminho já encontrado (mu); nenhum caminho ainda não examinado
+        pode ser mais curto que isso.
+        
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            
+        Returns:
+            tupla (caminho, custo_total, detalhes), como calcular_menor_caminho
+        """
+        if origem_id == destino_id:
+            return [origem_id], 0, []
+        
+        infinito = float('infinity')
+        # Índice 0 = busca para frente, índice 1 = busca para trás
+        distancias = ({origem_id: 0}, {destino_id: 0})
+        predecessores = ({origem_id: None}, {destino_id: None})
+        visitados = (set(), set())
+        
+        # Operações do heap (contadas só em consultas monitoradas)
+        estatisticas = self._estatisticas
+        if estatisticas is None:
+            empurrar, retirar = heapq.heappush, heapq.heappop
+        else:
+            empurrar, retirar = estatisticas.empurrar, estatisticas.retirar
+        
+        filas = ([], [])
+        empurrar(filas[0], (0, origem_id))
+        empurrar(filas[1], (0, destino_id))
+        
+        melhor_custo = infinito
+        encontro = None
+        
+        while filas[0] and filas[1]:
+            if filas[0][0][0] + filas[1][0][0] >= melhor_custo:
+                break
+            
+            # Expande o lado com o menor rótulo na fila
+            lado = 0 if filas[0][0][0] <= filas[1][0][0] else 1
+            distancia_atual, vertice_atual = retirar(filas[lado])
+            if vertice_atual in visitados[lado]:
+                continue
+            visitados[lado].add(vertice_atual)
+            
+            dist_lado = distancias[lado]
+            dist_outro = distancias[1 - lado]
+            if lado == 0:
+                arestas = ((a['destino'], a['peso']) for a in self.grafo.obter_vizinhos(vertice_atual))
+            else:
+                arestas = ((o, a['peso']) for o, a in self.grafo.obter_antecessores(vertice_atual))
+            
+            for vizinho_id, peso in arestas:
+                nova_distancia = distancia_atual + peso
+                if nova_distancia < dist_lado.get(vizinho_id, infinito):
+                    dist_lado[vizinho_id] = nova_distancia
+                    predecessores[lado][vizinho_id] = vertice_atual
+                    empurrar(filas[lado], (nova_distancia, vizinho_id))
+                
+                # Caminho completo passando por esta aresta
+                if vizinho_id in dist_outro:
+                    candidato = dist_lado[vizinho_id] + dist_outro[vizinho_id]
+                    if candidato < melhor_custo:
+                        melhor_custo = candidato
+                        encontro = vizinho_id
+        
+        if estatisticas is not None:
+            self._contar_fechados(estatisticas, visitados[0], self.grafo.obter_vizinhos)
+            self._contar_fechados(estatisticas, visitados[1], self.grafo.obter_antecessores)
+        
+        if encontro is None:
+            return None, None, None
+        
+        # Junta origem -> encontro com encontro -> destino
+        caminho = self._reconstruir_caminho(predecessores[0], origem_id, encontro)
+        atual = predecessores[1][encontro]
+        while atual is not None:
+            caminho.append(atual)
+            atual = predecessores[1][atual]
+        
+        return caminho, melhor_custo, self._obter_detalhes_caminho(caminho)
+    
+    def preparar_hierarquia(self):
+        """
+        Garante uma hierarquia de contração coerente com os pesos atuais
+        
+        Na primeira chamada a hierarquia é carregada da persistência (se a
+        assinatura dos pesos bater) ou montada; se os pesos mudaram desde
+        então, ela é customizada reaproveitando a ordem de contração (ou
+        montada de novo, se o grafo ganhou vértices). Cada
+        hierarquia montada ou customizada é salva ao lado de pesos_atuais.json.
+        
+        Returns:
+            objeto HierarquiaContracao
+        """
+        versao = self.grafo.versao
+        if self.hierarquia is None and self.persistencia is not None:
+            self.hierarquia = self.persistencia.carregar_hierarquia(self.grafo)
+        
+        if self.hierarquia is None:
+            self.hierarquia = HierarquiaContracao.construir(self.grafo)
+        elif self.hierarquia.versao_grafo is None:
+            # Carregada do disco, já validada pela assinatura dos pesos
+            self.hierarquia.versao_grafo = versao
+            return self.hierarquia
+        elif self.hierarquia.versao_grafo != versao:
+            ids = self.csr.ids if self.csr is not None else self.grafo.vertices
+            if list(ids) != self.hierarquia.ids:
+                # Vértices acrescentados: a ordem de contração antiga não serve
+                self.hierarquia = HierarquiaContracao.construir(self.grafo)
+            else:
+                self.hierarquia = self.hierarquia.customizar(self.grafo)
+        else:
+            return self.hierarquia
+        
+        if self.persistencia is not None:
+            self.persistencia.salvar_hierarquia(self.hierarquia)
+        return self.hierarquia
+    
+    def _calcular_hierarquia(self, origem_id, destino_id):
+        """
+        Consulta pela hierarquia de contração
+        
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            
+        Returns:
+            tupla (caminho, custo_total, detalhes), como calcular_menor_caminho
+        """
+        caminho, custo_total = self.preparar_hierarquia().consultar(origem_id, destino_id)
+        if self._estatisticas is not None:
+            # A busca roda dentro da hierarquia; só os tempos são medidos
+            self._estatisticas.sem_contagem()
+        if caminho is None:
+            return None, None, None
+        return caminho, custo_total, self._obter_detalhes_caminho(caminho)
     
     def _reconstruir_caminho(self, predecessores, origem_id, destino_id):
         """
@@ -123,14 +1003,17 @@ class Dijkstra:
         Returns:
             lista de dicionários com informações de cada aresta
         """
+        estatisticas = self._estatisticas
+        if estatisticas is not None:
+            inicio = time.perf_counter()
+        
         detalhes = []
         
         for i in range(len(caminho) - 1):
             origem_id = caminho[i]
             destino_id = caminho[i + 1]
             
-            peso = self.grafo.obter_peso(origem_id, destino_id)
-            motivo = self.grafo.obter_motivo(origem_id, destino_id)
+            aresta = self.grafo.obter_aresta(origem_id, destino_id)
             
             origem = self.grafo.vertices[origem_id]
             destino = self.grafo.vertices[destino_id]
@@ -138,10 +1021,13 @@ class Dijkstra:
             detalhes.append({
                 'origem': origem.nome,
                 'destino': destino.nome,
-                'peso': peso,
-                'motivo': motivo
+                'peso': aresta['peso'],
+                'motivo': aresta['motivo']
             })
         
+        if estatisticas is not None:
+            estatisticas.tempo_detalhes += time.perf_counter() - inicio
+        
         return detalhes
     
     @staticmethod
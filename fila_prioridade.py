@@ -0,0 +1,92 @@
+"""
+Módulo fila_prioridade.py
+Filas de prioridade usadas pelas buscas de menor caminho
+
+Os pesos gerados pelo GeradorPesos são inteiros pequenos (1 a 18, mais 999
+para "Rua fechada"). Nesse caso o Dijkstra pode trocar o heap binário por uma
+fila de baldes (algoritmo de Dial): como as prioridades extraídas nunca
+diminuem e cada inserção fica no máximo maior_peso à frente da atual, basta
+um vetor circular de maior_peso + 1 listas, com inserção e remoção O(1).
+"""
+
+import heapq
+
+
+class FilaHeap:
+    """Fila de prioridade genérica sobre heapq (qualquer prioridade)"""
+
+    def __init__(self):
+        """Inicializa uma fila vazia"""
+        self._heap = []
+
+    def inserir(self, prioridade, item):
+        """Insere um item com a prioridade dada"""
+        heapq.heappush(self._heap, (prioridade, item))
+
+    def extrair(self):
+        """
+        Remove o item de menor prioridade
+
+        Returns:
+            tupla (prioridade, item)
+        """
+        return heapq.heappop(self._heap)
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class FilaBaldes:
+    """Fila monótona de prioridades inteiras (baldes de Dial)"""
+
+    # Acima disso o vetor de baldes ocupa memória demais para compensar
+    MAIOR_PESO_SUPORTADO = 1 << 16
+
+    def __init__(self, maior_peso):
+        """
+        Inicializa uma fila vazia
+
+        Args:
+            maior_peso: maior peso de aresta do grafo; toda inserção deve ter
+                prioridade entre a última extraída e ela + maior_peso
+        """
+        self.tamanho = maior_peso + 1
+        self.baldes = [[] for _ in range(self.tamanho)]
+        self.atual = 0
+        self._quantidade = 0
+
+    @staticmethod
+    def suporta(maior_peso):
+        """
+        Indica se a fila serve para pesos até maior_peso
+
+        Args:
+            maior_peso: maior peso inteiro não negativo, ou None se há pesos
+                negativos ou não inteiros
+
+        Returns:
+            True se a fila de baldes pode ser usada
+        """
+        return maior_peso is not None and maior_peso <= FilaBaldes.MAIOR_PESO_SUPORTADO
+
+    def inserir(self, prioridade, item):
+        """Insere um item com prioridade inteira (monótona)"""
+        self.baldes[prioridade % self.tamanho].append(item)
+        self._quantidade += 1
+
+    def extrair(self):
+        """
+        Remove um item de menor prioridade
+
+        Returns:
+            tupla (prioridade, item)
+        """
+        balde = self.baldes[self.atual % self.tamanho]
+        while not balde:
+            self.atual += 1
+            balde = self.baldes[self.atual % self.tamanho]
+        self._quantidade -= 1
+        return self.atual, balde.pop()
+
+    def __len__(self):
+        return self._quantidade
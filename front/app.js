@@ -17,9 +17,24 @@ const state = {
   V: new Map(), // id -> {id,nome,x,y}
   E: [],        // {u,v,peso,motivo}
   path: [],
-  cost: null
+  cost: null,
+  detalhes: [] // {origem,destino,peso,motivo} de cada trecho (do servidor)
 };
 
+// ============================
+// Servidor de rotas (servidor_rotas.py)
+// ============================
+// Mesma origem quando o front é servido por ele; aberto como arquivo, usa a porta padrão
+const API = window.API_ROTAS ??
+  (location.protocol === 'file:' ? 'http://127.0.0.1:8000' : '');
+
+async function api(caminho, opcoes){
+  const resp = await fetch(API + caminho, opcoes);
+  const dados = await resp.json();
+  if (!resp.ok) throw new Error(dados.erro || `HTTP ${resp.status}`);
+  return dados;
+}
+
 // ============================
 // Referências ao DOM
 // ============================
@@ -39,19 +54,6 @@ function chip(label){
   return s;
 }
 
-// chave padrão pra arestas não-direcionadas
-function edgeKey(u, v) {
-  return [String(u), String(v)].sort().join('::');
-}
-
-// procura aresta (u,v) no estado
-function getEdgeData(u, v) {
-  return state.E.find(e =>
-    (e.u === u && e.v === v) ||
-    (e.u === v && e.v === u)
-  ) || null;
-}
-
 // ============================================================
 // ANIMAÇÃO do ponto na rota
 // ============================================================
@@ -149,69 +151,29 @@ function startAnimation(){
 }
 
 // ============================================================
-// DIJKSTRA
+// ROTA (calculada no servidor)
 // ============================================================
-function dijkstra(start, goal){
-  const adj = {};
-  for (const v of state.V.keys()) adj[v] = [];
-
-  for (const e of state.E) {
-    const w = +e.peso;
-    if (!Number.isFinite(w)) continue;
-    adj[e.u].push([e.v, w]);
-    adj[e.v].push([e.u, w]);
-  }
-
-  const dist = Object.fromEntries([...state.V.keys()].map(x=>[x,Infinity]));
-  const prev = Object.fromEntries([...state.V.keys()].map(x=>[x,null]));
-
-  dist[start] = 0;
-  const pq = [[0, start]];
-
-  const popMin = () => {
-    let k = 0;
-    for (let i = 1; i < pq.length; i++) if (pq[i][0] < pq[k][0]) k = i;
-    return pq.splice(k, 1)[0];
-  };
-
-  while (pq.length) {
-    const [d, u] = popMin();
-    if (u === goal) break;
-    if (d !== dist[u]) continue;
-    for (const [v, w] of adj[u]) {
-      const nd = d + w;
-      if (nd < dist[v]) {
-        dist[v] = nd;
-        prev[v] = u;
-        pq.push([nd, v]);
-      }
-    }
-  }
-
-  if (!isFinite(dist[goal])) return {path:[], cost:Infinity};
-
-  const path = [];
-  for (let cur = goal; cur != null; cur = prev[cur]) path.push(cur);
-  return { path: path.reverse(), cost: dist[goal] };
+async function calcularRota(origemId, destinoId){
+  const params = new URLSearchParams({ origem: origemId, destino: destinoId });
+  const r = await api('/api/rota?' + params);
+  state.path = r.caminho ? r.caminho.map(String) : [];
+  state.cost = r.caminho ? r.custo : Infinity;
+  state.detalhes = r.detalhes || [];
+  showResult();
+  render();
+  startAnimation();
+  if (!r.caminho) alert("Não existe caminho entre os pontos escolhidos.");
 }
 
 // ============================================================
-// CARREGAR GRAFO + PESOS
+// CARREGAR MAPA
 // ============================================================
-async function carregarDoArquivoPadrao(){
+async function carregarMapa(){
   try {
-    const [respG, respP] = await Promise.all([
-      fetch('../dados/grafo_cidade.json'),
-      fetch('../dados/pesos_atuais.json')
-    ]);
-
-    const grafo = await respG.json();
-    const pesos = await respP.json();
-
-    loadGraph(grafo, pesos);
+    loadGraph(await api('/api/mapa'));
   }
   catch(err){
-    alert("Erro ao carregar os arquivos JSON.");
+    alert("Erro ao carregar o mapa do servidor de rotas (python servidor_rotas.py).");
     console.error(err);
   }
 }
@@ -219,11 +181,12 @@ async function carregarDoArquivoPadrao(){
 // ============================================================
 // MONTAR GRAFO EM MEMÓRIA
 // ============================================================
-function loadGraph(data, pesosData){
+function loadGraph(data){
   state.V.clear();
   state.E = [];
   state.path = [];
   state.cost = null;
+  state.detalhes = [];
   stopAnimation();
 
   // normalização
@@ -248,25 +211,13 @@ function loadGraph(data, pesosData){
     });
   }
 
-  // pesos
-  const pesosMap = new Map();
-  for (const e of pesosData.arestas || []) {
-    pesosMap.set(edgeKey(e.origem, e.destino), {
-      peso: e.peso,
-      motivo: e.motivo
-    });
-  }
-
+  // uma aresta por rua, já com o peso atual
   for (const e of data.arestas) {
-    const u = String(e.origem);
-    const v = String(e.destino);
-
-    const meta = pesosMap.get(edgeKey(u, v)) || {};
-
     state.E.push({
-      u, v,
-      peso: meta.peso,
-      motivo: meta.motivo || "—"
+      u: String(e.origem),
+      v: String(e.destino),
+      peso: e.peso,
+      motivo: e.motivo || "—"
     });
   }
 
@@ -334,14 +285,12 @@ function showResult(){
   const lista = document.createElement("ol");
   lista.className = "rota-lista";
 
-  for (let i=0; i < state.path.length-1; i++){
-    const u = state.path[i];
-    const v = state.path[i+1];
-    const e = getEdgeData(u, v);
+  for (let i=0; i < state.detalhes.length; i++){
+    const e = state.detalhes[i];
 
     const li = document.createElement("li");
     li.innerHTML =
-      `<strong>${state.V.get(u).nome} → ${state.V.get(v).nome}</strong><br>
+      `<strong>${e.origem} → ${e.destino}</strong><br>
        Peso: ${e.peso}<br>
        Condição: ${e.motivo}`;
     lista.appendChild(li);
@@ -512,17 +461,13 @@ function enableDrag(g){
 // EVENTOS
 // ============================================================
 document.getElementById('btnCalcular').addEventListener('click', ()=>{
-  const {path, cost} = dijkstra(origem.value, destino.value);
-  state.path = path;
-  state.cost = cost;
-  showResult();
-  render();
-  startAnimation();
+  calcularRota(origem.value, destino.value).catch(err => alert(err.message));
 });
 
 document.getElementById('btnLimpar').addEventListener('click', ()=>{
   state.path = [];
   state.cost = null;
+  state.detalhes = [];
   stopAnimation();
   showResult();
   render();
@@ -558,22 +503,27 @@ document.getElementById('btnAutoLayout').addEventListener('click', ()=>{
   render();
 });
 
-// GERAR NOVOS PESOS
-document.getElementById('btnGerarPesos').addEventListener('click', ()=>{
-  for (const e of state.E) {
-    const j = Math.random()*1.2 - 0.6;
-    e.peso = Math.max(1, +(e.peso + j).toFixed(2));
-  }
+// GERAR NOVOS PESOS (no servidor; o mapa é recarregado com eles)
+document.getElementById('btnGerarPesos').addEventListener('click', async ()=>{
+  try {
+    const rota = state.path.length >= 2 ? [state.path[0], state.path.at(-1)] : null;
+    const layout = new Map([...state.V].map(([id, v]) => [id, {x: v.x, y: v.y}]));
 
-  render();
+    await api('/api/pesos', { method: 'POST' });
+    loadGraph(await api('/api/mapa'));
 
-  if (state.path.length >= 2){
-    const {path,cost} = dijkstra(state.path[0], state.path.at(-1));
-    state.path = path;
-    state.cost = cost;
-    showResult();
+    // mantém o layout manual/auto-layout da tela
+    for (const [id, p] of layout) {
+      const v = state.V.get(id);
+      if (v) Object.assign(v, p);
+    }
     render();
-    startAnimation();
+
+    if (rota) await calcularRota(...rota);
+  }
+  catch(err){
+    alert(err.message);
+    console.error(err);
   }
 });
 
@@ -594,4 +544,4 @@ function zoom(f){
 // ============================================================
 // BOOT
 // ============================================================
-carregarDoArquivoPadrao();
+carregarMapa();
@@ -0,0 +1,233 @@
+"""
+Módulo gerador_cidade.py
+Gera cidades sintéticas em grade, de mil a dez milhões de vértices
+
+O grafo padrão (criar_grafo_padrao) tem só 26 vértices; para medir
+desempenho é preciso um mapa do tamanho do real. Aqui a cidade é uma grade
+de linhas x colunas de cruzamentos, com diagonais em alguns quarteirões,
+ruas removidas ao acaso, ruas de mão única e coordenadas levemente
+deslocadas. Tudo é sorteado de uma vez com NumPy (mesma semente, mesma
+cidade) e os arrays CSR são montados direto, sem passar por
+adicionar_aresta aresta por aresta.
+
+Uso:
+    python gerador_cidade.py LINHAS COLUNAS [--semente N] [--formato json|binario|sqlite]
+                             [--compressao gzip|lzma] [--dados DIRETORIO]
+"""
+
+import argparse
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+
+from gerador_pesos import GeradorPesos
+from grafo_csr import GrafoCSR
+from persistencia import SistemaPersistencia
+
+
+FORMATOS = ('json', 'binario', 'sqlite')
+
+
+class NomesGrade(Sequence):
+    """Nomes dos cruzamentos da grade, gerados sob demanda (sem lista em memória)"""
+
+    def __init__(self, linhas, colunas):
+        self.linhas = linhas
+        self.colunas = colunas
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        linha, coluna = divmod(i, self.colunas)
+        return f"Rua {linha + 1} com Avenida {coluna + 1}"
+
+    def __len__(self):
+        return self.linhas * self.colunas
+
+
+# Tipo NumPy equivalente a cada código de array.array usado no CSR
+_TIPOS_NUMPY = {'i': np.int32, 'q': np.int64, 'd': np.float64, 'H': np.uint16}
+
+
+def _array(dados, tipo):
+    """Copia um array NumPy para um array.array do tipo dado"""
+    resultado = array(tipo)
+    resultado.frombytes(np.ascontiguousarray(dados, dtype=_TIPOS_NUMPY[tipo]).tobytes())
+    return resultado
+
+
+def gerar_cidade(linhas, colunas, semente=None, diagonais=0.15, remocao=0.05,
+                 mao_unica=0.1, perturbacao=0.25, espacamento=3, condicoes=True):
+    """
+    Gera uma cidade em grade já no formato compacto
+
+    O cruzamento da linha l e coluna c tem id "L{l}C{c}" e fica em
+    ((c + 1) * espacamento, (linhas - l) * espacamento), como na grade do
+    grafo padrão, deslocado ao acaso em até perturbacao * espacamento.
+
+    Args:
+        linhas: quantidade de linhas da grade
+        colunas: quantidade de colunas da grade
+        semente: semente do sorteio (None = aleatória)
+        diagonais: chance de um quarteirão ganhar uma rua diagonal
+        remocao: chance de cada rua ser removida
+        mao_unica: chance de cada rua restante ser de mão única
+        perturbacao: deslocamento máximo das coordenadas, em espaçamentos
+            (0 = grade exata, coordenadas inteiras)
+        espacamento: distância entre cruzamentos vizinhos
+        condicoes: se True, sorteia condição e peso de cada rua como o
+            GeradorPesos; senão todas ficam com peso 1 e "Condição normal"
+
+    Returns:
+        objeto GrafoCSR
+    """
+    if linhas < 1 or colunas < 1:
+        raise ValueError(f"A grade precisa de ao menos 1 linha e 1 coluna (recebido {linhas}x{colunas})")
+    for nome, chance in (('diagonais', diagonais), ('remocao', remocao), ('mao_unica', mao_unica)):
+        if not 0 <= chance <= 1:
+            raise ValueError(f"{nome} deve estar entre 0 e 1 (recebido {chance})")
+
+    gerador = np.random.default_rng(semente)
+    n = linhas * colunas
+    grade = np.arange(n, dtype=np.int64).reshape(linhas, colunas)
+
+    # Ruas candidatas (a, b) com a < b: horizontais, verticais e diagonais
+    quarteiroes = grade[:-1, :-1].ravel()
+    com_diagonal = quarteiroes[gerador.random(quarteiroes.size) < diagonais]
+    descendo = gerador.random(com_diagonal.size) < 0.5
+    a = np.concatenate((
+        grade[:, :-1].ravel(),
+        grade[:-1, :].ravel(),
+        np.where(descendo, com_diagonal, com_diagonal + 1),
+    ))
+    b = np.concatenate((
+        grade[:, 1:].ravel(),
+        grade[1:, :].ravel(),
+        np.where(descendo, com_diagonal + colunas + 1, com_diagonal + colunas),
+    ))
+
+    mantidas = gerador.random(a.size) >= remocao
+    a = a[mantidas]
+    b = b[mantidas]
+    ruas = a.size
+
+    # Mão única: só a -> b ou só b -> a, meio a meio
+    unica = gerador.random(ruas) < mao_unica
+    sentido = gerador.random(ruas) < 0.5
+    ida = ~(unica & ~sentido)
+    volta = ~(unica & sentido)
+
+    if condicoes:
+        codigos, pesos = GeradorPesos.sortear_vetorizado(gerador.random(ruas), gerador.random(ruas))
+        motivos = GeradorPesos.motivos()
+    else:
+        codigos = np.full(ruas, 0, dtype=np.int64)
+        pesos = np.ones(ruas, dtype=np.int64)
+        motivos = ["Condição normal"]
+
+    origens = np.concatenate((a[ida], b[volta]))
+    destinos = np.concatenate((b[ida], a[volta]))
+    pesos = np.concatenate((pesos[ida], pesos[volta]))
+    codigos = np.concatenate((codigos[ida], codigos[volta]))
+    del a, b, ida, volta, unica, sentido
+
+    # Ordena por (origem, destino): cada linha do CSR sai ordenada pelo destino
+    ordem = np.argsort(origens * n + destinos)
+    origens = origens[ordem]
+    deslocamentos = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(origens, minlength=n), out=deslocamentos[1:])
+    del origens
+
+    colunas_grade = np.tile(np.arange(colunas, dtype=np.float64), linhas)
+    linhas_grade = np.repeat(np.arange(linhas, dtype=np.float64), colunas)
+    xs = (colunas_grade + 1) * espacamento
+    ys = (linhas - linhas_grade) * espacamento
+    if perturbacao:
+        # Arredondadas para o JSON não carregar 17 dígitos por coordenada
+        xs = np.round(xs + (gerador.random(n) * 2 - 1) * perturbacao * espacamento, 3)
+        ys = np.round(ys + (gerador.random(n) * 2 - 1) * perturbacao * espacamento, 3)
+        tipo_coordenadas = 'd'
+    else:
+        tipo_coordenadas = 'q' if isinstance(espacamento, int) else 'd'
+
+    ids = [f"L{linha}C{coluna}" for linha in range(linhas) for coluna in range(colunas)]
+    return GrafoCSR(
+        ids,
+        NomesGrade(linhas, colunas),
+        _array(xs, tipo_coordenadas),
+        _array(ys, tipo_coordenadas),
+        _array(deslocamentos, 'q'),
+        _array(destinos[ordem], 'i'),
+        _array(pesos[ordem], 'q'),
+        _array(codigos[ordem], 'H'),
+        motivos
+    )
+
+
+def salvar_cidade(csr, diretorio_dados, formato='json', compressao=None):
+    """
+    Grava a cidade gerada em um dos formatos do sistema
+
+    Args:
+        csr: objeto GrafoCSR (de gerar_cidade)
+        diretorio_dados: diretório dos dados
+        formato: 'json' (grafo_cidade.json + pesos_atuais.json),
+            'binario' (grafo_cidade.bin) ou 'sqlite' (mapa.db)
+        compressao: None, 'gzip' ou 'lzma' (só no formato json)
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato!r} (opções: {', '.join(FORMATOS)})")
+
+    if formato == 'binario':
+        SistemaPersistencia(diretorio_dados).salvar_grafo_binario(csr)
+        return
+
+    persistencia = SistemaPersistencia(
+        diretorio_dados,
+        armazenamento='sqlite' if formato == 'sqlite' else 'json',
+        compressao=compressao
+    )
+    try:
+        persistencia.salvar_estado(csr.como_grafo())
+    finally:
+        persistencia.fechar()
+
+
+def main(argumentos=None):
+    """
+    Gera e grava uma cidade pela linha de comando
+
+    Args:
+        argumentos: lista de argumentos (None = sys.argv)
+
+    Returns:
+        código de saída (0 = sucesso)
+    """
+    parser = argparse.ArgumentParser(description="Gera uma cidade sintética em grade para testes de carga")
+    parser.add_argument('linhas', type=int, help="linhas da grade")
+    parser.add_argument('colunas', type=int, help="colunas da grade")
+    parser.add_argument('--semente', type=int, default=None, help="semente do sorteio (padrão: aleatória)")
+    parser.add_argument('--formato', choices=FORMATOS, default='json', help="formato gravado (padrão: json)")
+    parser.add_argument('--compressao', choices=('gzip', 'lzma'), default=None, help="compressão do JSON")
+    parser.add_argument('--sem-condicoes', action='store_true', help="todas as ruas com peso 1")
+    parser.add_argument('--dados', default='dados', help="diretório dos dados (padrão: dados)")
+    args = parser.parse_args(argumentos)
+
+    inicio = time.perf_counter()
+    csr = gerar_cidade(args.linhas, args.colunas, args.semente, condicoes=not args.sem_condicoes)
+    gerado = time.perf_counter()
+    print(f"Cidade {args.linhas}x{args.colunas}: {csr.num_vertices} vértices, "
+          f"{csr.num_arestas} arestas dirigidas ({gerado - inicio:.1f}s)")
+
+    salvar_cidade(csr, args.dados, args.formato, args.compressao)
+    print(f"✅ Gravada em {args.dados} ({args.formato}, {time.perf_counter() - gerado:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
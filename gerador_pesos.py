@@ -3,7 +3,28 @@ Módulo gerador_pesos.py
 Gera pesos aleatórios com motivos/justificativas para as condições das ruas
 """
 
+import functools
+import hashlib
 import random
+import weakref
+from array import array
+
+import numpy as np
+
+from grafo_csr import GrafoCSR
+
+# Incremento do SplitMix64 (parte fracionária da proporção áurea em 64 bits)
+_PROPORCAO_AUREA = 0x9E3779B97F4A7C15
+
+# Chaves das ruas de cada GrafoCSR, na ordem de GeradorPesos._ruas (a
+# estrutura de um GrafoCSR não muda; só os pesos)
+_chaves_grafos = weakref.WeakKeyDictionary()
+
+
+@functools.lru_cache(maxsize=1 << 20)
+def _chave_vertice(v_id):
+    """Identificador de 64 bits de um vértice (resumo do id como texto)"""
+    return int.from_bytes(hashlib.blake2b(str(v_id).encode('utf-8'), digest_size=8).digest(), 'little')
 
 
 class GeradorPesos:
@@ -100,6 +121,243 @@ class GeradorPesos:
                 bidirecional=True
             )
     
+    @staticmethod
+    def sortear_vetorizado(sorteios_condicao, sorteios_peso):
+        """
+        Converte sorteios uniformes em condições e pesos, com a mesma regra
+        de gerar_peso_e_motivo (faixas acumuladas e inteiro uniforme no
+        intervalo da condição)
+        
+        Serve a quem já tem os seus próprios números aleatórios (um
+        numpy.random.Generator, por exemplo) e quer pesos com a mesma
+        distribuição do gerador, como o gerador_cidade.
+        
+        Args:
+            sorteios_condicao: array de números em [0, 1) que escolhem a condição
+            sorteios_peso: array de números em [0, 1) que escolhem o peso
+            
+        Returns:
+            tupla (indices, pesos): índice em CONDICOES de cada sorteio
+            (len(CONDICOES) = "Condição normal", o fallback) e peso inteiro;
+            o motivo de cada índice está em motivos()
+        """
+        condicoes = GeradorPesos.CONDICOES
+        acumulado = np.cumsum([c['probabilidade'] for c in condicoes])
+        minimos = np.array([c['peso_min'] for c in condicoes] + [5], dtype=np.int64)
+        amplitudes = np.array([c['peso_max'] - c['peso_min'] + 1 for c in condicoes] + [1], dtype=np.int64)
+        
+        # Primeira faixa com rand <= acumulado, como no laço original
+        indices = np.searchsorted(acumulado, sorteios_condicao, side='left')
+        pesos = minimos[indices] + (sorteios_peso * amplitudes[indices]).astype(np.int64)
+        return indices, pesos
+    
+    @staticmethod
+    def motivos():
+        """
+        Motivo de cada índice de condição devolvido por sortear_vetorizado
+        
+        Returns:
+            lista com o tipo de cada condição de CONDICOES, na mesma ordem,
+            seguida de "Condição normal" (o fallback)
+        """
+        return [c['tipo'] for c in GeradorPesos.CONDICOES] + ["Condição normal"]
+    
+    @staticmethod
+    def _ruas(grafo):
+        """
+        Lista as ruas (pares não dirigidos) do grafo
+        
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+            
+        Returns:
+            tupla (ruas, grupos): lista de (origem_id, destino_id) e, nos
+            grafos compactos, a rua de cada posição dos arrays CSR (None no Grafo)
+        """
+        csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+        if csr is None:
+            return [(a['origem'], a['destino']) for a in grafo.obter_todas_arestas()], None
+        
+        n = csr.num_vertices
+        origens = np.repeat(np.arange(n, dtype=np.int64), np.diff(np.frombuffer(csr.deslocamentos, dtype=np.int64)))
+        destinos = np.frombuffer(csr.vizinhos, dtype=np.int32).astype(np.int64)
+        chaves = np.minimum(origens, destinos) * n + np.maximum(origens, destinos)
+        unicas, grupos = np.unique(chaves, return_inverse=True)
+        ids = csr.ids
+        return [(ids[chave // n], ids[chave % n]) for chave in unicas.tolist()], grupos
+    
+    @staticmethod
+    def _escrever_pesos(grafo, ruas, indices, pesos, grupos=None):
+        """
+        Grava condições e pesos sorteados nos dois sentidos de cada rua
+        
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+            ruas: lista de (origem_id, destino_id)
+            indices: índice da condição de cada rua (ver sortear_vetorizado)
+            pesos: peso de cada rua
+            grupos: rua de cada posição dos arrays CSR, quando ruas cobre o
+                grafo inteiro (ver _ruas); a troca é então feita de uma vez,
+                sem localizar aresta por aresta
+        """
+        motivos = GeradorPesos.motivos()
+        csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+        
+        if csr is not None:
+            # Direto nos arrays: sem dicionários nem observadores
+            codigos = np.array([csr.codigo_motivo(m) for m in motivos], dtype=np.uint16)
+            if grupos is not None:
+                novos_pesos = pesos[grupos]
+                novas_condicoes = codigos[indices[grupos]]
+            else:
+                novos_pesos = np.array(csr.pesos)
+                novas_condicoes = np.array(csr.condicoes, dtype=np.uint16)
+                for (origem_id, destino_id), indice, peso in zip(ruas, indices.tolist(), pesos.tolist()):
+                    for k in (csr._localizar(origem_id, destino_id), csr._localizar(destino_id, origem_id)):
+                        if k >= 0:
+                            novos_pesos[k] = peso
+                            novas_condicoes[k] = codigos[indice]
+            array_pesos = array('q' if novos_pesos.dtype.kind == 'i' else 'd')
+            array_pesos.frombytes(novos_pesos.tobytes())
+            array_condicoes = array('H')
+            array_condicoes.frombytes(novas_condicoes.tobytes())
+            csr.substituir_pesos(array_pesos, array_condicoes)
+            return
+        
+        for (origem_id, destino_id), indice, peso in zip(ruas, indices.tolist(), pesos.tolist()):
+            motivo = motivos[indice]
+            for chave in ((origem_id, destino_id), (destino_id, origem_id)):
+                dados = grafo.indice_arestas.get(chave)
+                if dados is not None:
+                    dados['peso'] = peso
+                    dados['motivo'] = motivo
+        # Os observadores são dispensados; a versão nova avisa quem guarda resultados
+        grafo.versao += 1
+    
+    @staticmethod
+    def gerar_pesos_vetorizado(grafo, semente=None):
+        """
+        Gera novos pesos para todas as arestas de uma vez, com NumPy
+        
+        Mesma distribuição de gerar_pesos_para_grafo, mas todas as condições
+        e pesos saem de um único sorteio e vão direto para o armazenamento:
+        em um GrafoCompacto/GrafoCSR, para os arrays de pesos e condições.
+        Os observadores do grafo não são chamados; caches e árvores percebem
+        a troca pela versão do grafo.
+        
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+            semente: semente do gerador (None = aleatória); a mesma semente
+                no mesmo grafo reproduz os mesmos pesos
+        """
+        gerador = np.random.default_rng(semente)
+        ruas, grupos = GeradorPesos._ruas(grafo)
+        indices, pesos = GeradorPesos.sortear_vetorizado(gerador.random(len(ruas)), gerador.random(len(ruas)))
+        GeradorPesos._escrever_pesos(grafo, ruas, indices, pesos, grupos)
+    
+    @staticmethod
+    def _misturar(z):
+        """Finalizador do SplitMix64: espalha os bits de um array uint64"""
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+    
+    @staticmethod
+    def _chaves_ruas(ruas):
+        """
+        Identificador de 64 bits de cada rua, que não depende do sentido nem
+        da posição dos vértices no grafo
+        
+        Só os vértices passam pelo blake2b (uma vez cada, com cache); as
+        duas chaves de cada rua são combinadas de uma vez, com o SplitMix64,
+        em ordem crescente para o sentido não importar.
+        """
+        ruas = list(ruas)
+        origens = np.fromiter((_chave_vertice(a) for a, _ in ruas), dtype=np.uint64, count=len(ruas))
+        destinos = np.fromiter((_chave_vertice(b) for _, b in ruas), dtype=np.uint64, count=len(ruas))
+        misturar = GeradorPesos._misturar
+        return misturar(np.minimum(origens, destinos) ^ misturar(np.maximum(origens, destinos)))
+    
+    @staticmethod
+    def _chaves_grafo(grafo, ruas):
+        """
+        Chaves de todas as ruas do grafo (ruas = GeradorPesos._ruas(grafo)),
+        guardadas para os próximos cenários quando o grafo é compacto
+        """
+        csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+        if csr is None:
+            # A estrutura de um Grafo comum pode mudar: nada é guardado
+            return GeradorPesos._chaves_ruas(ruas)
+        chaves = _chaves_grafos.get(csr)
+        if chaves is None:
+            chaves = _chaves_grafos[csr] = GeradorPesos._chaves_ruas(ruas)
+        return chaves
+    
+    @staticmethod
+    def sortear_ruas(semente, ruas):
+        """
+        Sorteia condição e peso de cada rua de um cenário, sem estado global
+        
+        Cada sorteio é uma função pura de (semente do cenário, rua, contador),
+        como nos geradores baseados em contador (Philox, Threefry): a rua
+        recebe sempre o mesmo resultado, qualquer que seja a ordem, o
+        subconjunto ou o processo em que for sorteada.
+        
+        Args:
+            semente: inteiro que identifica o cenário
+            ruas: lista de (origem_id, destino_id); o sentido não importa
+            
+        Returns:
+            tupla (indices, pesos), como sortear_vetorizado
+        """
+        return GeradorPesos.sortear_chaves(semente, GeradorPesos._chaves_ruas(ruas))
+    
+    @staticmethod
+    def sortear_chaves(semente, chaves):
+        """
+        Sorteio baseado em contador para identificadores de 64 bits quaisquer
+        
+        Args:
+            semente: inteiro que identifica o cenário
+            chaves: array uint64 (de qualquer formato) com um identificador
+                por sorteio
+            
+        Returns:
+            tupla (indices, pesos) com o mesmo formato de chaves
+        """
+        fluxo = GeradorPesos._misturar(chaves ^ GeradorPesos._misturar(np.array([semente % 2**64], dtype=np.uint64)))
+        sorteios = []
+        for contador in (1, 2):
+            bits = GeradorPesos._misturar(fluxo + np.uint64(contador * _PROPORCAO_AUREA % 2**64))
+            # 53 bits mais altos -> real uniforme em [0, 1)
+            sorteios.append((bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53)
+        return GeradorPesos.sortear_vetorizado(*sorteios)
+    
+    @staticmethod
+    def gerar_pesos_cenario(grafo, semente, ruas=None):
+        """
+        Gera os pesos de um cenário reproduzível, rua a rua
+        
+        O resultado de cada rua depende só da semente e da própria rua, então
+        o cenário pode ser dividido entre processos (cada um chama
+        sortear_ruas com a sua parte) ou refeito só num bairro, sem mudar as
+        demais ruas.
+        
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+            semente: inteiro que identifica o cenário
+            ruas: lista de (origem_id, destino_id) a regenerar (None = todas);
+                as outras ruas mantêm os pesos atuais
+        """
+        if ruas is None:
+            ruas, grupos = GeradorPesos._ruas(grafo)
+            chaves = GeradorPesos._chaves_grafo(grafo, ruas)
+        else:
+            ruas, grupos = list(ruas), None
+            chaves = GeradorPesos._chaves_ruas(ruas)
+        indices, pesos = GeradorPesos.sortear_chaves(semente, chaves)
+        GeradorPesos._escrever_pesos(grafo, ruas, indices, pesos, grupos)
+    
     @staticmethod
     def exibir_estatisticas_condicoes():
         """Exibe as estatísticas das condições possíveis"""
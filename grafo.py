@@ -89,6 +89,18 @@ class Grafo:
         """Inicializa um grafo vazio"""
         self.vertices = {}  # dicionário: id -> Vertice
         self.adjacencias = {}  # dicionário: id -> lista de (vizinho_id, peso, motivo)
+        # Índice (origem_id, destino_id) -> dicionário da aresta na lista de adjacências.
+        # Aponta para o mesmo objeto da lista, então consultas e atualizações são O(1)
+        self.indice_arestas = {}
+        # Adjacência reversa: id -> lista de (origem_id, aresta), onde aresta é o
+        # mesmo dicionário guardado em adjacencias[origem_id]. Usada em buscas
+        # que andam para trás a partir do destino (respeita ruas de mão única)
+        self.antecessores = {}
+        # Contador incrementado a cada mudança de vértices, arestas ou pesos; permite
+        # que caches derivados (heurísticas, rotas) saibam quando expiraram
+        self.versao = 0
+        # Funções chamadas a cada peso alterado (ver adicionar_observador)
+        self.observadores = []
     
     def adicionar_vertice(self, vertice):
         """
@@ -100,6 +112,8 @@ class Grafo:
         if vertice.id not in self.vertices:
             self.vertices[vertice.id] = vertice
             self.adjacencias[vertice.id] = []
+            self.antecessores[vertice.id] = []
+            self.versao += 1
     
     def adicionar_aresta(self, origem_id, destino_id, peso=1, motivo="Condição normal", bidirecional=True):
         """
@@ -114,19 +128,24 @@ class Grafo:
         """
         if origem_id in self.vertices and destino_id in self.vertices:
             # Adiciona aresta de origem para destino
-            self.adjacencias[origem_id].append({
-                'destino': destino_id,
-                'peso': peso,
-                'motivo': motivo
-            })
+            self._inserir_aresta(origem_id, destino_id, peso, motivo)
             
             # Se bidirecional, adiciona aresta de destino para origem
             if bidirecional:
-                self.adjacencias[destino_id].append({
-                    'destino': origem_id,
-                    'peso': peso,
-                    'motivo': motivo
-                })
+                self._inserir_aresta(destino_id, origem_id, peso, motivo)
+    
+    def _inserir_aresta(self, origem_id, destino_id, peso, motivo):
+        """Insere uma aresta dirigida na lista de adjacências e no índice"""
+        aresta = {
+            'destino': destino_id,
+            'peso': peso,
+            'motivo': motivo
+        }
+        self.adjacencias[origem_id].append(aresta)
+        self.antecessores[destino_id].append((origem_id, aresta))
+        # Em arestas paralelas vale a primeira, como na busca linear original
+        self.indice_arestas.setdefault((origem_id, destino_id), aresta)
+        self.versao += 1
     
     def obter_vizinhos(self, vertice_id):
         """
@@ -140,6 +159,19 @@ class Grafo:
         """
         return self.adjacencias.get(vertice_id, [])
     
+    def obter_antecessores(self, vertice_id):
+        """
+        Retorna as arestas que chegam em um vértice
+        
+        Args:
+            vertice_id: id do vértice
+            
+        Returns:
+            lista de tuplas (origem_id, aresta), com aresta no mesmo formato
+            de obter_vizinhos (peso e motivo sempre atualizados)
+        """
+        return self.antecessores.get(vertice_id, [])
+    
     def obter_peso(self, origem_id, destino_id):
         """
         Retorna o peso da aresta entre dois vértices
@@ -151,11 +183,8 @@ class Grafo:
         Returns:
             peso da aresta ou None se não existir
         """
-        vizinhos = self.obter_vizinhos(origem_id)
-        for vizinho in vizinhos:
-            if vizinho['destino'] == destino_id:
-                return vizinho['peso']
-        return None
+        aresta = self.indice_arestas.get((origem_id, destino_id))
+        return aresta['peso'] if aresta is not None else None
     
     def obter_motivo(self, origem_id, destino_id):
         """
@@ -168,11 +197,21 @@ class Grafo:
         Returns:
             motivo da aresta ou None se não existir
         """
-        vizinhos = self.obter_vizinhos(origem_id)
-        for vizinho in vizinhos:
-            if vizinho['destino'] == destino_id:
-                return vizinho['motivo']
-        return None
+        aresta = self.indice_arestas.get((origem_id, destino_id))
+        return aresta['motivo'] if aresta is not None else None
+    
+    def obter_aresta(self, origem_id, destino_id):
+        """
+        Retorna os dados da aresta entre dois vértices em uma única consulta
+        
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            
+        Returns:
+            dicionário com destino, peso e motivo ou None se não existir
+        """
+        return self.indice_arestas.get((origem_id, destino_id))
     
     def atualizar_peso(self, origem_id, destino_id, novo_peso, novo_motivo, bidirecional=True):
         """
@@ -185,22 +224,44 @@ class Grafo:
             novo_motivo: novo motivo do peso
             bidirecional: se True, atualiza nos dois sentidos
         """
+        self.versao += 1
+        
         # Atualiza de origem para destino
-        vizinhos = self.adjacencias.get(origem_id, [])
-        for vizinho in vizinhos:
-            if vizinho['destino'] == destino_id:
-                vizinho['peso'] = novo_peso
-                vizinho['motivo'] = novo_motivo
-                break
+        aresta = self.indice_arestas.get((origem_id, destino_id))
+        if aresta is not None:
+            peso_antigo = aresta['peso']
+            aresta['peso'] = novo_peso
+            aresta['motivo'] = novo_motivo
+            self._notificar(origem_id, destino_id, peso_antigo, novo_peso)
         
         # Se bidirecional, atualiza de destino para origem
         if bidirecional:
-            vizinhos = self.adjacencias.get(destino_id, [])
-            for vizinho in vizinhos:
-                if vizinho['destino'] == origem_id:
-                    vizinho['peso'] = novo_peso
-                    vizinho['motivo'] = novo_motivo
-                    break
+            aresta = self.indice_arestas.get((destino_id, origem_id))
+            if aresta is not None:
+                peso_antigo = aresta['peso']
+                aresta['peso'] = novo_peso
+                aresta['motivo'] = novo_motivo
+                self._notificar(destino_id, origem_id, peso_antigo, novo_peso)
+    
+    def adicionar_observador(self, observador):
+        """
+        Registra uma função a ser chamada sempre que o peso de uma aresta mudar
+        
+        Args:
+            observador: função observador(origem_id, destino_id, peso_antigo, novo_peso),
+                chamada uma vez por sentido atualizado, já com a versão nova
+        """
+        self.observadores.append(observador)
+    
+    def remover_observador(self, observador):
+        """Remove um observador registrado com adicionar_observador"""
+        if observador in self.observadores:
+            self.observadores.remove(observador)
+    
+    def _notificar(self, origem_id, destino_id, peso_antigo, novo_peso):
+        """Avisa os observadores sobre a mudança de peso de uma aresta dirigida"""
+        for observador in self.observadores:
+            observador(origem_id, destino_id, peso_antigo, novo_peso)
     
     def obter_todas_arestas(self):
         """
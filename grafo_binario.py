@@ -0,0 +1,282 @@
+"""
+Módulo grafo_binario.py
+Instantâneo binário do grafo, carregado por mapeamento de memória (mmap)
+
+O arquivo guarda os arrays do GrafoCSR exatamente como ficam na memória:
+um cabeçalho, uma tabela de seções e, em seguida, os arrays de vértices,
+arestas (CSR), pesos e condições, mais tabelas de textos para ids, nomes e
+motivos. Ao carregar, cada array vira uma memoryview sobre o arquivo
+mapeado, sem cópia nem decodificação: só os ids e os motivos são convertidos
+em objetos Python. Processos que mapeiam o mesmo arquivo compartilham as
+mesmas páginas físicas (o cache de páginas do sistema).
+
+O mapeamento é copy-on-write (mmap.ACCESS_COPY): uma mudança de peso altera
+apenas a página tocada, e só no processo que a fez; o arquivo não muda.
+
+Formato (inteiros little-endian no cabeçalho):
+    'CSR1', versão do formato (uint8), ordem dos bytes dos arrays (uint8,
+    0 = little, 1 = big), opções (uint16; bit 0 = ids gravados em JSON),
+    vértices, arestas e motivos (uint64), sequência do registro de pesos
+    incluída nos pesos (uint64; só a partir da versão 2; na 1 vale 0), e
+    uma entrada por seção de SECOES:
+    código de tipo (1 byte + 7 de alinhamento), posição e quantidade de
+    itens (uint64). Cada seção começa em posição múltipla de 8.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from grafo_csr import GrafoCSR, tipo_array
+
+
+ASSINATURA_ARQUIVO = b'CSR1'
+VERSAO_FORMATO = 2
+
+SECOES = (
+    'deslocamentos', 'vizinhos', 'pesos', 'condicoes', 'xs', 'ys',
+    'ids', 'ids_limites', 'nomes', 'nomes_limites', 'motivos', 'motivos_limites'
+)
+
+_CABECALHO = struct.Struct('<4sBBHQQQQ')
+# Cabeçalho da versão 1, sem a sequência do registro
+_CABECALHO_V1 = struct.Struct('<4sBBHQQQ')
+_SECAO = struct.Struct('<c7xQQ')
+_ALINHAMENTO = 8
+_IDS_JSON = 1
+
+
+def _tabela_textos(textos):
+    """
+    Empacota uma lista de textos para gravação
+
+    Cada texto é gravado em UTF-8 seguido de um byte nulo; os limites
+    permitem ler um texto isolado sem percorrer os anteriores.
+
+    Returns:
+        tupla (bytes, array('q') com len(textos)+1 limites)
+    """
+    partes = []
+    limites = array('q', [0])
+    for texto in textos:
+        dados = texto.encode('utf-8') + b'\0'
+        if b'\0' in dados[:-1]:
+            raise ValueError(f"Texto com caractere nulo não pode ser gravado: {texto!r}")
+        partes.append(dados)
+        limites.append(limites[-1] + len(dados))
+    return b''.join(partes), limites
+
+
+def _ler_textos(dados):
+    """Decodifica de uma vez todos os textos de uma tabela"""
+    if not len(dados):
+        return []
+    return str(dados[:-1], 'utf-8').split('\0')
+
+
+def _identidade(arquivo):
+    """Identifica o conteúdo atual do arquivo (inode, tamanho e data)"""
+    try:
+        estado = os.stat(arquivo)
+    except OSError:
+        return None
+    return estado.st_dev, estado.st_ino, estado.st_size, estado.st_mtime_ns
+
+
+class TabelaTextos(Sequence):
+    """Lista somente leitura de textos decodificados sob demanda"""
+
+    def __init__(self, dados, limites):
+        """
+        Args:
+            dados: memoryview com os textos em UTF-8, cada um seguido de '\\0'
+            limites: memoryview('q') com o início de cada texto (e o fim do último)
+        """
+        self._dados = dados
+        self._limites = limites
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("índice fora da tabela de textos")
+        return str(self._dados[self._limites[i]:self._limites[i + 1] - 1], 'utf-8')
+
+    def __len__(self):
+        return len(self._limites) - 1
+
+
+class GrafoCSRMapeado(GrafoCSR):
+    """GrafoCSR cujos arrays são memoryviews sobre um arquivo mapeado"""
+
+    def __init__(self, arquivo, mapa, identidade, sequencia, *args):
+        """
+        Args:
+            arquivo: caminho absoluto do arquivo mapeado
+            mapa: objeto mmap (mantido vivo enquanto os arrays forem usados)
+            identidade: _identidade(arquivo) no momento do mapeamento
+            sequencia: última sequência do registro de pesos já incluída
+                nos pesos gravados
+            *args: argumentos do GrafoCSR
+        """
+        super().__init__(*args)
+        self.arquivo = arquivo
+        self.sequencia = sequencia
+        self._mapa = mapa
+        self._identidade = identidade
+
+    def em_memoria(self):
+        """
+        Copia os arrays para a memória do processo
+
+        Returns:
+            objeto GrafoCSR comum, independente do arquivo
+        """
+        csr = GrafoCSR(
+            list(self.ids), list(self.nomes),
+            array(tipo_array(self.xs), self.xs), array(tipo_array(self.ys), self.ys),
+            array('q', self.deslocamentos), array('i', self.vizinhos),
+            array(tipo_array(self.pesos), self.pesos), array('H', self.condicoes),
+            list(self.motivos)
+        )
+        csr.versao = self.versao
+        return csr
+
+    def __reduce__(self):
+        # Sem mudanças, outro processo simplesmente mapeia o mesmo arquivo
+        # (compartilhando as páginas); com pesos alterados, ou se o arquivo
+        # foi regravado desde então, vai uma cópia
+        if self.versao == 0 and _identidade(self.arquivo) == self._identidade:
+            return carregar_grafo_binario, (self.arquivo,)
+        return object.__new__, (GrafoCSR,), self.em_memoria().__dict__
+
+
+def salvar_grafo_binario(grafo, arquivo, sequencia=0):
+    """
+    Grava o instantâneo binário do grafo
+
+    O arquivo é escrito ao lado e depois renomeado: processos que já mapeiam
+    a versão anterior continuam lendo o arquivo antigo, intacto.
+
+    Args:
+        grafo: objeto GrafoCSR, GrafoCompacto ou Grafo
+        arquivo: caminho do arquivo
+        sequencia: última sequência do registro de pesos já aplicada ao
+            grafo (as posteriores são reaplicadas ao carregar)
+    """
+    csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+    if csr is None:
+        csr = GrafoCSR.from_grafo(grafo)
+
+    opcoes = 0
+    ids = csr.ids
+    if not all(isinstance(v_id, str) for v_id in ids):
+        opcoes |= _IDS_JSON
+        ids = [json.dumps(v_id, ensure_ascii=False) for v_id in ids]
+    textos_ids, limites_ids = _tabela_textos(ids)
+    textos_nomes, limites_nomes = _tabela_textos(csr.nomes)
+    textos_motivos, limites_motivos = _tabela_textos(csr.motivos)
+
+    secoes = {
+        'deslocamentos': csr.deslocamentos,
+        'vizinhos': csr.vizinhos,
+        'pesos': csr.pesos,
+        'condicoes': csr.condicoes,
+        'xs': csr.xs,
+        'ys': csr.ys,
+        'ids': textos_ids,
+        'ids_limites': limites_ids,
+        'nomes': textos_nomes,
+        'nomes_limites': limites_nomes,
+        'motivos': textos_motivos,
+        'motivos_limites': limites_motivos,
+    }
+
+    # Calcula a posição de cada seção logo após o cabeçalho
+    posicao = _CABECALHO.size + _SECAO.size * len(SECOES)
+    entradas = []
+    for nome in SECOES:
+        dados = memoryview(secoes[nome])
+        posicao += -posicao % _ALINHAMENTO
+        entradas.append((dados, posicao))
+        posicao += dados.nbytes
+
+    temporario = arquivo + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(_CABECALHO.pack(
+            ASSINATURA_ARQUIVO, VERSAO_FORMATO, 0 if sys.byteorder == 'little' else 1, opcoes,
+            csr.num_vertices, csr.num_arestas, len(csr.motivos), sequencia
+        ))
+        for dados, inicio in entradas:
+            f.write(_SECAO.pack(dados.format.encode('ascii'), inicio, len(dados)))
+        for dados, inicio in entradas:
+            f.write(b'\0' * (inicio - f.tell()))
+            f.write(dados)
+    os.replace(temporario, arquivo)
+
+
+def carregar_grafo_binario(arquivo):
+    """
+    Mapeia um instantâneo binário gravado por salvar_grafo_binario
+
+    Args:
+        arquivo: caminho do arquivo
+
+    Returns:
+        objeto GrafoCSRMapeado
+
+    Raises:
+        ValueError: se o arquivo não for um instantâneo válido para esta máquina
+    """
+    arquivo = os.path.abspath(arquivo)
+    with open(arquivo, 'rb') as f:
+        identidade = _identidade(arquivo)
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    if len(mapa) < _CABECALHO_V1.size:
+        raise ValueError(f"Arquivo binário truncado: {arquivo}")
+    assinatura, versao = struct.unpack_from('<4sB', mapa, 0)
+    if assinatura != ASSINATURA_ARQUIVO or versao not in (1, VERSAO_FORMATO):
+        raise ValueError(f"Arquivo não é um instantâneo binário do grafo (versão {VERSAO_FORMATO}): {arquivo}")
+    cabecalho = _CABECALHO if versao == VERSAO_FORMATO else _CABECALHO_V1
+    tamanho_tabela = cabecalho.size + _SECAO.size * len(SECOES)
+    if len(mapa) < tamanho_tabela:
+        raise ValueError(f"Arquivo binário truncado: {arquivo}")
+    if versao == VERSAO_FORMATO:
+        _, _, ordem, opcoes, n, m, k, sequencia = cabecalho.unpack_from(mapa, 0)
+    else:
+        _, _, ordem, opcoes, n, m, k = cabecalho.unpack_from(mapa, 0)
+        sequencia = 0
+    if ordem != (0 if sys.byteorder == 'little' else 1):
+        raise ValueError(f"Arquivo gravado em máquina com outra ordem de bytes: {arquivo}")
+
+    buffer = memoryview(mapa)
+    arrays = {}
+    for i, nome in enumerate(SECOES):
+        tipo, inicio, quantidade = _SECAO.unpack_from(mapa, cabecalho.size + i * _SECAO.size)
+        tipo = tipo.decode('ascii')
+        fim = inicio + quantidade * struct.calcsize(tipo)
+        if fim > len(mapa):
+            raise ValueError(f"Arquivo binário truncado: {arquivo}")
+        arrays[nome] = buffer[inicio:fim].cast(tipo)
+
+    ids = _ler_textos(arrays['ids'])
+    if opcoes & _IDS_JSON:
+        ids = [json.loads(v_id) for v_id in ids]
+    motivos = _ler_textos(arrays['motivos'])
+    if len(ids) != n or len(arrays['vizinhos']) != m or len(motivos) != k:
+        raise ValueError(f"Arquivo binário inconsistente: {arquivo}")
+
+    return GrafoCSRMapeado(
+        arquivo, mapa, identidade, sequencia,
+        ids, TabelaTextos(arrays['nomes'], arrays['nomes_limites']),
+        arrays['xs'], arrays['ys'],
+        arrays['deslocamentos'], arrays['vizinhos'], arrays['pesos'], arrays['condicoes'],
+        motivos
+    )
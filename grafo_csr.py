@@ -0,0 +1,698 @@
+"""
+Módulo grafo_csr.py
+Representação compacta do grafo em formato CSR (compressed sparse row)
+
+Os vértices recebem índices inteiros e as arestas dirigidas ficam em arrays
+contíguos (deslocamentos, vizinhos, pesos e códigos de condição), o que reduz
+muito o uso de memória em mapas grandes e acelera os laços de relaxamento
+do Dijkstra. A classe GrafoCompacto expõe a mesma API do Grafo sobre esses
+arrays.
+"""
+
+import hashlib
+import heapq
+import json
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from grafo import Vertice, Grafo
+from leitor_json import ler_registros
+
+
+def _array_numerico(valores):
+    """
+    Cria um array compacto para uma sequência de números
+
+    Args:
+        valores: sequência de números
+
+    Returns:
+        array de inteiros ('q') se todos forem inteiros, senão de reais ('d')
+    """
+    valores = list(valores)
+    if all(isinstance(v, int) for v in valores):
+        return array('q', valores)
+    return array('d', valores)
+
+
+def tipo_array(dados):
+    """
+    Código de tipo de um array de números
+
+    Os arrays do grafo podem ser array.array ou memoryview (quando mapeados
+    de um arquivo binário); os dois usam os mesmos códigos ('q', 'd', ...).
+
+    Args:
+        dados: array.array ou memoryview tipada
+
+    Returns:
+        código de tipo do array
+    """
+    return getattr(dados, 'typecode', None) or dados.format
+
+
+def distancias_completas(deslocamentos, vizinhos, pesos, origem):
+    """
+    Dijkstra sem destino sobre arrays no formato CSR
+
+    Recebe os arrays soltos (e não um GrafoCSR) para funcionar também sobre
+    memória compartilhada entre processos e sobre a adjacência reversa.
+
+    Args:
+        deslocamentos: deslocamentos de cada linha (n+1 posições)
+        vizinhos: índice do vértice na outra ponta de cada aresta
+        pesos: peso de cada aresta
+        origem: índice de partida
+
+    Returns:
+        array('d') com a distância de cada vértice (infinito se inalcançável)
+    """
+    n = len(deslocamentos) - 1
+    infinito = float('infinity')
+    distancias = array('d', [infinito]) * n
+    distancias[origem] = 0
+    fila = [(0, origem)]
+    while fila:
+        distancia_atual, atual = heapq.heappop(fila)
+        if distancia_atual > distancias[atual]:
+            continue
+        for k in range(deslocamentos[atual], deslocamentos[atual + 1]):
+            vizinho = vizinhos[k]
+            nova_distancia = distancia_atual + pesos[k]
+            if nova_distancia < distancias[vizinho]:
+                distancias[vizinho] = nova_distancia
+                heapq.heappush(fila, (nova_distancia, vizinho))
+    return distancias
+
+
+class GrafoCSR:
+    """Armazenamento do grafo em arrays contíguos indexados por inteiros"""
+
+    def __init__(self, ids, nomes, xs, ys, deslocamentos, vizinhos, pesos, condicoes, motivos):
+        """
+        Inicializa o grafo compacto a partir dos arrays já montados
+
+        Args:
+            ids: lista de ids dos vértices (posição = índice inteiro)
+            nomes: lista de nomes dos vértices
+            xs: array com a coordenada x de cada vértice
+            ys: array com a coordenada y de cada vértice
+            deslocamentos: array com n+1 posições; as arestas do vértice i
+                ficam em [deslocamentos[i], deslocamentos[i+1])
+            vizinhos: array com o índice do destino de cada aresta
+            pesos: array com o peso de cada aresta
+            condicoes: array com o código do motivo de cada aresta
+            motivos: tabela de motivos (código -> texto)
+        """
+        self.ids = ids
+        self.indices = {v_id: i for i, v_id in enumerate(ids)}
+        self.nomes = nomes
+        self.xs = xs
+        self.ys = ys
+        self.deslocamentos = deslocamentos
+        self.vizinhos = vizinhos
+        self.pesos = pesos
+        self.condicoes = condicoes
+        self.motivos = motivos
+        self._codigos = {motivo: codigo for codigo, motivo in enumerate(motivos)}
+        # Incrementado a cada alteração de peso (mesma ideia do Grafo.versao)
+        self.versao = 0
+        # Adjacência reversa, montada só quando alguma busca precisar
+        self._reversa = None
+
+    @property
+    def num_vertices(self):
+        """Quantidade de vértices"""
+        return len(self.ids)
+
+    @property
+    def num_arestas(self):
+        """Quantidade de arestas dirigidas"""
+        return len(self.vizinhos)
+
+    @staticmethod
+    def _montar(ids, nomes, xs, ys, arestas, motivos):
+        """
+        Monta os arrays CSR a partir de uma lista de arestas dirigidas
+
+        Args:
+            ids, nomes, xs, ys: dados dos vértices
+            arestas: lista de tuplas (origem_idx, destino_idx, peso, codigo)
+            motivos: tabela de motivos
+
+        Returns:
+            objeto GrafoCSR
+        """
+        n = len(ids)
+
+        # Conta o grau de saída de cada vértice e acumula os deslocamentos
+        graus = [0] * n
+        for origem, _, _, _ in arestas:
+            graus[origem] += 1
+
+        deslocamentos = array('q', [0]) * (n + 1)
+        for i in range(n):
+            deslocamentos[i + 1] = deslocamentos[i] + graus[i]
+
+        # Distribui as arestas nas linhas, ordenando cada linha pelo destino
+        linhas = [[] for _ in range(n)]
+        for origem, destino, peso, codigo in arestas:
+            linhas[origem].append((destino, peso, codigo))
+
+        vizinhos = array('i')
+        pesos_lista = []
+        condicoes = array('H')
+        for linha in linhas:
+            linha.sort(key=lambda item: item[0])
+            for destino, peso, codigo in linha:
+                vizinhos.append(destino)
+                pesos_lista.append(peso)
+                condicoes.append(codigo)
+
+        return GrafoCSR(
+            ids, nomes, _array_numerico(xs), _array_numerico(ys),
+            deslocamentos, vizinhos, _array_numerico(pesos_lista), condicoes, motivos
+        )
+
+    @staticmethod
+    def from_grafo(grafo):
+        """
+        Cria a representação compacta a partir de um Grafo
+
+        Args:
+            grafo: objeto Grafo
+
+        Returns:
+            objeto GrafoCSR com os mesmos vértices, arestas, pesos e motivos
+        """
+        ids = list(grafo.vertices)
+        indices = {v_id: i for i, v_id in enumerate(ids)}
+        vertices = [grafo.vertices[v_id] for v_id in ids]
+
+        motivos = []
+        codigos = {}
+        arestas = []
+        for origem_id in ids:
+            for vizinho in grafo.obter_vizinhos(origem_id):
+                motivo = vizinho['motivo']
+                if motivo not in codigos:
+                    codigos[motivo] = len(motivos)
+                    motivos.append(motivo)
+                arestas.append((
+                    indices[origem_id],
+                    indices[vizinho['destino']],
+                    vizinho['peso'],
+                    codigos[motivo]
+                ))
+
+        return GrafoCSR._montar(
+            ids,
+            [v.nome for v in vertices],
+            [v.x for v in vertices],
+            [v.y for v in vertices],
+            arestas,
+            motivos
+        )
+
+    @staticmethod
+    def from_json(arquivo_grafo, arquivo_pesos=None, progresso=None):
+        """
+        Cria a representação compacta direto dos arquivos JSON do sistema
+
+        Os arquivos são lidos incrementalmente (leitor_json), sem montar a
+        árvore JSON inteira em memória.
+
+        Args:
+            arquivo_grafo: caminho do grafo_cidade.json
+            arquivo_pesos: caminho do pesos_atuais.json (opcional)
+            progresso: função progresso(bytes_lidos, bytes_totais, registros)
+                chamada a cada bloco lido (opcional)
+
+        Returns:
+            objeto GrafoCSR
+        """
+        ids = []
+        nomes = []
+        xs = []
+        ys = []
+        indices = {}
+        pares = array('i')
+        # 1 nas ruas de mão única ("bidirecional": false)
+        mao_unica = array('b')
+        pendentes = []
+
+        for chave, registro in ler_registros(arquivo_grafo, progresso):
+            if chave == 'vertices':
+                indices[registro['id']] = len(ids)
+                ids.append(registro['id'])
+                nomes.append(registro['nome'])
+                xs.append(registro['x'])
+                ys.append(registro['y'])
+            elif chave == 'arestas':
+                origem = indices.get(registro['origem'])
+                destino = indices.get(registro['destino'])
+                unica = not registro.get('bidirecional', True)
+                if origem is None or destino is None:
+                    pendentes.append((registro['origem'], registro['destino'], unica))
+                else:
+                    pares.append(origem)
+                    pares.append(destino)
+                    mao_unica.append(unica)
+
+        # Arestas lidas antes dos seus vértices
+        for origem_id, destino_id, unica in pendentes:
+            origem = indices.get(origem_id)
+            destino = indices.get(destino_id)
+            if origem is not None and destino is not None:
+                pares.append(origem)
+                pares.append(destino)
+                mao_unica.append(unica)
+
+        # As arestas da estrutura (bidirecionais, salvo as de mão única)
+        # começam com peso padrão
+        motivos = ["Condição normal"]
+        arestas = []
+        for i in range(0, len(pares), 2):
+            origem, destino = pares[i], pares[i + 1]
+            arestas.append((origem, destino, 1, 0))
+            if not mao_unica[i // 2]:
+                arestas.append((destino, origem, 1, 0))
+        del pares, mao_unica
+
+        csr = GrafoCSR._montar(ids, nomes, xs, ys, arestas, motivos)
+        del arestas
+
+        if arquivo_pesos is not None:
+            for chave, aresta in ler_registros(arquivo_pesos, progresso):
+                if chave != 'arestas':
+                    continue
+                csr.atualizar_peso(
+                    aresta['origem'],
+                    aresta['destino'],
+                    aresta['peso'],
+                    aresta['motivo'],
+                    bidirecional=aresta.get('bidirecional', True)
+                )
+
+        return csr
+
+    def indice_aresta(self, origem_idx, destino_idx):
+        """
+        Localiza a aresta origem -> destino por busca binária na linha da origem
+
+        Args:
+            origem_idx: índice do vértice de origem
+            destino_idx: índice do vértice de destino
+
+        Returns:
+            posição da aresta nos arrays ou -1 se não existir
+        """
+        inicio = self.deslocamentos[origem_idx]
+        fim = self.deslocamentos[origem_idx + 1]
+        k = bisect_left(self.vizinhos, destino_idx, inicio, fim)
+        if k < fim and self.vizinhos[k] == destino_idx:
+            return k
+        return -1
+
+    def _localizar(self, origem_id, destino_id):
+        """Retorna a posição da aresta a partir dos ids ou -1"""
+        origem = self.indices.get(origem_id)
+        destino = self.indices.get(destino_id)
+        if origem is None or destino is None:
+            return -1
+        return self.indice_aresta(origem, destino)
+
+    def reversa(self):
+        """
+        Retorna a adjacência reversa em formato CSR
+
+        A estrutura não muda depois de montada, então o resultado fica em
+        cache. Os pesos não são copiados: cada aresta reversa aponta para a
+        posição da aresta original, e assim acompanha atualizar_peso.
+
+        Returns:
+            tupla (deslocamentos, origens, arestas) onde as arestas que chegam
+            no vértice i ficam em [deslocamentos[i], deslocamentos[i+1]),
+            origens guarda o índice da origem e arestas a posição original
+        """
+        if self._reversa is None:
+            n = self.num_vertices
+            graus = [0] * n
+            for destino in self.vizinhos:
+                graus[destino] += 1
+
+            deslocamentos = array('q', [0]) * (n + 1)
+            for i in range(n):
+                deslocamentos[i + 1] = deslocamentos[i] + graus[i]
+
+            proxima = list(deslocamentos[:n])
+            origens = array('i', [0]) * self.num_arestas
+            arestas = array('q', [0]) * self.num_arestas
+            for origem in range(n):
+                for k in range(self.deslocamentos[origem], self.deslocamentos[origem + 1]):
+                    destino = self.vizinhos[k]
+                    posicao = proxima[destino]
+                    origens[posicao] = origem
+                    arestas[posicao] = k
+                    proxima[destino] = posicao + 1
+
+            self._reversa = (deslocamentos, origens, arestas)
+        return self._reversa
+
+    def codigo_motivo(self, motivo):
+        """
+        Retorna o código de um motivo, registrando-o na tabela se for novo
+
+        Args:
+            motivo: texto do motivo
+
+        Returns:
+            código inteiro do motivo
+        """
+        codigo = self._codigos.get(motivo)
+        if codigo is None:
+            codigo = len(self.motivos)
+            self.motivos.append(motivo)
+            self._codigos[motivo] = codigo
+        return codigo
+
+    def obter_peso(self, origem_id, destino_id):
+        """Retorna o peso da aresta ou None se não existir"""
+        k = self._localizar(origem_id, destino_id)
+        return self.pesos[k] if k >= 0 else None
+
+    def obter_motivo(self, origem_id, destino_id):
+        """Retorna o motivo da aresta ou None se não existir"""
+        k = self._localizar(origem_id, destino_id)
+        return self.motivos[self.condicoes[k]] if k >= 0 else None
+
+    def definir_peso_aresta(self, k, novo_peso, novo_motivo):
+        """
+        Grava peso e motivo na posição k dos arrays
+
+        Args:
+            k: posição da aresta
+            novo_peso: novo peso
+            novo_motivo: novo motivo
+        """
+        # Um peso real em array de inteiros obriga a promover o array
+        if tipo_array(self.pesos) == 'q' and not isinstance(novo_peso, int):
+            self.pesos = array('d', self.pesos)
+        self.pesos[k] = novo_peso
+        self.condicoes[k] = self.codigo_motivo(novo_motivo)
+        self.versao += 1
+
+    def substituir_pesos(self, pesos, condicoes):
+        """
+        Troca de uma vez os pesos e códigos de motivo de todas as arestas
+
+        Não passa pelos observadores: quem guarda resultados percebe a troca
+        pela versão (como em qualquer mudança feita por fora deles).
+
+        Args:
+            pesos: array com o novo peso de cada aresta (mesma ordem de vizinhos)
+            condicoes: array('H') com o código do motivo de cada aresta
+        """
+        if len(pesos) != self.num_arestas or len(condicoes) != self.num_arestas:
+            raise ValueError("Os arrays de pesos e condições devem ter uma posição por aresta")
+        self.pesos = pesos
+        self.condicoes = condicoes
+        self.versao += 1
+
+    def atualizar_peso(self, origem_id, destino_id, novo_peso, novo_motivo, bidirecional=True):
+        """
+        Atualiza o peso e motivo de uma aresta
+
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            novo_peso: novo peso da aresta
+            novo_motivo: novo motivo do peso
+            bidirecional: se True, atualiza nos dois sentidos
+        """
+        k = self._localizar(origem_id, destino_id)
+        if k >= 0:
+            self.definir_peso_aresta(k, novo_peso, novo_motivo)
+
+        if bidirecional:
+            k = self._localizar(destino_id, origem_id)
+            if k >= 0:
+                self.definir_peso_aresta(k, novo_peso, novo_motivo)
+
+    def como_grafo(self):
+        """
+        Retorna uma visão com a API do Grafo sobre estes arrays
+
+        Returns:
+            objeto GrafoCompacto
+        """
+        return GrafoCompacto(self)
+
+    def para_grafo(self):
+        """
+        Converte para um Grafo comum (listas de dicionários)
+
+        Returns:
+            objeto Grafo independente deste
+        """
+        grafo = Grafo()
+        for i, v_id in enumerate(self.ids):
+            grafo.adicionar_vertice(Vertice(v_id, self.nomes[i], self.xs[i], self.ys[i]))
+        for origem in range(self.num_vertices):
+            for k in range(self.deslocamentos[origem], self.deslocamentos[origem + 1]):
+                grafo.adicionar_aresta(
+                    self.ids[origem],
+                    self.ids[self.vizinhos[k]],
+                    self.pesos[k],
+                    self.motivos[self.condicoes[k]],
+                    bidirecional=False
+                )
+        return grafo
+
+    def assinatura(self):
+        """
+        Calcula uma impressão digital da estrutura e dos pesos atuais
+
+        Serve para saber se dados pré-processados salvos em disco (hierarquias,
+        tabelas de marcos) ainda correspondem ao grafo carregado.
+
+        Returns:
+            string hexadecimal (SHA-1)
+        """
+        resumo = hashlib.sha1()
+        resumo.update(json.dumps(self.ids, ensure_ascii=False).encode('utf-8'))
+        resumo.update(self.deslocamentos.tobytes())
+        resumo.update(self.vizinhos.tobytes())
+        # Pesos como reais, para não depender do tipo do array
+        resumo.update(array('d', self.pesos).tobytes())
+        return resumo.hexdigest()
+
+    def tamanho_bytes(self):
+        """
+        Estima a memória ocupada pelos arrays de arestas e coordenadas
+
+        Returns:
+            total de bytes dos arrays
+        """
+        arrays = (self.xs, self.ys, self.deslocamentos, self.vizinhos, self.pesos, self.condicoes)
+        return sum(len(a) * a.itemsize for a in arrays)
+
+
+class _VerticesCSR(Mapping):
+    """Dicionário somente leitura id -> Vertice montado sob demanda"""
+
+    def __init__(self, csr):
+        self._csr = csr
+
+    def __getitem__(self, v_id):
+        i = self._csr.indices[v_id]
+        return Vertice(v_id, self._csr.nomes[i], self._csr.xs[i], self._csr.ys[i])
+
+    def __contains__(self, v_id):
+        return v_id in self._csr.indices
+
+    def __iter__(self):
+        return iter(self._csr.ids)
+
+    def __len__(self):
+        return self._csr.num_vertices
+
+
+class _AdjacenciasCSR(Mapping):
+    """Dicionário somente leitura id -> lista de vizinhos montada sob demanda"""
+
+    def __init__(self, csr):
+        self._csr = csr
+
+    def __getitem__(self, v_id):
+        csr = self._csr
+        i = csr.indices[v_id]
+        return [
+            {
+                'destino': csr.ids[csr.vizinhos[k]],
+                'peso': csr.pesos[k],
+                'motivo': csr.motivos[csr.condicoes[k]]
+            }
+            for k in range(csr.deslocamentos[i], csr.deslocamentos[i + 1])
+        ]
+
+    def __contains__(self, v_id):
+        return v_id in self._csr.indices
+
+    def __iter__(self):
+        return iter(self._csr.ids)
+
+    def __len__(self):
+        return self._csr.num_vertices
+
+
+class GrafoCompacto(Grafo):
+    """Grafo com a API tradicional cujo armazenamento é um GrafoCSR"""
+
+    def __init__(self, csr):
+        """
+        Inicializa a visão sobre um grafo compacto
+
+        Args:
+            csr: objeto GrafoCSR com os dados
+        """
+        self.csr = csr
+        self.vertices = _VerticesCSR(csr)
+        self.adjacencias = _AdjacenciasCSR(csr)
+        self.observadores = []
+
+    @property
+    def versao(self):
+        """Versão dos pesos, mantida pelo GrafoCSR"""
+        return self.csr.versao
+
+    def adicionar_vertice(self, vertice):
+        """
+        Não suportado: a estrutura CSR é fixa (só os pesos mudam)
+
+        Para editar a estrutura, converta para o grafo de dicionários
+        (grafo.csr.para_grafo()), altere e, se quiser, volte para a forma
+        compacta com GrafoCSR.from_grafo(...).como_grafo().
+
+        Raises:
+            TypeError: sempre
+        """
+        raise TypeError(
+            "GrafoCompacto tem estrutura fixa e não aceita novos vértices; "
+            "use grafo.csr.para_grafo() para editar a estrutura"
+        )
+
+    def adicionar_aresta(self, origem_id, destino_id, peso=1, motivo="Condição normal", bidirecional=True):
+        """
+        Não suportado: a estrutura CSR é fixa (só os pesos mudam)
+
+        Mudar o peso de uma aresta existente é atualizar_peso; para criar
+        arestas, veja adicionar_vertice.
+
+        Raises:
+            TypeError: sempre
+        """
+        raise TypeError(
+            "GrafoCompacto tem estrutura fixa e não aceita novas arestas; "
+            "use atualizar_peso para arestas existentes ou grafo.csr.para_grafo() para editar a estrutura"
+        )
+
+    def obter_vizinhos(self, vertice_id):
+        """
+        Retorna os vizinhos de um vértice
+
+        Args:
+            vertice_id: id do vértice
+
+        Returns:
+            lista de dicionários com informações dos vizinhos
+        """
+        if vertice_id not in self.csr.indices:
+            return []
+        return self.adjacencias[vertice_id]
+
+    def obter_antecessores(self, vertice_id):
+        """
+        Retorna as arestas que chegam em um vértice
+
+        Args:
+            vertice_id: id do vértice
+
+        Returns:
+            lista de tuplas (origem_id, aresta), como em Grafo.obter_antecessores
+        """
+        csr = self.csr
+        i = csr.indices.get(vertice_id)
+        if i is None:
+            return []
+        deslocamentos, origens, arestas = csr.reversa()
+        return [
+            (
+                csr.ids[origens[j]],
+                {
+                    'destino': vertice_id,
+                    'peso': csr.pesos[arestas[j]],
+                    'motivo': csr.motivos[csr.condicoes[arestas[j]]]
+                }
+            )
+            for j in range(deslocamentos[i], deslocamentos[i + 1])
+        ]
+
+    def obter_peso(self, origem_id, destino_id):
+        """Retorna o peso da aresta entre dois vértices ou None"""
+        return self.csr.obter_peso(origem_id, destino_id)
+
+    def obter_motivo(self, origem_id, destino_id):
+        """Retorna o motivo do peso da aresta entre dois vértices ou None"""
+        return self.csr.obter_motivo(origem_id, destino_id)
+
+    def obter_aresta(self, origem_id, destino_id):
+        """Retorna destino, peso e motivo da aresta ou None se não existir"""
+        k = self.csr._localizar(origem_id, destino_id)
+        if k < 0:
+            return None
+        return {
+            'destino': destino_id,
+            'peso': self.csr.pesos[k],
+            'motivo': self.csr.motivos[self.csr.condicoes[k]]
+        }
+
+    def atualizar_peso(self, origem_id, destino_id, novo_peso, novo_motivo, bidirecional=True):
+        """Atualiza o peso e motivo de uma aresta nos arrays CSR"""
+        sentidos = [(origem_id, destino_id)]
+        if bidirecional:
+            sentidos.append((destino_id, origem_id))
+
+        for origem, destino in sentidos:
+            k = self.csr._localizar(origem, destino)
+            if k >= 0:
+                peso_antigo = self.csr.pesos[k]
+                self.csr.definir_peso_aresta(k, novo_peso, novo_motivo)
+                self._notificar(origem, destino, peso_antigo, novo_peso)
+
+    def obter_todas_arestas(self):
+        """
+        Retorna todas as arestas do grafo (sem duplicatas para arestas bidirecionais)
+
+        Returns:
+            lista de dicionários com origem, destino, peso e motivo
+        """
+        csr = self.csr
+        arestas = []
+        for origem in range(csr.num_vertices):
+            for k in range(csr.deslocamentos[origem], csr.deslocamentos[origem + 1]):
+                destino = csr.vizinhos[k]
+                # A aresta de volta, se existir, já foi listada pelo vértice menor
+                if destino < origem and csr.indice_aresta(destino, origem) >= 0:
+                    continue
+                # Arestas paralelas aparecem uma única vez, como no Grafo
+                if k > csr.deslocamentos[origem] and csr.vizinhos[k - 1] == destino:
+                    continue
+                arestas.append({
+                    'origem': csr.ids[origem],
+                    'destino': csr.ids[destino],
+                    'peso': csr.pesos[k],
+                    'motivo': csr.motivos[csr.condicoes[k]]
+                })
+        return arestas
@@ -0,0 +1,166 @@
+"""
+Módulo gravador_json.py
+Escrita atômica e incremental dos arquivos JSON do sistema
+
+Contrapartida do leitor_json: os registros são escritos um a um, já no
+formato compacto (sem indentação) e, opcionalmente, comprimidos com gzip ou
+lzma. Tudo vai para um arquivo temporário ao lado do destino, que só no fim
+é forçado para o disco (fsync) e renomeado por cima do arquivo final. Uma
+queda no meio deixa o arquivo anterior intacto, nunca um JSON pela metade.
+"""
+
+import gzip
+import io
+import json
+import lzma
+import os
+
+
+# Extensão acrescentada ao nome do arquivo para cada compressão
+EXTENSOES = {None: '', 'gzip': '.gz', 'lzma': '.xz'}
+
+
+def variantes(arquivo):
+    """
+    Caminhos possíveis de um arquivo JSON, com e sem compressão
+
+    Returns:
+        lista de caminhos (um por compressão em EXTENSOES)
+    """
+    return [arquivo + extensao for extensao in EXTENSOES.values()]
+
+
+def localizar(arquivo):
+    """
+    Encontra a variante gravada de um arquivo JSON
+
+    Args:
+        arquivo: caminho sem a extensão de compressão
+
+    Returns:
+        caminho da variante existente mais recente ou None se não houver
+    """
+    existentes = [caminho for caminho in variantes(arquivo) if os.path.exists(caminho)]
+    if not existentes:
+        return None
+    return max(existentes, key=os.path.getmtime)
+
+
+def sincronizar_diretorio(caminho):
+    """Força para o disco a entrada de diretório de um arquivo renomeado"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    descritor = os.open(os.path.dirname(os.path.abspath(caminho)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descritor)
+    finally:
+        os.close(descritor)
+
+
+class GravadorJSON:
+    """Escreve um objeto JSON de listas, registro por registro, de forma atômica"""
+
+    def __init__(self, arquivo, compressao=None):
+        """
+        Inicializa o gravador (use com 'with')
+
+        Args:
+            arquivo: caminho do arquivo final, sem extensão de compressão
+            compressao: None, 'gzip' ou 'lzma'
+        """
+        if compressao not in EXTENSOES:
+            raise ValueError(f"Compressão desconhecida: {compressao!r} (opções: None, 'gzip', 'lzma')")
+        self.arquivo = arquivo
+        self.compressao = compressao
+        self.destino = arquivo + EXTENSOES[compressao]
+        self._temporario = self.destino + '.tmp'
+
+    def __enter__(self):
+        self._bruto = open(self._temporario, 'wb')
+        if self.compressao == 'gzip':
+            # mtime=0: o mesmo conteúdo gera sempre os mesmos bytes
+            self._compressor = gzip.GzipFile(fileobj=self._bruto, mode='wb', compresslevel=6, mtime=0)
+        elif self.compressao == 'lzma':
+            # Nível 3: nestes arquivos comprime quase como o padrão (6) em bem menos tempo
+            self._compressor = lzma.LZMAFile(self._bruto, mode='wb', preset=3)
+        else:
+            self._compressor = None
+        self._texto = io.TextIOWrapper(self._compressor or self._bruto, encoding='utf-8', newline='\n')
+        self._texto.write('{')
+        self._codificador = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        self._chaves = 0
+        self._itens = None
+        self._lote = []
+        return self
+
+    # Registros codificados de uma vez (uma chamada ao codificador em C por lote)
+    TAMANHO_LOTE = 1024
+
+    def valor(self, chave, valor):
+        """Escreve um par chave: valor qualquer no objeto raiz"""
+        self._fechar_lista()
+        self._chave(chave)
+        self._texto.write(self._codificador.encode(valor))
+
+    def iniciar_lista(self, chave):
+        """Abre a lista chave no objeto raiz; os itens vêm por acrescentar"""
+        self._fechar_lista()
+        self._chave(chave)
+        self._texto.write('[')
+        self._itens = 0
+
+    def acrescentar(self, registro):
+        """Escreve um item da lista aberta"""
+        self._lote.append(registro)
+        if len(self._lote) >= self.TAMANHO_LOTE:
+            self._escrever_lote()
+
+    def _escrever_lote(self):
+        if not self._lote:
+            return
+        if self._itens:
+            self._texto.write(',')
+        # A lista codificada inteira, sem os colchetes
+        self._texto.write(self._codificador.encode(self._lote)[1:-1])
+        self._itens += len(self._lote)
+        self._lote.clear()
+
+    def _chave(self, chave):
+        if self._chaves:
+            self._texto.write(',\n')
+        self._texto.write(self._codificador.encode(chave) + ':')
+        self._chaves += 1
+
+    def _fechar_lista(self):
+        if self._itens is not None:
+            self._escrever_lote()
+            self._texto.write(']')
+            self._itens = None
+
+    def __exit__(self, tipo_erro, erro, rastro):
+        try:
+            if tipo_erro is None:
+                self._fechar_lista()
+                self._texto.write('}\n')
+                self._texto.flush()
+            # Solta o texto sem fechar o que está por baixo
+            self._texto.detach()
+            if self._compressor is not None:
+                # Termina o fluxo comprimido (o arquivo bruto continua aberto)
+                self._compressor.close()
+            if tipo_erro is None:
+                self._bruto.flush()
+                os.fsync(self._bruto.fileno())
+        finally:
+            self._bruto.close()
+        if tipo_erro is not None:
+            os.remove(self._temporario)
+            return False
+
+        os.replace(self._temporario, self.destino)
+        sincronizar_diretorio(self.destino)
+        # Variantes com outra compressão ficaram desatualizadas
+        for caminho in variantes(self.arquivo):
+            if caminho != self.destino and os.path.exists(caminho):
+                os.remove(caminho)
+        return False
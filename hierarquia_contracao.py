@@ -0,0 +1,539 @@
+"""
+Módulo hierarquia_contracao.py
+Pré-processamento por hierarquias de contração (contraction hierarchies)
+
+Os vértices são "contraídos" um a um em ordem de importância; sempre que a
+remoção de um vértice destruiria um menor caminho entre dois vizinhos, um
+atalho é adicionado. Depois disso, qualquer consulta origem/destino é
+respondida por duas buscas pequenas que só sobem na hierarquia, e os atalhos
+são desempacotados de volta em ruas reais.
+
+Os pesos só mudam quando o GeradorPesos roda ou uma rua muda de condição,
+então a hierarquia é montada uma vez e reaproveitada por muitas consultas.
+Quando os pesos mudam, ela é customizada: a ordem e os atalhos ficam, e os
+pesos são recalculados de baixo para cima; só os pares que não têm aresta
+na hierarquia têm a testemunha conferida.
+"""
+
+import heapq
+import json
+import os
+
+from grafo_csr import GrafoCSR
+
+
+class HierarquiaContracao:
+    """Hierarquia de contração sobre os pesos atuais de um grafo"""
+
+    # Limite de vértices assentados em cada busca de testemunha. Valores
+    # menores aceleram o pré-processamento, ao custo de atalhos a mais
+    # (nunca de resultados errados)
+    LIMITE_TESTEMUNHA = 60
+
+    # Acima desta fração de ruas com peso novo a ordem antiga não serve mais
+    # (ex.: GeradorPesos sorteou a cidade inteira) e a customização refaz a
+    # hierarquia do zero
+    FRACAO_RECONSTRUCAO = 0.25
+
+    # Crescimento máximo (em arestas) por atalhos acrescentados nas
+    # customizações antes de refazer a hierarquia do zero
+    LIMITE_CRESCIMENTO = 1.5
+
+    def __init__(self, ids, ordem, arestas, assinatura=None, arestas_construcao=None):
+        """
+        Inicializa a hierarquia a partir dos dados já calculados
+
+        Args:
+            ids: lista de ids dos vértices (posição = índice inteiro)
+            ordem: índices dos vértices na ordem em que foram contraídos
+            arestas: dicionário (u, v) -> (peso, meio) com as arestas originais
+                (meio = -1) e os atalhos (meio = vértice contraído entre u e v)
+            assinatura: impressão digital do grafo de origem (GrafoCSR.assinatura)
+            arestas_construcao: quantidade de arestas na última construção
+                do zero (None = len(arestas)); limita o crescimento nas
+                customizações
+        """
+        self.ids = ids
+        self.indices = {v_id: i for i, v_id in enumerate(ids)}
+        self.ordem = ordem
+        self.arestas = arestas
+        self.assinatura = assinatura
+        self.arestas_construcao = len(arestas) if arestas_construcao is None else arestas_construcao
+        # Versão do Grafo em memória que originou a hierarquia (não é salva)
+        self.versao_grafo = None
+
+        self.nivel = [0] * len(ids)
+        for posicao, v in enumerate(ordem):
+            self.nivel[v] = posicao
+
+        # Grafo de subida (busca a partir da origem) e de descida invertido
+        # (busca a partir do destino); ambos só levam a vértices mais altos
+        self.subida = [[] for _ in ids]
+        self.descida = [[] for _ in ids]
+        for (u, v), (peso, _) in arestas.items():
+            if self.nivel[u] < self.nivel[v]:
+                self.subida[u].append((v, peso))
+            else:
+                self.descida[v].append((u, peso))
+
+    @property
+    def num_atalhos(self):
+        """Quantidade de atalhos criados na contração"""
+        return sum(1 for _, meio in self.arestas.values() if meio != -1)
+
+    @staticmethod
+    def construir(grafo, ordem=None):
+        """
+        Monta a hierarquia sobre os pesos atuais do grafo
+
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+            ordem: ordem de contração a reaproveitar (customização após
+                mudança de pesos); se None, a ordem é escolhida pela
+                diferença de arestas de cada vértice
+
+        Returns:
+            objeto HierarquiaContracao
+        """
+        csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+        if csr is None:
+            csr = GrafoCSR.from_grafo(grafo)
+
+        n = csr.num_vertices
+        saida = [{} for _ in range(n)]
+        entrada = [{} for _ in range(n)]
+        arestas = {}
+        for u in range(n):
+            for k in range(csr.deslocamentos[u], csr.deslocamentos[u + 1]):
+                v = csr.vizinhos[k]
+                peso = csr.pesos[k]
+                # Laços não ajudam em menores caminhos; paralelas ficam com o menor peso
+                if u == v or peso >= saida[u].get(v, float('infinity')):
+                    continue
+                saida[u][v] = peso
+                entrada[v][u] = peso
+                arestas[(u, v)] = (peso, -1)
+
+        construtor = _Contracao(saida, entrada, arestas, HierarquiaContracao.LIMITE_TESTEMUNHA)
+        ordem_final = construtor.contrair_em_ordem(ordem) if ordem is not None else construtor.contrair_por_prioridade()
+
+        hierarquia = HierarquiaContracao(list(csr.ids), ordem_final, arestas, csr.assinatura())
+        hierarquia.versao_grafo = getattr(grafo, 'versao', None)
+        return hierarquia
+
+    def customizar(self, grafo):
+        """
+        Recalcula os pesos da hierarquia para novos pesos, sem refazer a contração
+
+        A ordem e os atalhos são mantidos e os pesos são refeitos de baixo
+        para cima na ordem de contração: ao passar por v, cada par de
+        vizinhos u -> v -> x mais altos que v relaxa a aresta u -> x. Só os
+        pares sem aresta (que na construção tinham caminho alternativo)
+        precisam de conferência: primeiro por um desvio de dois passos e,
+        se não houver, por uma busca de testemunha limitada; se a testemunha
+        não vale mais com os novos pesos, o atalho é acrescentado.
+
+        Args:
+            grafo: grafo com os pesos atualizados (mesma estrutura)
+
+        Com a maior parte das ruas mudada (FRACAO_RECONSTRUCAO) ou com a
+        hierarquia inchada por atalhos acrescentados (LIMITE_CRESCIMENTO), a
+        ordem antiga já não ajuda e a hierarquia é refeita do zero.
+
+        Returns:
+            nova HierarquiaContracao
+
+        Raises:
+            ValueError: se os vértices do grafo não forem os da hierarquia
+        """
+        csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+        if csr is None:
+            csr = GrafoCSR.from_grafo(grafo)
+        if list(csr.ids) != self.ids:
+            raise ValueError("A customização exige o mesmo grafo (mesmos vértices, na mesma ordem)")
+
+        infinito = float('infinity')
+        n = len(self.ids)
+        # Atalhos começam em infinito; ruas, pelo peso atual (paralelas: o menor)
+        arestas = {par: (infinito, meio) for par, (_, meio) in self.arestas.items() if meio != -1}
+        ruas = mudadas = 0
+        for u in range(n):
+            for k in range(csr.deslocamentos[u], csr.deslocamentos[u + 1]):
+                v = csr.vizinhos[k]
+                peso = csr.pesos[k]
+                if u != v and peso < arestas.get((u, v), (infinito,))[0]:
+                    arestas[(u, v)] = (peso, -1)
+                    ruas += 1
+                    anterior = self.arestas.get((u, v))
+                    if anterior is not None and anterior[1] == -1 and anterior[0] != peso:
+                        mudadas += 1
+        if mudadas > self.FRACAO_RECONSTRUCAO * ruas:
+            return HierarquiaContracao.construir(grafo)
+
+        # Grafo restante, como na contração: cada vértice sai depois de processado
+        saida = [{} for _ in range(n)]
+        entrada = [{} for _ in range(n)]
+        for (u, v), (peso, _) in arestas.items():
+            saida[u][v] = peso
+            entrada[v][u] = peso
+
+        for v in self.ordem:
+            for u, peso_entrada in entrada[v].items():
+                faltando = []
+                for x, peso_saida in saida[v].items():
+                    if x == u:
+                        continue
+                    peso = peso_entrada + peso_saida
+                    atual = saida[u].get(x)
+                    if atual is None:
+                        faltando.append((x, peso))
+                    elif peso < atual:
+                        arestas[(u, x)] = (peso, v)
+                        saida[u][x] = peso
+                        entrada[x][u] = peso
+                if faltando:
+                    for x, peso in self._sem_testemunha(u, v, faltando, saida, entrada):
+                        arestas[(u, x)] = (peso, v)
+                        saida[u][x] = peso
+                        entrada[x][u] = peso
+
+            for x in saida[v]:
+                del entrada[x][v]
+            for u in entrada[v]:
+                del saida[u][v]
+            saida[v] = {}
+            entrada[v] = {}
+
+        if len(arestas) > self.LIMITE_CRESCIMENTO * self.arestas_construcao:
+            return HierarquiaContracao.construir(grafo)
+
+        hierarquia = HierarquiaContracao(self.ids, self.ordem, arestas, csr.assinatura(), self.arestas_construcao)
+        hierarquia.versao_grafo = getattr(grafo, 'versao', None)
+        return hierarquia
+
+    @classmethod
+    def _sem_testemunha(cls, u, v, faltando, saida, entrada):
+        """
+        Pares u -> x (via v) que ficaram sem caminho alternativo
+
+        O alternativo é procurado no grafo restante (sem os vértices já
+        processados), como na contração. Pesos de arestas ainda não
+        recalculadas só podem ser maiores que os finais, então uma
+        testemunha encontrada vale; faltar testemunha só custa um atalho a
+        mais.
+
+        Args:
+            u: origem dos pares
+            v: vértice entre u e cada x (ainda no grafo restante)
+            faltando: lista de tuplas (x, peso via v) sem aresta u -> x
+            saida, entrada: adjacências do grafo restante
+
+        Returns:
+            lista de tuplas (x, peso) que precisam de atalho
+        """
+        # Desvio de dois passos u -> w -> x, o caso comum
+        restantes = []
+        saidas_u = saida[u]
+        for x, peso in faltando:
+            chegadas = entrada[x]
+            if len(chegadas) < len(saidas_u):
+                desvio = any(w != v and w in saidas_u and saidas_u[w] + p <= peso for w, p in chegadas.items())
+            else:
+                desvio = any(w != v and w in chegadas and p + chegadas[w] <= peso for w, p in saidas_u.items())
+            if not desvio:
+                restantes.append((x, peso))
+        if not restantes:
+            return restantes
+
+        # Busca de testemunha limitada, como na construção
+        custo_maximo = max(peso for _, peso in restantes)
+        distancias = {u: 0}
+        fila = [(0, u)]
+        assentados = 0
+        while fila:
+            distancia_atual, atual = heapq.heappop(fila)
+            if distancia_atual > distancias[atual]:
+                continue
+            if distancia_atual > custo_maximo or assentados >= cls.LIMITE_TESTEMUNHA:
+                break
+            assentados += 1
+            for vizinho, peso in saida[atual].items():
+                if vizinho == v:
+                    continue
+                nova_distancia = distancia_atual + peso
+                if nova_distancia < distancias.get(vizinho, float('infinity')):
+                    distancias[vizinho] = nova_distancia
+                    heapq.heappush(fila, (nova_distancia, vizinho))
+        return [(x, peso) for x, peso in restantes if distancias.get(x, float('infinity')) > peso]
+
+    def consultar(self, origem_id, destino_id):
+        """
+        Responde uma consulta com buscas de subida nos dois sentidos
+
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+
+        Returns:
+            tupla (caminho, custo_total) com o caminho já desempacotado em
+            ruas reais, ou (None, None) se não houver caminho
+        """
+        origem = self.indices.get(origem_id)
+        destino = self.indices.get(destino_id)
+        if origem is None or destino is None:
+            return None, None
+        if origem == destino:
+            return [origem_id], 0
+
+        infinito = float('infinity')
+        distancias = ({origem: 0}, {destino: 0})
+        predecessores = ({origem: -1}, {destino: -1})
+        filas = ([(0, origem)], [(0, destino)])
+        grafos = (self.subida, self.descida)
+        melhor_custo = infinito
+        encontro = -1
+
+        while filas[0] or filas[1]:
+            for lado in (0, 1):
+                fila = filas[lado]
+                if not fila:
+                    continue
+                distancia_atual, atual = heapq.heappop(fila)
+                if distancia_atual > distancias[lado][atual]:
+                    continue
+                # Nada abaixo do melhor custo sobra neste sentido
+                if distancia_atual >= melhor_custo:
+                    fila.clear()
+                    continue
+
+                outro = distancias[1 - lado].get(atual)
+                if outro is not None and distancia_atual + outro < melhor_custo:
+                    melhor_custo = distancia_atual + outro
+                    encontro = atual
+
+                dist_lado = distancias[lado]
+                for vizinho, peso in grafos[lado][atual]:
+                    nova_distancia = distancia_atual + peso
+                    if nova_distancia < dist_lado.get(vizinho, infinito):
+                        dist_lado[vizinho] = nova_distancia
+                        predecessores[lado][vizinho] = atual
+                        heapq.heappush(fila, (nova_distancia, vizinho))
+
+        if encontro == -1:
+            return None, None
+
+        # Caminho na hierarquia: origem -> encontro (subida) + encontro -> destino
+        subida = []
+        atual = encontro
+        while atual != -1:
+            subida.append(atual)
+            atual = predecessores[0][atual]
+        subida.reverse()
+        atual = predecessores[1][encontro]
+        while atual != -1:
+            subida.append(atual)
+            atual = predecessores[1][atual]
+
+        caminho = [subida[0]]
+        for i in range(len(subida) - 1):
+            caminho.extend(self._desempacotar(subida[i], subida[i + 1]))
+
+        return [self.ids[v] for v in caminho], melhor_custo
+
+    def _desempacotar(self, u, v):
+        """
+        Troca um atalho u -> v pela sequência de ruas que ele representa
+
+        Args:
+            u: índice da origem da aresta
+            v: índice do destino da aresta
+
+        Returns:
+            lista de índices depois de u até v (inclusive)
+        """
+        resultado = []
+        pilha = [(u, v)]
+        while pilha:
+            a, b = pilha.pop()
+            meio = self.arestas[(a, b)][1]
+            if meio == -1:
+                resultado.append(b)
+            else:
+                # Empilha a segunda metade primeiro para sair em ordem
+                pilha.append((meio, b))
+                pilha.append((a, meio))
+        return resultado
+
+    def to_dict(self):
+        """Converte a hierarquia para dicionário (para persistência)"""
+        return {
+            'assinatura': self.assinatura,
+            'ids': self.ids,
+            'ordem': self.ordem,
+            'arestas_construcao': self.arestas_construcao,
+            'arestas': [[u, v, peso, meio] for (u, v), (peso, meio) in self.arestas.items()]
+        }
+
+    @staticmethod
+    def from_dict(dados):
+        """Cria a hierarquia a partir de um dicionário"""
+        arestas = {(u, v): (peso, meio) for u, v, peso, meio in dados['arestas']}
+        return HierarquiaContracao(
+            dados['ids'], dados['ordem'], arestas, dados['assinatura'], dados.get('arestas_construcao')
+        )
+
+    def salvar(self, arquivo):
+        """
+        Salva a hierarquia em arquivo JSON compacto
+
+        Args:
+            arquivo: caminho do arquivo
+        """
+        # Escreve ao lado e renomeia: uma queda não deixa arquivo pela metade
+        temporario = arquivo + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temporario, arquivo)
+
+    @staticmethod
+    def carregar(arquivo):
+        """
+        Carrega uma hierarquia salva com salvar()
+
+        Args:
+            arquivo: caminho do arquivo
+
+        Returns:
+            objeto HierarquiaContracao
+        """
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            return HierarquiaContracao.from_dict(json.load(f))
+
+
+class _Contracao:
+    """Estado intermediário da contração dos vértices"""
+
+    def __init__(self, saida, entrada, arestas, limite_testemunha):
+        """
+        Args:
+            saida: lista de dicionários vizinho -> peso (arestas de saída)
+            entrada: lista de dicionários vizinho -> peso (arestas de entrada)
+            arestas: dicionário (u, v) -> (peso, meio), completado com atalhos
+            limite_testemunha: máximo de vértices assentados por busca
+        """
+        self.saida = saida
+        self.entrada = entrada
+        self.arestas = arestas
+        self.limite_testemunha = limite_testemunha
+        self.vizinhos_contraidos = [0] * len(saida)
+
+    def _busca_testemunha(self, origem, ignorado, custo_maximo):
+        """
+        Dijkstra limitado a partir de origem, sem passar pelo vértice ignorado
+
+        Returns:
+            dicionário vértice -> distância encontrada
+        """
+        distancias = {origem: 0}
+        fila = [(0, origem)]
+        assentados = 0
+        while fila:
+            distancia_atual, atual = heapq.heappop(fila)
+            if distancia_atual > distancias[atual]:
+                continue
+            if distancia_atual > custo_maximo or assentados >= self.limite_testemunha:
+                break
+            assentados += 1
+            for vizinho, peso in self.saida[atual].items():
+                if vizinho == ignorado:
+                    continue
+                nova_distancia = distancia_atual + peso
+                if nova_distancia < distancias.get(vizinho, float('infinity')):
+                    distancias[vizinho] = nova_distancia
+                    heapq.heappush(fila, (nova_distancia, vizinho))
+        return distancias
+
+    def _atalhos_necessarios(self, v):
+        """
+        Calcula os atalhos que a contração de v exige
+
+        Returns:
+            lista de tuplas (u, x, peso) para cada par entrada/saída sem testemunha
+        """
+        atalhos = []
+        saidas = self.saida[v]
+        if not saidas:
+            return atalhos
+        maior_saida = max(saidas.values())
+        for u, peso_entrada in self.entrada[v].items():
+            distancias = self._busca_testemunha(u, v, peso_entrada + maior_saida)
+            for x, peso_saida in saidas.items():
+                if x == u:
+                    continue
+                peso = peso_entrada + peso_saida
+                if distancias.get(x, float('infinity')) > peso:
+                    atalhos.append((u, x, peso))
+        return atalhos
+
+    def _prioridade(self, v):
+        """
+        Diferença de arestas mais vizinhos já contraídos (menor = contrai antes)
+
+        Returns:
+            tupla (prioridade, atalhos), para reaproveitar os atalhos se v
+            for contraído em seguida
+        """
+        atalhos = self._atalhos_necessarios(v)
+        removidas = len(self.entrada[v]) + len(self.saida[v])
+        return len(atalhos) - removidas + self.vizinhos_contraidos[v], atalhos
+
+    def _contrair(self, v, atalhos=None):
+        """Remove v do grafo restante, adicionando os atalhos necessários"""
+        if atalhos is None:
+            atalhos = self._atalhos_necessarios(v)
+        for u, x, peso in atalhos:
+            if peso < self.saida[u].get(x, float('infinity')):
+                self.saida[u][x] = peso
+                self.entrada[x][u] = peso
+                self.arestas[(u, x)] = (peso, v)
+
+        for x in self.saida[v]:
+            del self.entrada[x][v]
+            self.vizinhos_contraidos[x] += 1
+        for u in self.entrada[v]:
+            del self.saida[u][v]
+            self.vizinhos_contraidos[u] += 1
+        self.saida[v] = {}
+        self.entrada[v] = {}
+
+    def contrair_por_prioridade(self):
+        """
+        Contrai todos os vértices escolhendo o de menor prioridade a cada passo,
+        com atualização preguiçosa (a prioridade é recalculada ao sair da fila)
+
+        Returns:
+            ordem de contração
+        """
+        fila = [(self._prioridade(v)[0], v) for v in range(len(self.saida))]
+        heapq.heapify(fila)
+        ordem = []
+        while fila:
+            _, v = heapq.heappop(fila)
+            prioridade, atalhos = self._prioridade(v)
+            if fila and prioridade > fila[0][0]:
+                heapq.heappush(fila, (prioridade, v))
+                continue
+            self._contrair(v, atalhos)
+            ordem.append(v)
+        return ordem
+
+    def contrair_em_ordem(self, ordem):
+        """
+        Contrai os vértices na ordem dada
+
+        Returns:
+            a própria ordem
+        """
+        for v in ordem:
+            self._contrair(v)
+        return list(ordem)
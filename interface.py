@@ -145,6 +145,9 @@ class InterfaceUsuario:
         
         # Salva automaticamente
         self.persistencia.salvar_pesos_atuais(self.grafo)
+        if self.dijkstra.marcos is not None:
+            # Refaz (e salva) as tabelas de marcos junto com os novos pesos
+            self.dijkstra.preparar_marcos()
         print("💾 Estado salvo automaticamente.")
         
         input("\nPressione Enter para continuar...")
@@ -162,8 +165,7 @@ class InterfaceUsuario:
     def salvar_estado(self):
         """Salva o estado atual do sistema"""
         print("\n💾 Salvando estado atual...")
-        self.persistencia.salvar_grafo_estrutura(self.grafo)
-        self.persistencia.salvar_pesos_atuais(self.grafo)
+        self.persistencia.salvar_estado(self.grafo)
         print("✅ Estado salvo com sucesso!")
         input("\nPressione Enter para continuar...")
     
@@ -0,0 +1,194 @@
+"""
+Módulo leitor_json.py
+Leitura incremental dos arquivos JSON do sistema
+
+Os arquivos grafo_cidade.json e pesos_atuais.json são um objeto cujas chaves
+guardam listas de registros ({"vertices": [...], "arestas": [...]}). Em vez
+de montar a árvore inteira com json.load, os registros são decodificados um a
+um a partir de blocos lidos do disco, e quem carrega o grafo os consome à
+medida que chegam. Assim o pico de memória fica perto do tamanho do grafo
+final, e não do grafo mais a árvore JSON completa.
+
+Arquivos terminados em .gz ou .xz (gravador_json) são descomprimidos
+durante a leitura.
+"""
+
+import codecs
+import gzip
+import json
+import lzma
+import os
+import re
+
+
+# Espaços em branco permitidos entre os tokens do JSON
+_ESPACOS = re.compile(r'[ \t\r\n]*')
+
+
+class LeitorRegistrosJSON:
+    """Percorre um objeto JSON de listas, entregando um registro por vez"""
+
+    TAMANHO_BLOCO = 1 << 20
+    # Maior registro aceito, em caracteres: um valor que não se completa
+    # dentro disto é JSON inválido, e não um registro cortado entre blocos
+    LIMITE_REGISTRO = 8 << 20
+
+    def __init__(self, arquivo, progresso=None, tamanho_bloco=None, limite_registro=None):
+        """
+        Inicializa o leitor
+
+        Args:
+            arquivo: caminho do arquivo JSON
+            progresso: função progresso(bytes_lidos, bytes_totais, registros),
+                chamada a cada bloco lido do disco
+            tamanho_bloco: bytes lidos por vez (None = TAMANHO_BLOCO)
+            limite_registro: maior registro, em caracteres (None = LIMITE_REGISTRO)
+        """
+        self.arquivo = arquivo
+        self.progresso = progresso
+        self.tamanho_bloco = tamanho_bloco or self.TAMANHO_BLOCO
+        self.limite_registro = limite_registro or self.LIMITE_REGISTRO
+        self._decodificador = json.JSONDecoder()
+
+    def registros(self):
+        """
+        Lê o arquivo incrementalmente
+
+        Yields:
+            tuplas (chave, registro): um item por elemento das listas do
+            objeto raiz; valores que não são listas saem inteiros, uma vez
+
+        Raises:
+            ValueError: se o arquivo não for um objeto JSON válido (inclusive
+                um registro que não termina em limite_registro caracteres)
+        """
+        self._texto = ''
+        self._posicao = 0
+        self._registros = 0
+        self._lidos = 0
+        # Bytes (descomprimidos) já entregues ao decodificador UTF-8
+        self._decodificados = 0
+        self._total = os.path.getsize(self.arquivo)
+        self._fim_arquivo = False
+        self._utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+
+        with open(self.arquivo, 'rb') as bruto:
+            self._bruto = bruto
+            if self.arquivo.endswith('.gz'):
+                self._arquivo = gzip.GzipFile(fileobj=bruto, mode='rb')
+            elif self.arquivo.endswith('.xz'):
+                self._arquivo = lzma.LZMAFile(bruto, mode='rb')
+            else:
+                self._arquivo = bruto
+            self._esperar('{')
+            if self._proximo_caractere() == '}':
+                return
+            while True:
+                chave = self._decodificar()
+                self._esperar(':')
+                if self._proximo_caractere() == '[':
+                    self._posicao += 1
+                    if self._proximo_caractere() == ']':
+                        self._posicao += 1
+                    else:
+                        while True:
+                            registro = self._decodificar()
+                            self._registros += 1
+                            yield chave, registro
+                            if self._separador(']'):
+                                break
+                else:
+                    yield chave, self._decodificar()
+                if self._separador('}'):
+                    return
+
+    def _ler_bloco(self):
+        """Acrescenta mais um bloco do arquivo ao texto pendente"""
+        if self._fim_arquivo:
+            return False
+        # Descarta o que já foi consumido para o texto não crescer sem limite
+        self._texto = self._texto[self._posicao:]
+        self._posicao = 0
+        dados = self._arquivo.read(self.tamanho_bloco)
+        # Posição no arquivo em disco (comprimido, se for o caso)
+        self._lidos = self._bruto.tell()
+        if not dados:
+            self._fim_arquivo = True
+            self._texto += self._utf8.decode(b'', final=True)
+            return True
+        self._decodificados += len(dados)
+        self._texto += self._utf8.decode(dados)
+        if self.progresso is not None:
+            self.progresso(self._lidos, self._total, self._registros)
+        return True
+
+    def _proximo_caractere(self):
+        """Pula espaços e retorna o próximo caractere sem consumi-lo"""
+        while True:
+            texto = self._texto
+            posicao = _ESPACOS.match(texto, self._posicao).end()
+            self._posicao = posicao
+            if posicao < len(texto):
+                return texto[posicao]
+            if not self._ler_bloco():
+                raise ValueError(f"Fim inesperado do arquivo JSON {self.arquivo}")
+
+    def _esperar(self, caractere):
+        """Consome um caractere de pontuação obrigatório"""
+        encontrado = self._proximo_caractere()
+        if encontrado != caractere:
+            raise ValueError(f"JSON inválido em {self.arquivo}: esperado {caractere!r}, encontrado {encontrado!r}")
+        self._posicao += 1
+
+    def _separador(self, fechamento):
+        """
+        Consome ',' ou o fechamento da lista/objeto
+
+        Returns:
+            True se encontrou o fechamento
+        """
+        encontrado = self._proximo_caractere()
+        self._posicao += 1
+        if encontrado == fechamento:
+            return True
+        if encontrado != ',':
+            raise ValueError(f"JSON inválido em {self.arquivo}: esperado ',' ou {fechamento!r}, encontrado {encontrado!r}")
+        return False
+
+    def _posicao_em_bytes(self):
+        """Posição do texto pendente no conteúdo (descomprimido) do arquivo, em bytes"""
+        pendentes = len(self._texto[self._posicao:].encode('utf-8')) + len(self._utf8.getstate()[0])
+        return self._decodificados - pendentes
+
+    def _decodificar(self):
+        """Decodifica um valor completo, lendo mais blocos se ele estiver cortado"""
+        self._proximo_caractere()
+        while True:
+            try:
+                valor, fim = self._decodificador.raw_decode(self._texto, self._posicao)
+            except json.JSONDecodeError as erro:
+                # Sem limite, um erro no meio do arquivo o leria inteiro para a memória
+                if len(self._texto) - self._posicao >= self.limite_registro:
+                    raise ValueError(
+                        f"JSON inválido em {self.arquivo}: o valor no byte {self._posicao_em_bytes()} "
+                        f"não termina em {self.limite_registro} caracteres ({erro.msg})"
+                    ) from erro
+                if not self._ler_bloco():
+                    raise
+                continue
+            # Um número no fim do bloco pode continuar no bloco seguinte
+            if fim == len(self._texto) and not self._fim_arquivo:
+                self._ler_bloco()
+                continue
+            self._posicao = fim
+            return valor
+
+
+def ler_registros(arquivo, progresso=None, tamanho_bloco=None, limite_registro=None):
+    """
+    Atalho para LeitorRegistrosJSON(arquivo, ...).registros()
+
+    Yields:
+        tuplas (chave, registro)
+    """
+    return LeitorRegistrosJSON(arquivo, progresso, tamanho_bloco, limite_registro).registros()
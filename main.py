@@ -15,6 +15,14 @@ from persistencia import SistemaPersistencia
 from interface import InterfaceUsuario
 
 
+def mostrar_progresso(bytes_lidos, bytes_totais, registros):
+    """Mostra o andamento da leitura de arquivos grandes (a partir de 1 MB)"""
+    if bytes_totais < 1 << 20:
+        return
+    fim = '\n' if bytes_lidos >= bytes_totais else ''
+    print(f"\r   📖 Lendo... {bytes_lidos * 100 // bytes_totais:3d}% ({registros} registros)", end=fim, flush=True)
+
+
 def inicializar_sistema():
     """
     Inicializa o sistema carregando ou criando o grafo
@@ -28,7 +36,7 @@ def inicializar_sistema():
     persistencia = SistemaPersistencia('dados')
     
     # Tenta carregar grafo existente
-    grafo = persistencia.carregar_grafo_estrutura()
+    grafo = persistencia.carregar_grafo_estrutura(mostrar_progresso)
     
     if grafo is None:
         print("📝 Criando novo mapa da cidade...")
@@ -39,7 +47,7 @@ def inicializar_sistema():
         print("✅ Mapa carregado com sucesso!")
     
     # Tenta carregar pesos salvos, senão gera novos
-    if not persistencia.carregar_pesos_atuais(grafo):
+    if not persistencia.carregar_pesos_atuais(grafo, mostrar_progresso):
         print("🎲 Gerando pesos aleatórios iniciais...")
         GeradorPesos.gerar_pesos_para_grafo(grafo)
         persistencia.salvar_pesos_atuais(grafo)
@@ -57,7 +65,7 @@ def main():
         grafo, persistencia = inicializar_sistema()
         
         # Cria objetos necessários
-        dijkstra = Dijkstra(grafo)
+        dijkstra = Dijkstra(grafo, tamanho_cache=256, persistencia=persistencia)
         visualizador = VisualizadorMapa(grafo)
         
         # Cria e executa interface
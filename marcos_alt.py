@@ -0,0 +1,206 @@
+"""
+Módulo marcos_alt.py
+Tabelas de marcos (landmarks) para a busca ALT (A*, Landmarks, Triangle inequality)
+
+Para cada marco L são guardadas as distâncias L -> v e v -> L de todos os
+vértices. Pela desigualdade triangular, d(v, t) >= d(L, t) - d(L, v) e
+d(v, t) >= d(v, L) - d(t, L), o que dá ao A* um limite inferior bem mais
+forte que a distância em linha reta. O pré-processamento é só 2k buscas
+completas, barato o bastante para refazer a cada nova geração de pesos.
+"""
+
+import math
+import os
+import struct
+from array import array
+
+from grafo_csr import GrafoCSR, distancias_completas, tipo_array
+
+
+class TabelaMarcos:
+    """Marcos escolhidos e suas tabelas de distâncias de ida e volta"""
+
+    # Identificação do formato binário salvo em disco
+    ASSINATURA_ARQUIVO = b'ALT1'
+
+    def __init__(self, ids, marcos, distancias_de, distancias_para, assinatura=None):
+        """
+        Inicializa a tabela a partir dos dados já calculados
+
+        Args:
+            ids: lista de ids dos vértices (posição = índice inteiro)
+            marcos: índices dos vértices escolhidos como marcos
+            distancias_de: lista de arrays; distancias_de[i][v] = d(marco_i, v)
+            distancias_para: lista de arrays; distancias_para[i][v] = d(v, marco_i)
+            assinatura: impressão digital do grafo de origem (GrafoCSR.assinatura)
+        """
+        self.ids = ids
+        self.indices = {v_id: i for i, v_id in enumerate(ids)}
+        self.marcos = marcos
+        self.distancias_de = distancias_de
+        self.distancias_para = distancias_para
+        self.assinatura = assinatura
+        # Versão do Grafo em memória que originou a tabela (não é salva)
+        self.versao_grafo = None
+
+    @staticmethod
+    def construir(grafo, quantidade=8, selecao='distante'):
+        """
+        Escolhe os marcos e calcula as tabelas de distâncias
+
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+            quantidade: número de marcos (k)
+            selecao: 'distante' (cada marco é o vértice mais longe dos já
+                escolhidos) ou 'planar' (setores angulares em volta do centro
+                do mapa, usando as coordenadas x/y)
+
+        Returns:
+            objeto TabelaMarcos
+        """
+        if selecao not in ('distante', 'planar'):
+            raise ValueError(f"Seleção de marcos desconhecida: {selecao!r}")
+
+        csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+        if csr is None:
+            csr = GrafoCSR.from_grafo(grafo)
+
+        n = csr.num_vertices
+        quantidade = min(quantidade, n)
+        rev_deslocamentos, rev_origens, rev_arestas = csr.reversa()
+        rev_pesos = array(tipo_array(csr.pesos), (csr.pesos[k] for k in rev_arestas))
+
+        def ida(marco):
+            return distancias_completas(csr.deslocamentos, csr.vizinhos, csr.pesos, marco)
+
+        def volta(marco):
+            return distancias_completas(rev_deslocamentos, rev_origens, rev_pesos, marco)
+
+        marcos = []
+        distancias_de = []
+        distancias_para = []
+
+        def adicionar(marco):
+            marcos.append(marco)
+            distancias_de.append(ida(marco))
+            distancias_para.append(volta(marco))
+
+        if selecao == 'planar' and quantidade > 0:
+            for marco in TabelaMarcos._marcos_planares(csr, quantidade):
+                adicionar(marco)
+
+        if quantidade > 0 and not marcos:
+            # Começa pelo vértice mais distante do vértice 0
+            inicial = ida(0)
+            adicionar(max(range(n), key=lambda v: (inicial[v] if inicial[v] != math.inf else -1)))
+
+        # Completa com o vértice mais longe de todos os marcos (inalcançáveis primeiro)
+        while len(marcos) < quantidade:
+            escolhidos = set(marcos)
+            melhor, melhor_distancia = -1, -1.0
+            for v in range(n):
+                if v in escolhidos:
+                    continue
+                mais_proximo = min(min(de[v], para[v]) for de, para in zip(distancias_de, distancias_para))
+                if mais_proximo > melhor_distancia:
+                    melhor, melhor_distancia = v, mais_proximo
+            adicionar(melhor)
+
+        tabela = TabelaMarcos(list(csr.ids), marcos, distancias_de, distancias_para, csr.assinatura())
+        tabela.versao_grafo = getattr(grafo, 'versao', None)
+        return tabela
+
+    @staticmethod
+    def _marcos_planares(csr, quantidade):
+        """
+        Divide o mapa em setores angulares em volta do centro e escolhe, em
+        cada setor, o vértice mais afastado do centro
+
+        Returns:
+            lista de índices (pode ter menos que quantidade se houver setor vazio)
+        """
+        n = csr.num_vertices
+        centro_x = sum(csr.xs) / n
+        centro_y = sum(csr.ys) / n
+        melhores = {}
+        for v in range(n):
+            dx = csr.xs[v] - centro_x
+            dy = csr.ys[v] - centro_y
+            setor = int((math.atan2(dy, dx) + math.pi) / (2 * math.pi) * quantidade) % quantidade
+            raio = math.hypot(dx, dy)
+            if setor not in melhores or raio > melhores[setor][0]:
+                melhores[setor] = (raio, v)
+        return [v for _, v in (melhores[s] for s in sorted(melhores))]
+
+    def limite_inferior(self, v, t):
+        """
+        Limite inferior de d(v, t) pela desigualdade triangular
+
+        Args:
+            v: índice do vértice atual
+            t: índice do destino
+
+        Returns:
+            estimativa que nunca supera a distância real
+        """
+        melhor = 0
+        for de, para in zip(self.distancias_de, self.distancias_para):
+            # Termos com distâncias infinitas não dão informação útil
+            a = de[t] - de[v]
+            if a > melhor and a != math.inf:
+                melhor = a
+            b = para[v] - para[t]
+            if b > melhor and b != math.inf:
+                melhor = b
+        return melhor
+
+    def salvar(self, arquivo):
+        """
+        Salva as tabelas em arquivo binário compacto
+
+        Formato: 'ALT1', assinatura (40 bytes ASCII), n e k (uint32), índices
+        dos marcos (int32) e as 2k tabelas de distâncias (float64).
+        Os ids dos vértices não são gravados: a assinatura garante que a
+        tabela só é usada com o mesmo grafo.
+
+        Args:
+            arquivo: caminho do arquivo
+        """
+        # Escreve ao lado e renomeia: uma queda não deixa arquivo pela metade
+        temporario = arquivo + '.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(self.ASSINATURA_ARQUIVO)
+            f.write((self.assinatura or '').encode('ascii').ljust(40, b'\0'))
+            f.write(struct.pack('<II', len(self.ids), len(self.marcos)))
+            array('i', self.marcos).tofile(f)
+            for tabela in self.distancias_de + self.distancias_para:
+                tabela.tofile(f)
+        os.replace(temporario, arquivo)
+
+    @staticmethod
+    def carregar(arquivo, ids):
+        """
+        Carrega tabelas salvas com salvar()
+
+        Args:
+            arquivo: caminho do arquivo
+            ids: lista de ids dos vértices do grafo, na ordem do GrafoCSR
+
+        Returns:
+            objeto TabelaMarcos ou None se o arquivo não for válido para ids
+        """
+        with open(arquivo, 'rb') as f:
+            if f.read(4) != TabelaMarcos.ASSINATURA_ARQUIVO:
+                return None
+            assinatura = f.read(40).rstrip(b'\0').decode('ascii')
+            n, k = struct.unpack('<II', f.read(8))
+            if n != len(ids):
+                return None
+            marcos = array('i')
+            marcos.fromfile(f, k)
+            tabelas = []
+            for _ in range(2 * k):
+                tabela = array('d')
+                tabela.fromfile(f, n)
+                tabelas.append(tabela)
+        return TabelaMarcos(list(ids), list(marcos), tabelas[:k], tabelas[k:], assinatura)
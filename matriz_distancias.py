@@ -0,0 +1,186 @@
+"""
+Módulo matriz_distancias.py
+Tabelas de custo origem x destino calculadas em paralelo
+
+Cada origem distinta gera uma única busca completa (sem destino), e as
+origens são repartidas entre processos. O grafo vai para os processos uma
+vez só, como arrays CSR em memória compartilhada, em vez de ser serializado
+a cada tarefa.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from grafo_csr import GrafoCSR, distancias_completas, tipo_array
+
+
+class GrafoCompartilhado:
+    """Arrays CSR (deslocamentos, vizinhos, pesos) em memória compartilhada"""
+
+    CAMPOS = ('deslocamentos', 'vizinhos', 'pesos')
+
+    def __init__(self, csr):
+        """
+        Copia os arrays do grafo para blocos de memória compartilhada
+
+        Args:
+            csr: objeto GrafoCSR
+        """
+        self.blocos = []
+        self.descritor = []
+        for campo in self.CAMPOS:
+            dados = getattr(csr, campo)
+            bloco = shared_memory.SharedMemory(create=True, size=max(1, len(dados) * dados.itemsize))
+            bloco.buf[:len(dados) * dados.itemsize] = dados.tobytes()
+            self.blocos.append(bloco)
+            self.descritor.append((bloco.name, tipo_array(dados), len(dados)))
+
+    @staticmethod
+    def conectar(descritor):
+        """
+        Abre, em outro processo, os arrays criados por um GrafoCompartilhado
+
+        Args:
+            descritor: atributo descritor do objeto criado no processo principal
+
+        Returns:
+            tupla (arrays, blocos): memoryviews tipadas na ordem de CAMPOS e os
+            blocos abertos (que devem continuar referenciados enquanto os
+            arrays forem usados)
+        """
+        arrays = []
+        blocos = []
+        for nome, tipo, tamanho in descritor:
+            # Os trabalhadores herdam o rastreador de recursos do processo
+            # principal, que é quem cria e libera os blocos
+            bloco = shared_memory.SharedMemory(name=nome)
+            blocos.append(bloco)
+            arrays.append(bloco.buf.cast(tipo)[:tamanho])
+        return arrays, blocos
+
+    def fechar(self):
+        """Libera os blocos de memória compartilhada"""
+        for bloco in self.blocos:
+            bloco.close()
+            bloco.unlink()
+        self.blocos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+# Estado de cada processo trabalhador, preenchido uma vez por _iniciar_trabalhador
+_arrays_trabalhador = None
+_destinos_trabalhador = None
+_blocos_trabalhador = []
+
+
+def _iniciar_trabalhador(descritor, destinos):
+    """Conecta o processo trabalhador aos arrays compartilhados"""
+    global _arrays_trabalhador, _destinos_trabalhador
+    arrays, blocos = GrafoCompartilhado.conectar(descritor)
+    _blocos_trabalhador.extend(blocos)
+    _arrays_trabalhador = arrays
+    _destinos_trabalhador = destinos
+
+
+def _linhas_trabalhador(origens):
+    """
+    Calcula as linhas da matriz para um lote de origens
+
+    Args:
+        origens: lista de índices de origem
+
+    Returns:
+        lista de arrays NumPy com o custo até cada destino
+    """
+    deslocamentos, vizinhos, pesos = _arrays_trabalhador
+    linhas = []
+    for origem in origens:
+        distancias = np.frombuffer(distancias_completas(deslocamentos, vizinhos, pesos, origem), dtype=np.float64)
+        linhas.append(distancias[_destinos_trabalhador])
+    return linhas
+
+
+class MatrizDistancias:
+    """Calcula tabelas de custo entre conjuntos de origens e destinos"""
+
+    def __init__(self, grafo):
+        """
+        Inicializa a calculadora
+
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+        """
+        csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+        if csr is None:
+            csr = GrafoCSR.from_grafo(grafo)
+        self.csr = csr
+
+    def calcular(self, origens=None, destinos=None, processos=None, tamanho_lote=None):
+        """
+        Calcula o custo do menor caminho de cada origem para cada destino
+
+        Args:
+            origens: lista de ids de origem (None = todos os vértices)
+            destinos: lista de ids de destino (None = todos os vértices)
+            processos: número de processos (None = núcleos da máquina;
+                1 = calcula no próprio processo)
+            tamanho_lote: origens por tarefa enviada a um processo
+
+        Returns:
+            tupla (matriz, indice_origens, indice_destinos) onde matriz é um
+            array NumPy (origens x destinos) com infinito nos pares sem caminho
+            e os índices mapeiam id -> linha/coluna
+        """
+        csr = self.csr
+        origens = list(csr.ids) if origens is None else list(origens)
+        destinos = list(csr.ids) if destinos is None else list(destinos)
+        for v_id in origens + destinos:
+            if v_id not in csr.indices:
+                raise KeyError(f"Vértice inexistente: {v_id!r}")
+
+        # Uma linha por origem distinta; repetições apontam para a mesma linha
+        indice_origens = {}
+        for v_id in origens:
+            indice_origens.setdefault(v_id, len(indice_origens))
+        indice_destinos = {}
+        for v_id in destinos:
+            indice_destinos.setdefault(v_id, len(indice_destinos))
+
+        linhas_origem = [csr.indices[v_id] for v_id in indice_origens]
+        colunas = np.array([csr.indices[v_id] for v_id in indice_destinos], dtype=np.int64)
+        matriz = np.full((len(indice_origens), len(indice_destinos)), np.inf)
+
+        processos = processos or os.cpu_count() or 1
+        processos = min(processos, len(linhas_origem))
+        if processos <= 1:
+            for linha, origem in enumerate(linhas_origem):
+                distancias = distancias_completas(csr.deslocamentos, csr.vizinhos, csr.pesos, origem)
+                matriz[linha] = np.frombuffer(distancias, dtype=np.float64)[colunas]
+            return matriz, indice_origens, indice_destinos
+
+        if tamanho_lote is None:
+            # Alguns lotes por processo equilibram a carga sem excesso de tarefas
+            tamanho_lote = max(1, len(linhas_origem) // (processos * 4))
+        lotes = [linhas_origem[i:i + tamanho_lote] for i in range(0, len(linhas_origem), tamanho_lote)]
+
+        with GrafoCompartilhado(csr) as compartilhado:
+            with ProcessPoolExecutor(
+                max_workers=processos,
+                initializer=_iniciar_trabalhador,
+                initargs=(compartilhado.descritor, colunas)
+            ) as executor:
+                linha = 0
+                for resultado in executor.map(_linhas_trabalhador, lotes):
+                    for distancias in resultado:
+                        matriz[linha] = distancias
+                        linha += 1
+
+        return matriz, indice_origens, indice_destinos
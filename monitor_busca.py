@@ -0,0 +1,301 @@
+"""
+Módulo monitor_busca.py
+Estatísticas por consulta das buscas de menor caminho e agregação em histogramas
+
+Quando o Dijkstra tem algum monitor registrado (Dijkstra.adicionar_monitor),
+cada consulta gera um EstatisticasBusca com o que a busca fez: vértices
+fechados, arestas relaxadas, inserções e extrações descartadas da fila,
+tamanho máximo da fila e o tempo gasto na busca e na montagem dos detalhes
+do caminho. Sem monitores nada disso é contado.
+
+HistogramaBusca é um monitor pronto que acumula essas medidas em
+histogramas de faixas em potências de 2, para acompanhar (inclusive em
+produção) a distribuição das consultas e achar as lentas.
+"""
+
+import heapq
+import math
+import threading
+
+
+class EstatisticasBusca:
+    """Contadores e tempos de uma consulta"""
+
+    __slots__ = (
+        'algoritmo', 'origem_id', 'destino_id', 'fonte', 'encontrado',
+        'vertices_fechados', 'arestas_relaxadas', 'insercoes', 'extracoes',
+        'na_fila', 'maior_fila', 'tempo_total', 'tempo_detalhes'
+    )
+
+    # Medidas numéricas agregadas pelos monitores (tempos em milissegundos)
+    MEDIDAS = (
+        'vertices_fechados', 'arestas_relaxadas', 'insercoes', 'extracoes_descartadas',
+        'maior_fila', 'tempo_busca_ms', 'tempo_detalhes_ms', 'tempo_total_ms'
+    )
+
+    def __init__(self, algoritmo, origem_id, destino_id):
+        """
+        Inicializa as estatísticas zeradas de uma consulta
+
+        Args:
+            algoritmo: algoritmo usado na consulta
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+        """
+        self.algoritmo = algoritmo
+        self.origem_id = origem_id
+        self.destino_id = destino_id
+        # 'busca', 'cache' (rota pronta) ou 'arvore' (árvore da origem já calculada)
+        self.fonte = 'busca'
+        self.encontrado = False
+        self.vertices_fechados = 0
+        self.arestas_relaxadas = 0
+        self.insercoes = 0
+        self.extracoes = 0
+        self.na_fila = 0
+        self.maior_fila = 0
+        # Segundos
+        self.tempo_total = 0.0
+        self.tempo_detalhes = 0.0
+
+    def empurrar(self, fila, item):
+        """heapq.heappush que conta a inserção"""
+        heapq.heappush(fila, item)
+        self.insercoes += 1
+        self.na_fila += 1
+        if self.na_fila > self.maior_fila:
+            self.maior_fila = self.na_fila
+
+    def retirar(self, fila):
+        """heapq.heappop que conta a extração"""
+        self.extracoes += 1
+        self.na_fila -= 1
+        return heapq.heappop(fila)
+
+    def sem_contagem(self):
+        """
+        Marca os contadores como não medidos: resultado pronto (cache ou
+        árvore) ou busca feita fora do Dijkstra (hierarquia)
+        """
+        self.vertices_fechados = None
+        self.arestas_relaxadas = None
+        self.insercoes = None
+        self.extracoes = None
+        self.maior_fila = None
+
+    @property
+    def extracoes_descartadas(self):
+        """Extrações de entradas velhas (vértice já fechado com distância menor)"""
+        if self.extracoes is None:
+            return None
+        return self.extracoes - self.vertices_fechados
+
+    @property
+    def tempo_busca_ms(self):
+        """Tempo da consulta fora da montagem dos detalhes, em milissegundos"""
+        return (self.tempo_total - self.tempo_detalhes) * 1000
+
+    @property
+    def tempo_detalhes_ms(self):
+        """Tempo de montagem dos detalhes do caminho, em milissegundos"""
+        return self.tempo_detalhes * 1000
+
+    @property
+    def tempo_total_ms(self):
+        """Tempo total da consulta, em milissegundos"""
+        return self.tempo_total * 1000
+
+    def como_dict(self):
+        """
+        Converte as estatísticas para dicionário
+
+        Returns:
+            dicionário com a identificação da consulta e as MEDIDAS
+        """
+        dados = {
+            'algoritmo': self.algoritmo,
+            'origem_id': self.origem_id,
+            'destino_id': self.destino_id,
+            'fonte': self.fonte,
+            'encontrado': self.encontrado
+        }
+        for medida in self.MEDIDAS:
+            dados[medida] = getattr(self, medida)
+        return dados
+
+    def __repr__(self):
+        return (f"EstatisticasBusca({self.algoritmo}, {self.origem_id!r} -> {self.destino_id!r}, "
+                f"fechados={self.vertices_fechados}, relaxadas={self.arestas_relaxadas}, "
+                f"{self.tempo_total_ms:.3f} ms)")
+
+
+class FilaContada:
+    """Envolve uma FilaHeap/FilaBaldes contando inserções e extrações"""
+
+    def __init__(self, fila, estatisticas):
+        """
+        Args:
+            fila: fila com inserir/extrair (fila_prioridade)
+            estatisticas: EstatisticasBusca que recebe as contagens
+        """
+        self.fila = fila
+        self.estatisticas = estatisticas
+
+    def inserir(self, prioridade, item):
+        """Insere na fila envolvida e conta"""
+        self.fila.inserir(prioridade, item)
+        estatisticas = self.estatisticas
+        estatisticas.insercoes += 1
+        estatisticas.na_fila += 1
+        if estatisticas.na_fila > estatisticas.maior_fila:
+            estatisticas.maior_fila = estatisticas.na_fila
+
+    def extrair(self):
+        """Extrai da fila envolvida e conta"""
+        self.estatisticas.extracoes += 1
+        self.estatisticas.na_fila -= 1
+        return self.fila.extrair()
+
+    def __len__(self):
+        return len(self.fila)
+
+
+def _faixa(valor):
+    """
+    Faixa do histograma de um valor: 0 para valores até 0; k para valores
+    em [2^(k-1), 2^k) quando valor >= 1; negativa abaixo de 1 (frações)
+    """
+    if valor <= 0:
+        return 0
+    # frexp: valor = m * 2^e com 0.5 <= m < 1, logo 2^(e-1) <= valor < 2^e
+    expoente = math.frexp(valor)[1]
+    return expoente if expoente > 0 else expoente - 1
+
+
+def _limites(faixa):
+    """Intervalo [inferior, superior) coberto por uma faixa"""
+    if faixa == 0:
+        return 0, 0
+    if faixa > 0:
+        return 2.0 ** (faixa - 1), 2.0 ** faixa
+    return 2.0 ** faixa, 2.0 ** (faixa + 1)
+
+
+class HistogramaBusca:
+    """
+    Monitor que agrega as estatísticas das consultas em histogramas
+
+    Uso:
+        histograma = HistogramaBusca()
+        dijkstra.adicionar_monitor(histograma)
+        ...
+        histograma.resumo()
+    """
+
+    def __init__(self):
+        """Inicializa o histograma vazio"""
+        # Vários Dijkstra (um por thread) podem compartilhar o mesmo histograma
+        self._trava = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        """Descarta tudo o que foi acumulado"""
+        with self._trava:
+            self.consultas = 0
+            self.por_fonte = {}
+            self.por_algoritmo = {}
+            self.sem_caminho = 0
+            # medida -> {faixa: quantidade}
+            self.faixas = {medida: {} for medida in EstatisticasBusca.MEDIDAS}
+            # medida -> [quantidade, soma, maior]
+            self.totais = {medida: [0, 0, 0] for medida in EstatisticasBusca.MEDIDAS}
+
+    def __call__(self, estatisticas):
+        """
+        Acumula as estatísticas de uma consulta
+
+        Args:
+            estatisticas: objeto EstatisticasBusca
+        """
+        valores = [(medida, getattr(estatisticas, medida)) for medida in EstatisticasBusca.MEDIDAS]
+        with self._trava:
+            self.consultas += 1
+            self.por_fonte[estatisticas.fonte] = self.por_fonte.get(estatisticas.fonte, 0) + 1
+            self.por_algoritmo[estatisticas.algoritmo] = self.por_algoritmo.get(estatisticas.algoritmo, 0) + 1
+            if not estatisticas.encontrado:
+                self.sem_caminho += 1
+            for medida, valor in valores:
+                if valor is None:
+                    continue
+                faixas = self.faixas[medida]
+                faixa = _faixa(valor)
+                faixas[faixa] = faixas.get(faixa, 0) + 1
+                total = self.totais[medida]
+                total[0] += 1
+                total[1] += valor
+                if valor > total[2]:
+                    total[2] = valor
+
+    def histograma(self, medida):
+        """
+        Faixas não vazias de uma medida
+
+        Args:
+            medida: um de EstatisticasBusca.MEDIDAS
+
+        Returns:
+            lista de tuplas (inferior, superior, quantidade) em ordem crescente;
+            a faixa (0, 0) conta os valores zero
+        """
+        with self._trava:
+            faixas = sorted(self.faixas[medida].items())
+        return [(*_limites(faixa), quantidade) for faixa, quantidade in faixas]
+
+    def percentil(self, medida, p):
+        """
+        Percentil aproximado de uma medida (limite superior da faixa)
+
+        Args:
+            medida: um de EstatisticasBusca.MEDIDAS
+            p: percentil entre 0 e 100
+
+        Returns:
+            valor aproximado (no máximo o dobro do real) ou None sem dados
+        """
+        faixas = self.histograma(medida)
+        total = sum(quantidade for _, _, quantidade in faixas)
+        if total == 0:
+            return None
+        alvo = p / 100 * total
+        acumulado = 0
+        for _, superior, quantidade in faixas:
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return superior
+        return faixas[-1][1]
+
+    def resumo(self):
+        """
+        Resume o que foi acumulado
+
+        Returns:
+            dicionário com consultas, por_fonte, por_algoritmo, sem_caminho e,
+            para cada medida, quantidade, media, maximo, p50 e p99
+        """
+        with self._trava:
+            resumo = {
+                'consultas': self.consultas,
+                'por_fonte': dict(self.por_fonte),
+                'por_algoritmo': dict(self.por_algoritmo),
+                'sem_caminho': self.sem_caminho
+            }
+            totais = {medida: list(total) for medida, total in self.totais.items()}
+        for medida, (quantidade, soma, maior) in totais.items():
+            resumo[medida] = {
+                'quantidade': quantidade,
+                'media': soma / quantidade if quantidade else None,
+                'maximo': maior if quantidade else None,
+                'p50': self.percentil(medida, 50),
+                'p99': self.percentil(medida, 99)
+            }
+        return resumo
@@ -3,91 +3,124 @@ Módulo persistencia.py
 Gerencia salvamento e carregamento de dados do grafo
 """
 
-import json
 import os
+from contextlib import ExitStack
+from banco_sqlite import BancoSQLite
 from grafo import Vertice, Grafo
+from grafo_binario import salvar_grafo_binario, carregar_grafo_binario
+from grafo_csr import GrafoCSR
+from gravador_json import GravadorJSON, localizar
+from hierarquia_contracao import HierarquiaContracao
+from leitor_json import ler_registros
+from marcos_alt import TabelaMarcos
+from registro_pesos import RegistroPesos
 
 
 class SistemaPersistencia:
     """Classe responsável pela persistência de dados"""
     
-    def __init__(self, diretorio_dados='dados'):
+    # Entradas no registro de pesos a partir das quais ele é compactado
+    LIMITE_REGISTRO = 10000
+    
+    ARMAZENAMENTOS = ('json', 'sqlite')
+    
+    def __init__(self, diretorio_dados='dados', limite_registro=None, armazenamento='json', compressao=None):
         """
         Inicializa o sistema de persistência
         
         Args:
             diretorio_dados: diretório onde os dados serão salvos
+            limite_registro: entradas no registro de pesos que disparam a
+                compactação (None = LIMITE_REGISTRO)
+            armazenamento: onde ficam grafo e pesos: 'json' (grafo_cidade.json,
+                pesos_atuais.json e registro) ou 'sqlite' (mapa.db)
+            compressao: compressão dos arquivos JSON gravados: None, 'gzip'
+                (.json.gz) ou 'lzma' (.json.xz); a leitura aceita qualquer uma
         """
+        if armazenamento not in self.ARMAZENAMENTOS:
+            raise ValueError(f"Armazenamento desconhecido: {armazenamento!r} (opções: {', '.join(self.ARMAZENAMENTOS)})")
+        
         self.diretorio_dados = diretorio_dados
         self.arquivo_grafo = os.path.join(diretorio_dados, 'grafo_cidade.json')
         self.arquivo_pesos = os.path.join(diretorio_dados, 'pesos_atuais.json')
+        self.arquivo_hierarquia = os.path.join(diretorio_dados, 'hierarquia_contracao.json')
+        self.arquivo_marcos = os.path.join(diretorio_dados, 'marcos_alt.bin')
+        self.arquivo_binario = os.path.join(diretorio_dados, 'grafo_cidade.bin')
+        self.arquivo_registro = os.path.join(diretorio_dados, 'pesos_atuais.log')
+        self.limite_registro = limite_registro or self.LIMITE_REGISTRO
+        self.registro = RegistroPesos(self.arquivo_registro)
+        # Última sequência do registro já incorporada a pesos_atuais.json
+        self._sequencia_base = None
+        
+        self.armazenamento = armazenamento
+        self.compressao = compressao
+        self.arquivo_banco = os.path.join(diretorio_dados, 'mapa.db')
         
         # Cria diretório se não existir
         os.makedirs(diretorio_dados, exist_ok=True)
+        
+        self.banco = BancoSQLite(self.arquivo_banco) if armazenamento == 'sqlite' else None
     
     def salvar_grafo_estrutura(self, grafo):
         """
         Salva a estrutura do grafo (vértices e conexões) em arquivo JSON
         
+        A gravação é atômica (arquivo temporário, fsync e renomeação).
+        
         Args:
             grafo: objeto Grafo a ser salvo
         """
-        dados = {
-            'vertices': [],
-            'arestas': []
-        }
+        if self.banco is not None:
+            self.banco.salvar_grafo_estrutura(grafo)
+            return
         
-        # Salva vértices
-        for vertice_id, vertice in grafo.vertices.items():
-            dados['vertices'].append(vertice.to_dict())
-        
-        # Salva arestas (sem duplicatas)
-        arestas_salvas = set()
-        for origem_id, vizinhos in grafo.adjacencias.items():
-            for vizinho in vizinhos:
-                destino_id = vizinho['destino']
-                # Evita duplicatas em grafos bidirecionais
-                aresta_tuple = tuple(sorted([origem_id, destino_id]))
-                if aresta_tuple not in arestas_salvas:
-                    arestas_salvas.add(aresta_tuple)
-                    dados['arestas'].append({
-                        'origem': origem_id,
-                        'destino': destino_id
-                    })
-        
-        # Salva em arquivo
-        with open(self.arquivo_grafo, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, indent=2, ensure_ascii=False)
+        self._salvar_json(grafo, estrutura=True, pesos=False)
     
-    def carregar_grafo_estrutura(self):
+    def carregar_grafo_estrutura(self, progresso=None):
         """
         Carrega a estrutura do grafo de arquivo JSON
         
+        O arquivo é lido incrementalmente: vértices e arestas entram no grafo
+        à medida que são lidos, sem montar antes a árvore JSON inteira.
+        
+        Args:
+            progresso: função progresso(bytes_lidos, bytes_totais, registros)
+                chamada a cada bloco lido (opcional)
+            
         Returns:
             objeto Grafo carregado ou None se arquivo não existir
         """
-        if not os.path.exists(self.arquivo_grafo):
-            return None
+        if self.banco is not None:
+            return self.banco.carregar_grafo_estrutura()
         
-        with open(self.arquivo_grafo, 'r', encoding='utf-8') as f:
-            dados = json.load(f)
+        arquivo_grafo = localizar(self.arquivo_grafo)
+        if arquivo_grafo is None:
+            return None
         
         grafo = Grafo()
-        
-        # Carrega vértices
-        for v_dados in dados['vertices']:
-            vertice = Vertice.from_dict(v_dados)
-            grafo.adicionar_vertice(vertice)
-        
-        # Carrega arestas (com pesos padrão)
-        for a_dados in dados['arestas']:
-            grafo.adicionar_aresta(
-                a_dados['origem'],
-                a_dados['destino'],
-                peso=1,
-                motivo="Condição normal",
-                bidirecional=True
-            )
+        # Arestas que chegaram antes dos seus vértices
+        pendentes = []
+        
+        for chave, registro in ler_registros(arquivo_grafo, progresso):
+            if chave == 'vertices':
+                grafo.adicionar_vertice(Vertice.from_dict(registro))
+            elif chave == 'arestas':
+                # Carrega arestas (com pesos padrão); ruas de mão única vêm
+                # com "bidirecional": false
+                bidirecional = registro.get('bidirecional', True)
+                if registro['origem'] in grafo.vertices and registro['destino'] in grafo.vertices:
+                    grafo.adicionar_aresta(
+                        registro['origem'],
+                        registro['destino'],
+                        peso=1,
+                        motivo="Condição normal",
+                        bidirecional=bidirecional
+                    )
+                else:
+                    pendentes.append((registro['origem'], registro['destino'], bidirecional))
+        
+        for origem_id, destino_id, bidirecional in pendentes:
+            grafo.adicionar_aresta(origem_id, destino_id, peso=1, motivo="Condição normal", bidirecional=bidirecional)
         
         return grafo
     
@@ -95,59 +128,440 @@ class SistemaPersistencia:
         """
         Salva os pesos e motivos atuais das arestas
         
+        É também a compactação do registro de pesos: a base passa a incluir
+        todas as mudanças registradas, e o registro é esvaziado. A base é
+        escrita ao lado e renomeada, para uma queda não deixar o arquivo pela
+        metade; se a queda vier antes de esvaziar o registro, a sequência
+        gravada na base faz as entradas antigas serem ignoradas.
+        
         Args:
             grafo: objeto Grafo com os pesos atuais
         """
-        dados = {
-            'arestas': []
-        }
+        if self.banco is not None:
+            self.banco.salvar_pesos_atuais(grafo)
+            return
+        
+        self._salvar_json(grafo, estrutura=False, pesos=True)
+    
+    def salvar_estado(self, grafo):
+        """
+        Salva estrutura e pesos atuais juntos, em uma única passada pelas ruas
+        
+        Cada arquivo é gravado no formato compacto (comprimido conforme
+        compressao) e de forma atômica; o registro de pesos é compactado.
+        
+        Args:
+            grafo: objeto Grafo a ser salvo
+        """
+        if self.banco is not None:
+            self.banco.salvar_grafo_estrutura(grafo)
+            self.banco.salvar_pesos_atuais(grafo)
+            return
+        
+        self._salvar_json(grafo, estrutura=True, pesos=True)
+    
+    @staticmethod
+    def _arestas_canonicas(grafo):
+        """
+        Percorre as ruas do grafo uma única vez, cada uma num só sentido
         
-        # Salva todas as arestas com seus pesos e motivos
-        arestas_salvas = set()
-        for origem_id, vizinhos in grafo.adjacencias.items():
-            for vizinho in vizinhos:
+        A rua u-v sai no sentido do vértice que vem antes na ordem do grafo,
+        sem montar um conjunto de todos os pares já vistos. O sentido de
+        volta só aparece se tiver peso ou motivo diferente (mudança num só
+        sentido) ou se for o único sentido existente (rua de mão única). De
+        arestas paralelas u→v sai só a primeira, a mesma que obter_aresta
+        devolve e que vale nas buscas.
+        
+        Args:
+            grafo: objeto Grafo
+            
+        Yields:
+            tuplas (origem_id, destino_id, peso, motivo, bidirecional,
+            mao_unica); com bidirecional False a tupla vale só para os pesos
+            daquele sentido; com mao_unica True a rua não tem volta
+        """
+        posicoes = {v_id: i for i, v_id in enumerate(grafo.vertices)}
+        for origem_id in grafo.vertices:
+            posicao = posicoes[origem_id]
+            destinos = set()
+            for vizinho in grafo.obter_vizinhos(origem_id):
                 destino_id = vizinho['destino']
-                # Evita duplicatas
-                aresta_tuple = tuple(sorted([origem_id, destino_id]))
-                if aresta_tuple not in arestas_salvas:
-                    arestas_salvas.add(aresta_tuple)
-                    dados['arestas'].append({
-                        'origem': origem_id,
-                        'destino': destino_id,
-                        'peso': vizinho['peso'],
-                        'motivo': vizinho['motivo']
-                    })
-        
-        # Salva em arquivo
-        with open(self.arquivo_pesos, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, indent=2, ensure_ascii=False)
-    
-    def carregar_pesos_atuais(self, grafo):
+                if destino_id in destinos:
+                    # Paralela: a primeira vence (ver Grafo._inserir_aresta)
+                    continue
+                destinos.add(destino_id)
+                peso = vizinho['peso']
+                motivo = vizinho['motivo']
+                volta = grafo.obter_aresta(destino_id, origem_id)
+                if volta is None:
+                    yield origem_id, destino_id, peso, motivo, True, True
+                elif posicao <= posicoes[destino_id]:
+                    yield origem_id, destino_id, peso, motivo, True, False
+                elif volta['peso'] != peso or volta['motivo'] != motivo:
+                    yield origem_id, destino_id, peso, motivo, False, False
+    
+    def _salvar_json(self, grafo, estrutura, pesos):
+        """
+        Grava grafo_cidade.json e/ou pesos_atuais.json em uma passada
+        
+        Args:
+            grafo: objeto Grafo
+            estrutura: se True, grava vértices e arestas
+            pesos: se True, grava os pesos (e compacta o registro de pesos)
+        """
+        sequencia = self._sequencia_aplicada() if pesos else None
+        
+        with ExitStack() as arquivos:
+            arquivo_grafo = arquivos.enter_context(GravadorJSON(self.arquivo_grafo, self.compressao)) if estrutura else None
+            arquivo_pesos = arquivos.enter_context(GravadorJSON(self.arquivo_pesos, self.compressao)) if pesos else None
+            
+            if arquivo_grafo is not None:
+                arquivo_grafo.iniciar_lista('vertices')
+                for vertice in grafo.vertices.values():
+                    arquivo_grafo.acrescentar(vertice.to_dict())
+                arquivo_grafo.iniciar_lista('arestas')
+            if arquivo_pesos is not None:
+                # 'sequencia' vem antes das arestas (ver _obter_sequencia_base)
+                arquivo_pesos.valor('sequencia', sequencia)
+                arquivo_pesos.iniciar_lista('arestas')
+            
+            for origem_id, destino_id, peso, motivo, bidirecional, mao_unica in self._arestas_canonicas(grafo):
+                if arquivo_grafo is not None and bidirecional:
+                    if mao_unica:
+                        arquivo_grafo.acrescentar({'origem': origem_id, 'destino': destino_id, 'bidirecional': False})
+                    else:
+                        arquivo_grafo.acrescentar({'origem': origem_id, 'destino': destino_id})
+                if arquivo_pesos is not None:
+                    registro = {'origem': origem_id, 'destino': destino_id, 'peso': peso, 'motivo': motivo}
+                    if not bidirecional:
+                        # Sentido contrário com outro peso (mudança num só sentido)
+                        registro['bidirecional'] = False
+                    arquivo_pesos.acrescentar(registro)
+        
+        if pesos:
+            self._sequencia_base = sequencia
+            self.registro.limpar()
+    
+    def atualizar_peso(self, grafo, origem_id, destino_id, novo_peso, novo_motivo, bidirecional=True):
+        """
+        Atualiza o peso de uma aresta no grafo e registra a mudança em disco
+        
+        A gravação é o acréscimo de uma linha ao registro de pesos (O(1)), em
+        vez de regravar pesos_atuais.json. Quando o registro chega a
+        limite_registro entradas, ele é compactado (salvar_pesos_atuais).
+        No SQLite a mudança entra no próximo lote de UPDATEs (ver confirmar).
+        
+        Args:
+            grafo: objeto Grafo
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            novo_peso: novo peso da aresta
+            novo_motivo: novo motivo do peso
+            bidirecional: se True, atualiza nos dois sentidos
+        """
+        grafo.atualizar_peso(origem_id, destino_id, novo_peso, novo_motivo, bidirecional)
+        if self.banco is not None:
+            self.banco.registrar_peso(origem_id, destino_id, novo_peso, novo_motivo, bidirecional)
+            return
+        
+        self.registro.acrescentar(
+            origem_id, destino_id, novo_peso, novo_motivo, bidirecional,
+            sequencia_minima=self._obter_sequencia_base()
+        )
+        if self.registro.quantidade >= self.limite_registro:
+            self.salvar_pesos_atuais(grafo)
+    
+    def confirmar(self):
+        """Grava as mudanças de peso ainda pendentes (lote do SQLite)"""
+        if self.banco is not None:
+            self.banco.confirmar()
+    
+    def fechar(self):
+        """Grava o que estiver pendente e libera os arquivos abertos"""
+        if self.banco is not None:
+            self.banco.fechar()
+            self.banco = None
+        self.registro.fechar()
+    
+    def _obter_sequencia_base(self):
+        """Sequência do registro já incorporada a pesos_atuais.json (0 se nenhuma)"""
+        if self._sequencia_base is None:
+            self._sequencia_base = 0
+            arquivo_pesos = localizar(self.arquivo_pesos)
+            if arquivo_pesos is not None:
+                # 'sequencia' é gravada antes das arestas: basta o primeiro registro
+                for chave, valor in ler_registros(arquivo_pesos):
+                    if chave == 'sequencia':
+                        self._sequencia_base = valor
+                    break
+        return self._sequencia_base
+    
+    def _sequencia_aplicada(self):
+        """Última sequência do registro refletida num grafo carregado (base ou registro)"""
+        return max(self.registro.sequencia_gravada(), self._obter_sequencia_base())
+    
+    def _reaplicar_registro(self, grafo, apos_sequencia=None):
+        """Aplica ao grafo as mudanças registradas depois da base (ou de apos_sequencia)"""
+        if apos_sequencia is None:
+            apos_sequencia = self._obter_sequencia_base()
+        for entrada in self.registro.entradas(apos_sequencia):
+            grafo.atualizar_peso(
+                entrada['origem'],
+                entrada['destino'],
+                entrada['peso'],
+                entrada['motivo'],
+                bidirecional=entrada['bidirecional']
+            )
+    
+    def carregar_pesos_atuais(self, grafo, progresso=None):
         """
         Carrega os pesos e motivos salvos e aplica ao grafo
         
+        Cada peso é aplicado assim que é lido do arquivo (leitura incremental).
+        Depois são reaplicadas as mudanças do registro de pesos posteriores à
+        base.
+        
         Args:
             grafo: objeto Grafo a ter seus pesos atualizados
+            progresso: função progresso(bytes_lidos, bytes_totais, registros)
+                chamada a cada bloco lido (opcional)
             
         Returns:
             True se carregou com sucesso, False caso contrário
         """
-        if not os.path.exists(self.arquivo_pesos):
-            return False
+        if self.banco is not None:
+            return self.banco.carregar_pesos_atuais(grafo)
         
-        with open(self.arquivo_pesos, 'r', encoding='utf-8') as f:
-            dados = json.load(f)
+        arquivo_pesos = localizar(self.arquivo_pesos)
+        if arquivo_pesos is None and not os.path.exists(self.arquivo_registro):
+            return False
         
         # Atualiza pesos das arestas
-        for aresta in dados['arestas']:
-            grafo.atualizar_peso(
-                aresta['origem'],
-                aresta['destino'],
-                aresta['peso'],
-                aresta['motivo'],
-                bidirecional=True
-            )
+        self._sequencia_base = 0
+        if arquivo_pesos is not None:
+            for chave, aresta in ler_registros(arquivo_pesos, progresso):
+                if chave == 'sequencia':
+                    self._sequencia_base = aresta
+                if chave != 'arestas':
+                    continue
+                grafo.atualizar_peso(
+                    aresta['origem'],
+                    aresta['destino'],
+                    aresta['peso'],
+                    aresta['motivo'],
+                    bidirecional=aresta.get('bidirecional', True)
+                )
+        
+        # Mudanças registradas depois da base
+        self._reaplicar_registro(grafo)
+        
+        return True
+    
+    def carregar_subgrafo(self, x_min, y_min, x_max, y_max):
+        """
+        Carrega só a região do mapa dentro de um retângulo de coordenadas
+        
+        No SQLite a consulta usa o índice de coordenadas e não lê o resto da
+        cidade; nos arquivos JSON eles são percorridos inteiros (lendo de
+        forma incremental) e só a região é montada.
+        
+        Args:
+            x_min, y_min, x_max, y_max: limites do retângulo (inclusivos)
+            
+        Returns:
+            objeto Grafo com os vértices da região, as arestas entre eles e os
+            pesos atuais, ou None se não houver grafo salvo
+        """
+        if self.banco is not None:
+            if not self.banco.tem_grafo():
+                return None
+            return self.banco.carregar_subgrafo(x_min, y_min, x_max, y_max)
+        
+        arquivo_grafo = localizar(self.arquivo_grafo)
+        if arquivo_grafo is None:
+            return None
+        
+        grafo = Grafo()
+        pares = []
+        for chave, registro in ler_registros(arquivo_grafo):
+            if chave == 'vertices':
+                if x_min <= registro['x'] <= x_max and y_min <= registro['y'] <= y_max:
+                    grafo.adicionar_vertice(Vertice.from_dict(registro))
+            elif chave == 'arestas':
+                pares.append((registro['origem'], registro['destino'], registro.get('bidirecional', True)))
+        
+        for origem_id, destino_id, bidirecional in pares:
+            if origem_id in grafo.vertices and destino_id in grafo.vertices:
+                grafo.adicionar_aresta(origem_id, destino_id, peso=1, motivo="Condição normal", bidirecional=bidirecional)
+        
+        # Pesos de arestas fora da região são ignorados pelo grafo
+        self.carregar_pesos_atuais(grafo)
+        return grafo
+    
+    def salvar_hierarquia(self, hierarquia):
+        """
+        Salva a hierarquia de contração ao lado dos pesos atuais
+        
+        Args:
+            hierarquia: objeto HierarquiaContracao
+        """
+        hierarquia.salvar(self.arquivo_hierarquia)
+    
+    def carregar_hierarquia(self, grafo):
+        """
+        Carrega a hierarquia de contração salva, se ainda valer para o grafo
+        
+        Args:
+            grafo: objeto Grafo com os pesos atuais
+            
+        Returns:
+            objeto HierarquiaContracao ou None se não existir ou se tiver sido
+            calculada para outros pesos
+        """
+        if not os.path.exists(self.arquivo_hierarquia):
+            return None
+        
+        hierarquia = HierarquiaContracao.carregar(self.arquivo_hierarquia)
+        csr = getattr(grafo, 'csr', None) or GrafoCSR.from_grafo(grafo)
+        if hierarquia.assinatura != csr.assinatura():
+            return None
+        return hierarquia
+    
+    def salvar_marcos(self, marcos):
+        """
+        Salva as tabelas de marcos (ALT) em formato binário
+        
+        Args:
+            marcos: objeto TabelaMarcos
+        """
+        marcos.salvar(self.arquivo_marcos)
+    
+    def carregar_marcos(self, grafo):
+        """
+        Carrega as tabelas de marcos salvas, se ainda valerem para o grafo
+        
+        Args:
+            grafo: objeto Grafo com os pesos atuais
+            
+        Returns:
+            objeto TabelaMarcos ou None se não existir ou se os pesos atuais
+            (pesos_atuais.json) mudaram desde que foi salva
+        """
+        if not os.path.exists(self.arquivo_marcos):
+            return None
+        
+        csr = getattr(grafo, 'csr', None) or GrafoCSR.from_grafo(grafo)
+        marcos = TabelaMarcos.carregar(self.arquivo_marcos, csr.ids)
+        if marcos is None or marcos.assinatura != csr.assinatura():
+            return None
+        return marcos
+    
+    def carregar_grafo_compacto(self, progresso=None):
+        """
+        Carrega estrutura e pesos direto para a representação compacta (CSR)
+        
+        Args:
+            progresso: função progresso(bytes_lidos, bytes_totais, registros)
+                chamada a cada bloco lido de cada arquivo (opcional)
+            
+        Returns:
+            objeto GrafoCompacto (API do Grafo sobre arrays) ou None se
+            o arquivo do grafo não existir
+        """
+        if self.banco is not None:
+            csr = self.banco.carregar_csr()
+            return csr.como_grafo() if csr is not None else None
+        
+        arquivo_grafo = localizar(self.arquivo_grafo)
+        if arquivo_grafo is None:
+            return None
+        
+        self._sequencia_base = None
+        grafo = GrafoCSR.from_json(arquivo_grafo, localizar(self.arquivo_pesos), progresso).como_grafo()
+        self._reaplicar_registro(grafo)
+        return grafo
+    
+    def salvar_grafo_binario(self, grafo):
+        """
+        Salva estrutura e pesos atuais no instantâneo binário (grafo_binario)
+        
+        O instantâneo guarda a última sequência do registro de pesos já
+        refletida no grafo (o grafo deve ter sido carregado deste diretório,
+        com o registro reaplicado); as mudanças posteriores são reaplicadas
+        ao carregar.
+        
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+        """
+        sequencia = self._sequencia_aplicada() if self.banco is None else 0
+        salvar_grafo_binario(grafo, self.arquivo_binario, sequencia)
+    
+    def carregar_grafo_binario(self):
+        """
+        Carrega o instantâneo binário por mapeamento de memória
+        
+        Os arrays não são copiados: processos que carregam o mesmo arquivo
+        compartilham as páginas, e a carga não depende do tamanho do grafo
+        (só os ids e motivos são decodificados). As mudanças do registro de
+        pesos posteriores ao instantâneo são reaplicadas (só as páginas
+        tocadas deixam de ser compartilhadas).
+        
+        Returns:
+            objeto GrafoCompacto ou None se o arquivo não existir
+            
+        Raises:
+            ValueError: se pesos_atuais.json incorporou mudanças mais novas
+                que o instantâneo (que o registro não tem mais como refazer);
+                gere o instantâneo de novo (converter_json_para_binario)
+        """
+        if not os.path.exists(self.arquivo_binario):
+            return None
+        
+        csr = carregar_grafo_binario(self.arquivo_binario)
+        grafo = csr.como_grafo()
+        if self.banco is None:
+            if self._obter_sequencia_base() > csr.sequencia:
+                raise ValueError(
+                    f"Instantâneo binário desatualizado: inclui o registro até {csr.sequencia}, "
+                    f"mas pesos_atuais.json já está em {self._obter_sequencia_base()}"
+                )
+            self._reaplicar_registro(grafo, csr.sequencia)
+        return grafo
+    
+    def converter_json_para_binario(self, progresso=None):
+        """
+        Gera o instantâneo binário a partir dos arquivos JSON
+        
+        Args:
+            progresso: função progresso(bytes_lidos, bytes_totais, registros)
+                chamada a cada bloco lido (opcional)
+            
+        Returns:
+            True se converteu, False se não houver grafo_cidade.json
+        """
+        grafo = self.carregar_grafo_compacto(progresso)
+        if grafo is None:
+            return False
+        
+        self.salvar_grafo_binario(grafo)
+        return True
+    
+    def converter_binario_para_json(self):
+        """
+        Regrava grafo_cidade.json e pesos_atuais.json a partir do binário
+        
+        O registro de pesos só é compactado depois de reaplicado ao grafo
+        (em carregar_grafo_binario).
+        
+        Returns:
+            True se converteu, False se não houver instantâneo binário
+        """
+        grafo = self.carregar_grafo_binario()
+        if grafo is None:
+            return False
         
+        self.salvar_grafo_estrutura(grafo)
+        self.salvar_pesos_atuais(grafo)
         return True
     
     def criar_grafo_padrao(self):
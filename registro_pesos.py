@@ -0,0 +1,171 @@
+"""
+Módulo registro_pesos.py
+Registro (log) de mudanças de peso, só de acréscimo e com soma de verificação
+
+Regravar pesos_atuais.json inteiro a cada rua alterada custa O(E). Aqui cada
+mudança vira uma linha acrescentada ao fim do registro, com número de
+sequência, instante e um CRC32 do conteúdo:
+
+    <crc32 em hexadecimal> {"sequencia": ..., "origem": ..., "destino": ...,
+                            "peso": ..., "motivo": ..., "bidirecional": ...,
+                            "instante": ...}
+
+Uma queda no meio da escrita deixa no máximo uma linha incompleta no fim,
+que falha na verificação e é descartada (e cortada antes do próximo
+acréscimo). Periodicamente o registro é compactado: os pesos atuais são
+gravados como base (pesos_atuais.json, com a última sequência incluída) e o
+registro é esvaziado.
+"""
+
+import json
+import os
+import time
+import zlib
+
+
+class RegistroPesos:
+    """Arquivo de mudanças de peso em que só se acrescentam linhas"""
+
+    def __init__(self, arquivo, sincronizar=True):
+        """
+        Inicializa o registro (o arquivo só é aberto no primeiro acréscimo)
+
+        Args:
+            arquivo: caminho do arquivo de registro
+            sincronizar: se True, força cada linha para o disco (os.fsync)
+        """
+        self.arquivo = arquivo
+        self.sincronizar = sincronizar
+        # Maior sequência já gravada (ou compactada) e entradas no arquivo
+        self.ultima_sequencia = 0
+        self.quantidade = 0
+        self._arquivo = None
+
+    @staticmethod
+    def _codificar(entrada):
+        """Monta a linha do registro (CRC32 + JSON) de uma entrada"""
+        conteudo = json.dumps(entrada, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return b'%08x ' % zlib.crc32(conteudo) + conteudo + b'\n'
+
+    @staticmethod
+    def _decodificar(linha):
+        """
+        Confere e decodifica uma linha do registro
+
+        Returns:
+            dicionário da entrada ou None se a linha estiver corrompida
+        """
+        if not linha.endswith(b'\n') or len(linha) < 10 or linha[8:9] != b' ':
+            return None
+        conteudo = linha[9:-1]
+        try:
+            if int(linha[:8], 16) != zlib.crc32(conteudo):
+                return None
+            return json.loads(conteudo)
+        except ValueError:
+            return None
+
+    def _percorrer(self):
+        """
+        Lê as entradas válidas do arquivo
+
+        Yields:
+            tuplas (entrada, fim), com fim = posição logo após a linha
+        """
+        if not os.path.exists(self.arquivo):
+            return
+        with open(self.arquivo, 'rb') as f:
+            fim = 0
+            for linha in f:
+                entrada = self._decodificar(linha)
+                if entrada is None:
+                    # O que vem depois de uma linha ruim não é confiável
+                    return
+                fim += len(linha)
+                yield entrada, fim
+
+    def entradas(self, apos_sequencia=0):
+        """
+        Lê as mudanças registradas, na ordem em que foram gravadas
+
+        Args:
+            apos_sequencia: ignora entradas com sequência até este valor
+                (as que já foram incorporadas à base)
+
+        Yields:
+            dicionários com sequencia, origem, destino, peso, motivo,
+            bidirecional e instante
+        """
+        for entrada, _ in self._percorrer():
+            if entrada['sequencia'] > apos_sequencia:
+                yield entrada
+
+    def _abrir(self):
+        """Abre o arquivo para acréscimo, cortando um fim incompleto"""
+        fim = 0
+        self.quantidade = 0
+        for entrada, fim in self._percorrer():
+            self.ultima_sequencia = max(self.ultima_sequencia, entrada['sequencia'])
+            self.quantidade += 1
+        self._arquivo = open(self.arquivo, 'ab')
+        if self._arquivo.tell() != fim:
+            self._arquivo.truncate(fim)
+            self._arquivo.seek(fim)
+
+    def acrescentar(self, origem_id, destino_id, peso, motivo, bidirecional=True, sequencia_minima=0):
+        """
+        Acrescenta uma mudança de peso ao fim do registro
+
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+            peso: novo peso
+            motivo: novo motivo
+            bidirecional: se a mudança vale nos dois sentidos
+            sequencia_minima: sequência já incorporada à base (a nova entrada
+                recebe um número maior)
+
+        Returns:
+            sequência atribuída à entrada
+        """
+        if self._arquivo is None:
+            self._abrir()
+        self.ultima_sequencia = max(self.ultima_sequencia, sequencia_minima) + 1
+        self._arquivo.write(self._codificar({
+            'sequencia': self.ultima_sequencia,
+            'origem': origem_id,
+            'destino': destino_id,
+            'peso': peso,
+            'motivo': motivo,
+            'bidirecional': bidirecional,
+            'instante': time.time()
+        }))
+        self._arquivo.flush()
+        if self.sincronizar:
+            os.fsync(self._arquivo.fileno())
+        self.quantidade += 1
+        return self.ultima_sequencia
+
+    def sequencia_gravada(self):
+        """Maior sequência presente no arquivo (0 se vazio ou inexistente)"""
+        if self._arquivo is None:
+            # Só leitura: o arquivo não é criado nem cortado aqui
+            for entrada, _ in self._percorrer():
+                self.ultima_sequencia = max(self.ultima_sequencia, entrada['sequencia'])
+        return self.ultima_sequencia
+
+    def limpar(self):
+        """Esvazia o registro (após a compactação na base)"""
+        self.fechar()
+        self.quantidade = 0
+        if not os.path.exists(self.arquivo):
+            return
+        with open(self.arquivo, 'wb') as f:
+            if self.sincronizar:
+                os.fsync(f.fileno())
+
+    def fechar(self):
+        """Fecha o arquivo, se estiver aberto"""
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
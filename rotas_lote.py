@@ -0,0 +1,219 @@
+"""
+Módulo rotas_lote.py
+Cálculo de muitas rotas de uma vez, para pedidos que chegam em rajadas
+
+Os pares (origem, destino) são agrupados por origem: uma origem com vários
+destinos faz uma única busca completa (ArvoreCaminhos) e responde a todos, e
+uma origem com um só destino segue pelo algoritmo normal do Dijkstra. Os
+grupos podem ser distribuídos entre processos (ou threads), e os resultados
+voltam na ordem dos pedidos ou, na forma em fluxo, à medida que ficam prontos.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from dijkstra import Dijkstra
+from grafo_csr import GrafoCSR
+
+
+def _resolver_grupos(dijkstra, grupos):
+    """
+    Calcula as rotas de um lote de grupos de mesma origem
+
+    Args:
+        dijkstra: objeto Dijkstra usado nas buscas
+        grupos: lista de (origem_id, [(posicao, destino_id), ...])
+
+    Returns:
+        lista de (posicao, resultado), com resultado no formato de
+        RotasLote.calcular
+    """
+    resultados = []
+    for origem_id, itens in grupos:
+        arvore = None
+        tempo_busca = 0.0
+        if len(itens) > 1:
+            inicio = time.perf_counter()
+            arvore = dijkstra.arvore_caminhos(origem_id)
+            tempo_busca = time.perf_counter() - inicio
+        for posicao, destino_id in itens:
+            inicio = time.perf_counter()
+            if arvore is not None and destino_id in dijkstra.grafo.vertices:
+                caminho, custo_total, detalhes = arvore.caminho_para(destino_id)
+            else:
+                caminho, custo_total, detalhes = dijkstra.calcular_menor_caminho(origem_id, destino_id)
+            resultados.append((posicao, {
+                'origem': origem_id,
+                'destino': destino_id,
+                'caminho': caminho,
+                'custo_total': custo_total,
+                'detalhes': detalhes,
+                # Só esta rota; a busca compartilhada do grupo vai à parte
+                'tempo': time.perf_counter() - inicio,
+                'tempo_busca': tempo_busca
+            }))
+    return resultados
+
+
+# Dijkstra de cada processo trabalhador, criado uma vez por _iniciar_trabalhador
+_dijkstra_trabalhador = None
+
+
+def _iniciar_trabalhador(csr, algoritmo, hierarquia, marcos):
+    """Monta o Dijkstra do processo trabalhador sobre a cópia do grafo"""
+    global _dijkstra_trabalhador
+    _dijkstra_trabalhador = Dijkstra(csr, algoritmo)
+    # Estruturas recebidas já valem para estes pesos (como as carregadas do disco)
+    if hierarquia is not None:
+        hierarquia.versao_grafo = None
+        _dijkstra_trabalhador.hierarquia = hierarquia
+    if marcos is not None:
+        marcos.versao_grafo = None
+        _dijkstra_trabalhador.marcos = marcos
+
+
+def _resolver_grupos_trabalhador(grupos):
+    """Calcula um lote de grupos no processo trabalhador"""
+    return _resolver_grupos(_dijkstra_trabalhador, grupos)
+
+
+class RotasLote:
+    """Responde listas de pares (origem, destino) compartilhando as buscas"""
+
+    EXECUTORES = ('processos', 'threads', 'sequencial')
+
+    def __init__(self, dijkstra, executor='processos', trabalhadores=None, tamanho_lote=None):
+        """
+        Inicializa o calculador de lotes
+
+        Args:
+            dijkstra: objeto Dijkstra (grafo, algoritmo e estruturas auxiliares)
+            executor: 'processos', 'threads' ou 'sequencial'
+            trabalhadores: número de processos/threads (None = núcleos da máquina)
+            tamanho_lote: pedidos por tarefa (None = alguns lotes por trabalhador)
+        """
+        if executor not in self.EXECUTORES:
+            raise ValueError(f"Executor desconhecido: {executor!r} (opções: {', '.join(self.EXECUTORES)})")
+        self.dijkstra = dijkstra
+        self.executor = executor
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.tamanho_lote = tamanho_lote
+        # Cada thread usa o seu próprio Dijkstra (as árvores guardadas não são
+        # protegidas para acesso concorrente)
+        self._locais = threading.local()
+
+    @staticmethod
+    def _agrupar(pares):
+        """
+        Agrupa os pedidos por origem, mantendo a ordem de chegada
+
+        Returns:
+            lista de (origem_id, [(posicao, destino_id), ...])
+        """
+        grupos = OrderedDict()
+        for posicao, (origem_id, destino_id) in enumerate(pares):
+            grupos.setdefault(origem_id, []).append((posicao, destino_id))
+        return list(grupos.items())
+
+    def _lotes(self, grupos, total):
+        """Reparte os grupos em lotes de tamanho_lote pedidos (aproximadamente)"""
+        tamanho_lote = self.tamanho_lote or max(1, total // (self.trabalhadores * 4))
+        lotes = []
+        atual = []
+        quantidade = 0
+        for grupo in grupos:
+            atual.append(grupo)
+            quantidade += len(grupo[1])
+            if quantidade >= tamanho_lote:
+                lotes.append(atual)
+                atual = []
+                quantidade = 0
+        if atual:
+            lotes.append(atual)
+        return lotes
+
+    def _dijkstra_da_thread(self):
+        """Dijkstra exclusivo da thread atual"""
+        dijkstra = getattr(self._locais, 'dijkstra', None)
+        if dijkstra is None:
+            dijkstra = Dijkstra(self.dijkstra.grafo, self.dijkstra.algoritmo)
+            dijkstra.hierarquia = self.dijkstra.hierarquia
+            dijkstra.marcos = self.dijkstra.marcos
+            self._locais.dijkstra = dijkstra
+        return dijkstra
+
+    def _resolver_grupos_thread(self, grupos):
+        """Calcula um lote de grupos em uma thread do executor"""
+        return _resolver_grupos(self._dijkstra_da_thread(), grupos)
+
+    def calcular_em_fluxo(self, pares):
+        """
+        Calcula as rotas e as entrega à medida que ficam prontas
+
+        Args:
+            pares: lista de tuplas (origem_id, destino_id)
+
+        Yields:
+            tuplas (posicao, resultado), onde posicao é o índice do par em
+            pares e resultado é como em calcular
+        """
+        pares = list(pares)
+        grupos = self._agrupar(pares)
+        if self.executor == 'sequencial' or self.trabalhadores <= 1:
+            for origem_id, itens in grupos:
+                yield from _resolver_grupos(self.dijkstra, [(origem_id, itens)])
+            return
+
+        lotes = self._lotes(grupos, len(pares))
+        if self.executor == 'threads':
+            executor = ThreadPoolExecutor(max_workers=self.trabalhadores)
+            tarefa = self._resolver_grupos_thread
+        else:
+            grafo = self.dijkstra.grafo
+            csr = getattr(grafo, 'csr', None) or GrafoCSR.from_grafo(grafo)
+            hierarquia = self.dijkstra.hierarquia
+            if hierarquia is not None and hierarquia.versao_grafo not in (None, grafo.versao):
+                hierarquia = None
+            marcos = self.dijkstra.marcos
+            if marcos is not None and marcos.versao_grafo not in (None, grafo.versao):
+                marcos = None
+            executor = ProcessPoolExecutor(
+                max_workers=min(self.trabalhadores, len(lotes)),
+                initializer=_iniciar_trabalhador,
+                initargs=(csr, self.dijkstra.algoritmo, hierarquia, marcos)
+            )
+            tarefa = _resolver_grupos_trabalhador
+
+        with executor:
+            futuros = [executor.submit(tarefa, lote) for lote in lotes]
+            try:
+                for futuro in as_completed(futuros):
+                    yield from futuro.result()
+            finally:
+                # Consumidor desistiu no meio: não inicia os lotes restantes
+                for futuro in futuros:
+                    futuro.cancel()
+
+    def calcular(self, pares):
+        """
+        Calcula as rotas de uma lista de pares
+
+        Args:
+            pares: lista de tuplas (origem_id, destino_id)
+
+        Returns:
+            lista de dicionários na ordem de pares, com origem, destino,
+            caminho, custo_total e detalhes (como calcular_menor_caminho; None
+            se não houver caminho), tempo (segundos gastos só nesta rota:
+            extraí-la da árvore do grupo ou, sem árvore, a busca inteira) e
+            tempo_busca (segundos da busca completa compartilhada pelos
+            pedidos da mesma origem; 0 se a origem teve um só pedido)
+        """
+        pares = list(pares)
+        resultados = [None] * len(pares)
+        for posicao, resultado in self.calcular_em_fluxo(pares):
+            resultados[posicao] = resultado
+        return resultados
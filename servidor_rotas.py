@@ -0,0 +1,728 @@
+"""
+Módulo servidor_rotas.py
+Servidor HTTP local de rotas (só biblioteca padrão)
+
+O grafo é carregado uma vez, na forma compacta, e as consultas do front
+(front/) são respondidas pelo Dijkstra do próprio sistema, em vez de o
+navegador baixar os dois JSON inteiros e rodar a sua própria busca.
+
+Conexões persistentes (HTTP/1.1 keep-alive), uma thread por conexão e um
+conjunto fixo de objetos Dijkstra, cada um emprestado a uma consulta por vez
+(as árvores guardadas sobrevivem ao fim das conexões). A hierarquia de
+contração e os marcos são montados uma só vez, sob a trava de escrita, e
+lidos por todos. As respostas ficam em cache (LRU) pela versão dos pesos: a
+mesma pergunta com os mesmos pesos não é recalculada, e o navegador revalida
+com If-None-Match (304 sem corpo).
+
+Endpoints:
+    GET  /api/grafo                  metadados: tamanhos, versão dos pesos, limites, algoritmos
+    GET  /api/mapa                   vértices e ruas com pesos, para desenhar
+         [?x_min=&y_min=&x_max=&y_max=]  só a região do retângulo
+    GET  /api/rota?origem=A&destino=B[&algoritmo=alt]
+    GET  /api/matriz?origens=A,B&destinos=C,D
+    POST /api/matriz                 o mesmo, com {"origens": [...], "destinos": [...]} no corpo
+    POST /api/pesos[?semente=N]      sorteia novos pesos (GeradorPesos.gerar_pesos_vetorizado)
+    GET  /api/estatisticas           histogramas das buscas e uso do cache
+    GET  /, /app.js, ...             arquivos do front
+
+Uso:
+    python servidor_rotas.py [--dados DIRETORIO] [--porta 8000] [--host 127.0.0.1]
+                             [--algoritmo dijkstra] [--binario]
+"""
+
+import argparse
+import json
+import math
+import mimetypes
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from dijkstra import Dijkstra
+from gerador_pesos import GeradorPesos
+from grafo_csr import GrafoCSR
+from matriz_distancias import MatrizDistancias
+from monitor_busca import HistogramaBusca
+from persistencia import SistemaPersistencia
+
+
+DIRETORIO_FRONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'front')
+
+
+class ErroRequisicao(Exception):
+    """Erro do cliente, respondido com o status HTTP dado"""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class _TravaLeituraEscrita:
+    """Várias leituras ao mesmo tempo ou uma escrita sozinha"""
+
+    def __init__(self):
+        self._condicao = threading.Condition()
+        self._leitores = 0
+        self._escrevendo = False
+
+    @contextmanager
+    def leitura(self):
+        with self._condicao:
+            while self._escrevendo:
+                self._condicao.wait()
+            self._leitores += 1
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._leitores -= 1
+                if not self._leitores:
+                    self._condicao.notify_all()
+
+    @contextmanager
+    def escrita(self):
+        with self._condicao:
+            # Novas leituras esperam; a escrita espera as que já começaram
+            while self._escrevendo:
+                self._condicao.wait()
+            self._escrevendo = True
+            while self._leitores:
+                self._condicao.wait()
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._escrevendo = False
+                self._condicao.notify_all()
+
+
+class ServicoRotas:
+    """Consultas do servidor sobre um grafo carregado (sem nada de HTTP)"""
+
+    # Respostas guardadas no cache
+    TAMANHO_CACHE = 4096
+    # Cada origem da matriz é uma busca completa no grafo
+    LIMITE_ORIGENS_MATRIZ = 64
+    # Acima disto /api/mapa exige um retângulo
+    LIMITE_MAPA = 20000
+    # Objetos Dijkstra do conjunto (consultas simultâneas além disto esperam)
+    TAMANHO_CONJUNTO = 8
+
+    def __init__(self, grafo, algoritmo='dijkstra', tamanho_cache=None, persistencia=None, instancias=None):
+        """
+        Inicializa o serviço
+
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR (de preferência
+                compacto: a troca de pesos é uma troca de arrays)
+            algoritmo: algoritmo padrão das rotas (um de Dijkstra.ALGORITMOS)
+            tamanho_cache: respostas guardadas (None = TAMANHO_CACHE; 0 = sem cache)
+            persistencia: SistemaPersistencia de onde vêm a hierarquia de
+                contração e a tabela de marcos já montadas (e onde elas são
+                salvas ao serem montadas, junto com os pesos de gerar_pesos)
+            instancias: objetos Dijkstra do conjunto (None = TAMANHO_CONJUNTO)
+        """
+        if isinstance(grafo, GrafoCSR):
+            grafo = grafo.como_grafo()
+        self.grafo = grafo
+        self.persistencia = persistencia
+        # Valida o algoritmo e guarda hierarquia/marcos compartilhados
+        self.dijkstra = Dijkstra(grafo, algoritmo, persistencia=persistencia)
+        # Carrega (ou monta e salva) antes da primeira consulta
+        if algoritmo == 'hierarquia':
+            self.dijkstra.preparar_hierarquia()
+        elif algoritmo == 'alt':
+            self.dijkstra.preparar_marcos()
+        self.tamanho_cache = self.TAMANHO_CACHE if tamanho_cache is None else tamanho_cache
+        self.histograma = HistogramaBusca()
+        self._dijkstras = queue.Queue()
+        for _ in range(instancias or self.TAMANHO_CONJUNTO):
+            dijkstra = Dijkstra(grafo, algoritmo)
+            dijkstra.adicionar_monitor(self.histograma)
+            self._dijkstras.put(dijkstra)
+        self._trava = _TravaLeituraEscrita()
+        self._cache = OrderedDict()
+        self._trava_cache = threading.Lock()
+        self._versao_cache = grafo.versao
+        self.acertos_cache = 0
+        self.falhas_cache = 0
+        # Distingue respostas de execuções diferentes do servidor (ETag)
+        self.instancia = f"{os.getpid():x}{int(time.time()):x}"
+
+    @contextmanager
+    def _dijkstra_livre(self):
+        """
+        Empresta um Dijkstra do conjunto durante uma consulta (árvores e
+        caches não são compartilhados); espera se todos estiverem em uso
+        """
+        dijkstra = self._dijkstras.get()
+        try:
+            # Já valem para os pesos atuais (ver _preparar_estruturas e gerar_pesos)
+            dijkstra.hierarquia = self.dijkstra.hierarquia
+            dijkstra.marcos = self.dijkstra.marcos
+            yield dijkstra
+        finally:
+            self._dijkstras.put(dijkstra)
+
+    def _preparar_estruturas(self, algoritmo):
+        """
+        Monta, uma única vez e sob a trava de escrita, a hierarquia ou a
+        tabela de marcos de que o algoritmo precisa, se ainda não existir
+
+        Args:
+            algoritmo: algoritmo da consulta (None = o padrão do serviço)
+        """
+        algoritmo = algoritmo or self.dijkstra.algoritmo
+        if algoritmo == 'hierarquia':
+            atributo, preparar = 'hierarquia', self.dijkstra.preparar_hierarquia
+        elif algoritmo == 'alt':
+            atributo, preparar = 'marcos', self.dijkstra.preparar_marcos
+        else:
+            return
+        if getattr(self.dijkstra, atributo) is not None:
+            return
+        with self._trava.escrita():
+            # Outra consulta pode ter montado enquanto esta esperava
+            if getattr(self.dijkstra, atributo) is None:
+                preparar()
+
+    @property
+    def versao(self):
+        """Versão atual dos pesos"""
+        return self.grafo.versao
+
+    def etag(self, versao=None):
+        """ETag das respostas calculadas com a versão dada (padrão: a atual)"""
+        return f'"{self.instancia}-{self.versao if versao is None else versao}"'
+
+    def consultar(self, caminho, parametros):
+        """
+        Responde uma consulta GET, passando pelo cache de respostas
+
+        Args:
+            caminho: caminho da URL (ex.: '/api/rota')
+            parametros: dicionário nome -> valor (texto)
+
+        Returns:
+            tupla (corpo, versao): JSON codificado e versão dos pesos usada
+            (None nas respostas que não dependem só dos pesos)
+        """
+        if caminho == '/api/estatisticas':
+            # Muda a cada consulta: não passa pelo cache
+            return self._codificar(self.estatisticas()), None
+        if caminho == '/api/rota':
+            self._preparar_estruturas(parametros.get('algoritmo'))
+        with self._trava.leitura():
+            versao = self.grafo.versao
+            chave = (caminho, tuple(sorted(parametros.items())))
+            corpo = self._obter_cache(chave, versao)
+            if corpo is None:
+                corpo = self._codificar(self._responder(caminho, parametros))
+                self._guardar_cache(chave, versao, corpo)
+        return corpo, versao
+
+    def _responder(self, caminho, parametros):
+        """Despacha uma consulta para o método do endpoint"""
+        if caminho == '/api/grafo':
+            return self.metadados()
+        if caminho == '/api/mapa':
+            limites = [self._numero(parametros, nome) for nome in ('x_min', 'y_min', 'x_max', 'y_max')]
+            return self.mapa(*limites)
+        if caminho == '/api/rota':
+            return self.rota(
+                self._obrigatorio(parametros, 'origem'),
+                self._obrigatorio(parametros, 'destino'),
+                parametros.get('algoritmo')
+            )
+        if caminho == '/api/matriz':
+            return self.matriz(
+                self._lista(self._obrigatorio(parametros, 'origens')),
+                self._lista(self._obrigatorio(parametros, 'destinos'))
+            )
+        raise ErroRequisicao(HTTPStatus.NOT_FOUND, f"Endpoint inexistente: {caminho}")
+
+    @staticmethod
+    def _obrigatorio(parametros, nome):
+        valor = parametros.get(nome)
+        if valor is None or valor == '':
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Parâmetro obrigatório: {nome}")
+        return valor
+
+    @staticmethod
+    def _numero(parametros, nome):
+        valor = parametros.get(nome)
+        if valor is None:
+            return None
+        try:
+            return float(valor)
+        except ValueError:
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"{nome} deve ser um número (recebido {valor!r})")
+
+    @staticmethod
+    def _lista(valor):
+        """Lista de ids de um parâmetro 'A,B,C' (ou já uma lista, no corpo JSON)"""
+        if isinstance(valor, list):
+            return [str(v) for v in valor]
+        return [v for v in valor.split(',') if v]
+
+    def _id_vertice(self, texto):
+        """
+        Converte o id recebido na URL para o id do grafo
+
+        Os ids chegam como texto; grafos com ids numéricos são aceitos pelo
+        texto do número.
+        """
+        if texto in self.grafo.vertices:
+            return texto
+        try:
+            numero = int(texto)
+        except ValueError:
+            numero = None
+        if numero is not None and numero in self.grafo.vertices:
+            return numero
+        raise ErroRequisicao(HTTPStatus.NOT_FOUND, f"Vértice inexistente: {texto!r}")
+
+    @staticmethod
+    def _codificar(dados):
+        return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def _obter_cache(self, chave, versao):
+        if not self.tamanho_cache:
+            return None
+        with self._trava_cache:
+            if versao != self._versao_cache:
+                # Pesos novos: nada guardado vale mais
+                self._cache.clear()
+                self._versao_cache = versao
+            corpo = self._cache.get(chave)
+            if corpo is None:
+                self.falhas_cache += 1
+                return None
+            self._cache.move_to_end(chave)
+            self.acertos_cache += 1
+            return corpo
+
+    def _guardar_cache(self, chave, versao, corpo):
+        if not self.tamanho_cache:
+            return
+        with self._trava_cache:
+            if versao != self._versao_cache:
+                return
+            self._cache[chave] = corpo
+            self._cache.move_to_end(chave)
+            while len(self._cache) > self.tamanho_cache:
+                self._cache.popitem(last=False)
+
+    def metadados(self):
+        """
+        Resumo do grafo carregado
+
+        Returns:
+            dicionário com vertices, arestas (dirigidas), versao, algoritmo,
+            algoritmos, limites (x_min, y_min, x_max, y_max) e motivos
+        """
+        grafo = self.grafo
+        csr = getattr(grafo, 'csr', None)
+        if csr is not None:
+            xs, ys = csr.xs, csr.ys
+            arestas = csr.num_arestas
+            motivos = list(csr.motivos)
+        else:
+            xs = [v.x for v in grafo.vertices.values()]
+            ys = [v.y for v in grafo.vertices.values()]
+            arestas = sum(len(vizinhos) for vizinhos in grafo.adjacencias.values())
+            motivos = sorted({a['motivo'] for vizinhos in grafo.adjacencias.values() for a in vizinhos})
+        return {
+            'vertices': len(grafo.vertices),
+            'arestas': arestas,
+            'versao': grafo.versao,
+            'algoritmo': self.dijkstra.algoritmo,
+            'algoritmos': list(Dijkstra.ALGORITMOS),
+            'limites': {
+                'x_min': min(xs, default=None), 'y_min': min(ys, default=None),
+                'x_max': max(xs, default=None), 'y_max': max(ys, default=None)
+            },
+            'limite_mapa': self.LIMITE_MAPA,
+            'motivos': motivos
+        }
+
+    def mapa(self, x_min=None, y_min=None, x_max=None, y_max=None):
+        """
+        Vértices e ruas (um registro por rua) para desenhar o mapa
+
+        Args:
+            x_min, y_min, x_max, y_max: retângulo (inclusivo); None = sem limite
+
+        Returns:
+            dicionário com vertices ({id, nome, x, y}) e arestas ({origem,
+            destino, peso, motivo} e "mao_unica": true nas ruas sem volta)
+        """
+        infinito = math.inf
+        x_min = -infinito if x_min is None else x_min
+        y_min = -infinito if y_min is None else y_min
+        x_max = infinito if x_max is None else x_max
+        y_max = infinito if y_max is None else y_max
+
+        vertices = [
+            vertice.to_dict() for vertice in self.grafo.vertices.values()
+            if x_min <= vertice.x <= x_max and y_min <= vertice.y <= y_max
+        ]
+        if len(vertices) > self.LIMITE_MAPA:
+            raise ErroRequisicao(
+                HTTPStatus.BAD_REQUEST,
+                f"Região com {len(vertices)} vértices (limite {self.LIMITE_MAPA}): use x_min, y_min, x_max e y_max"
+            )
+        dentro = {vertice['id'] for vertice in vertices}
+
+        arestas = []
+        todos = len(dentro) == len(self.grafo.vertices)
+        for origem_id, destino_id, peso, motivo, bidirecional, mao_unica in \
+                SistemaPersistencia._arestas_canonicas(self.grafo):
+            if not bidirecional:
+                # O mapa mostra um peso por rua (o do sentido canônico)
+                continue
+            if not todos and (origem_id not in dentro or destino_id not in dentro):
+                continue
+            aresta = {'origem': origem_id, 'destino': destino_id, 'peso': peso, 'motivo': motivo}
+            if mao_unica:
+                aresta['mao_unica'] = True
+            arestas.append(aresta)
+        return {'versao': self.grafo.versao, 'vertices': vertices, 'arestas': arestas}
+
+    def rota(self, origem, destino, algoritmo=None):
+        """
+        Menor caminho entre dois vértices
+
+        Args:
+            origem: id do vértice de origem (texto)
+            destino: id do vértice de destino (texto)
+            algoritmo: algoritmo desta consulta (None = o padrão do serviço)
+
+        Returns:
+            dicionário com origem, destino, algoritmo, caminho, custo,
+            detalhes e versao (caminho/custo/detalhes None se não houver caminho)
+        """
+        origem_id = self._id_vertice(origem)
+        destino_id = self._id_vertice(destino)
+        with self._dijkstra_livre() as dijkstra:
+            try:
+                caminho, custo, detalhes = dijkstra.calcular_menor_caminho(origem_id, destino_id, algoritmo)
+            except ValueError as erro:
+                raise ErroRequisicao(HTTPStatus.BAD_REQUEST, str(erro))
+        return {
+            'origem': origem_id,
+            'destino': destino_id,
+            'algoritmo': algoritmo or dijkstra.algoritmo,
+            'caminho': caminho,
+            'custo': custo,
+            'detalhes': detalhes,
+            'versao': self.grafo.versao
+        }
+
+    def matriz(self, origens, destinos):
+        """
+        Custos de cada origem para cada destino
+
+        Args:
+            origens: lista de ids (texto) de origem
+            destinos: lista de ids (texto) de destino
+
+        Returns:
+            dicionário com origens, destinos, custos (uma linha por origem,
+            null onde não há caminho) e versao
+        """
+        if len(set(origens)) > self.LIMITE_ORIGENS_MATRIZ:
+            raise ErroRequisicao(
+                HTTPStatus.BAD_REQUEST,
+                f"Origens demais: {len(set(origens))} (limite {self.LIMITE_ORIGENS_MATRIZ})"
+            )
+        origens = [self._id_vertice(v) for v in origens]
+        destinos = [self._id_vertice(v) for v in destinos]
+        if not origens or not destinos:
+            return {'origens': origens, 'destinos': destinos, 'custos': [], 'versao': self.grafo.versao}
+
+        # No próprio processo: o servidor já atende em paralelo por conexão
+        matriz, linhas, colunas = MatrizDistancias(self.grafo).calcular(origens, destinos, processos=1)
+        custos = []
+        for origem_id in origens:
+            linha = matriz[linhas[origem_id]]
+            custos.append([
+                None if math.isinf(linha[colunas[destino_id]]) else self._numero_json(linha[colunas[destino_id]])
+                for destino_id in destinos
+            ])
+        return {'origens': origens, 'destinos': destinos, 'custos': custos, 'versao': self.grafo.versao}
+
+    @staticmethod
+    def _numero_json(valor):
+        """Custo da matriz (real do NumPy) como int quando for inteiro"""
+        valor = float(valor)
+        return int(valor) if valor.is_integer() else valor
+
+    def estatisticas(self):
+        """
+        Histogramas das buscas e uso do cache de respostas
+
+        Returns:
+            dicionário com buscas (HistogramaBusca.resumo) e cache
+        """
+        with self._trava_cache:
+            cache = {
+                'respostas': len(self._cache),
+                'capacidade': self.tamanho_cache,
+                'acertos': self.acertos_cache,
+                'falhas': self.falhas_cache
+            }
+        return {'buscas': self.histograma.resumo(), 'cache': cache}
+
+    def gerar_pesos(self, semente=None):
+        """
+        Sorteia novos pesos para todas as ruas
+
+        As consultas em andamento terminam com os pesos antigos; as seguintes
+        já veem a versão nova (e o cache de respostas é descartado). A
+        hierarquia e os marcos em uso são refeitos aqui, ainda sob a trava
+        de escrita, uma vez para todo o conjunto de Dijkstras. Com
+        persistência os pesos novos são salvos antes, para a hierarquia e os
+        marcos gravados em disco corresponderem aos pesos gravados.
+
+        Args:
+            semente: semente do sorteio (None = aleatória)
+
+        Returns:
+            dicionário com a nova versao
+        """
+        with self._trava.escrita():
+            GeradorPesos.gerar_pesos_vetorizado(self.grafo, semente)
+            if self.persistencia is not None:
+                self.persistencia.salvar_pesos_atuais(self.grafo)
+            if self.dijkstra.hierarquia is not None:
+                self.dijkstra.preparar_hierarquia()
+            if self.dijkstra.marcos is not None:
+                self.dijkstra.preparar_marcos()
+        return {'versao': self.grafo.versao}
+
+
+class _ManipuladorRotas(BaseHTTPRequestHandler):
+    """Traduz as requisições HTTP para o ServicoRotas"""
+
+    # Keep-alive: HTTP/1.1 com Content-Length em todas as respostas
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ServidorRotas/1.0'
+    # Conexão ociosa é fechada depois disto (segundos)
+    timeout = 30
+
+    def do_GET(self):
+        self._atender()
+
+    def do_HEAD(self):
+        self._atender(corpo=False)
+
+    def do_POST(self):
+        self._atender()
+
+    def do_OPTIONS(self):
+        # Pré-verificação de CORS (front aberto de outra origem)
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Content-Length', '0')
+        self._cabecalhos_comuns()
+        self.end_headers()
+
+    def _ler_corpo(self):
+        """Lê o corpo inteiro (precisa ser consumido para a conexão continuar)"""
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(tamanho) if tamanho else b''
+
+    def _atender(self, corpo=True):
+        servico = self.server.servico
+        partes = urlsplit(self.path)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(partes.query).items()}
+        try:
+            dados = self._ler_corpo() if self.command == 'POST' else b''
+            if not partes.path.startswith('/api/'):
+                if self.command != 'GET' and self.command != 'HEAD':
+                    raise ErroRequisicao(HTTPStatus.METHOD_NOT_ALLOWED, "Arquivos só por GET")
+                self._enviar_arquivo(partes.path, corpo)
+                return
+
+            if self.command == 'POST':
+                if partes.path == '/api/pesos':
+                    semente = parametros.get('semente')
+                    resposta = servico.gerar_pesos(int(semente) if semente else None)
+                    self._enviar_json(servico._codificar(resposta), corpo=corpo)
+                    return
+                if partes.path == '/api/matriz':
+                    try:
+                        pedido = json.loads(dados or b'{}')
+                    except ValueError:
+                        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "Corpo não é JSON válido")
+                    parametros = {
+                        'origens': ','.join(servico._lista(pedido.get('origens', []))),
+                        'destinos': ','.join(servico._lista(pedido.get('destinos', [])))
+                    }
+                else:
+                    raise ErroRequisicao(HTTPStatus.METHOD_NOT_ALLOWED, f"POST não aceito em {partes.path}")
+
+            # Revalidação: mesma versão dos pesos, mesma resposta
+            if partes.path != '/api/estatisticas' and self.headers.get('If-None-Match') == servico.etag():
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header('ETag', servico.etag())
+                self.send_header('Content-Length', '0')
+                self._cabecalhos_comuns()
+                self.end_headers()
+                return
+
+            resposta, versao = servico.consultar(partes.path, parametros)
+            self._enviar_json(resposta, None if versao is None else servico.etag(versao), corpo)
+        except ErroRequisicao as erro:
+            self._enviar_json(servico._codificar({'erro': str(erro)}), status=erro.status, corpo=corpo)
+        except ValueError as erro:
+            self._enviar_json(servico._codificar({'erro': str(erro)}), status=HTTPStatus.BAD_REQUEST, corpo=corpo)
+        except Exception as erro:
+            self.log_error("Erro em %s: %r", self.path, erro)
+            self._enviar_json(servico._codificar({'erro': "Erro interno"}),
+                              status=HTTPStatus.INTERNAL_SERVER_ERROR, corpo=corpo)
+
+    def _cabecalhos_comuns(self):
+        # Serviço local: o front pode ser servido por outra origem (ou file://)
+        self.send_header('Access-Control-Allow-Origin', '*')
+
+    def _enviar_json(self, dados, etag=None, corpo=True, status=HTTPStatus.OK):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+            # O navegador guarda, mas pergunta antes de reusar (If-None-Match)
+            self.send_header('Cache-Control', 'no-cache')
+        self._cabecalhos_comuns()
+        self.end_headers()
+        if corpo:
+            self.wfile.write(dados)
+
+    def _enviar_arquivo(self, caminho, corpo=True):
+        """Serve um arquivo de front/ (só nomes simples, sem subdiretórios)"""
+        nome = caminho.lstrip('/') or 'index.html'
+        if nome.startswith('front/'):
+            nome = nome[len('front/'):] or 'index.html'
+        arquivo = os.path.join(DIRETORIO_FRONT, nome)
+        if '/' in nome or '\\' in nome or nome.startswith('.') or not os.path.isfile(arquivo):
+            raise ErroRequisicao(HTTPStatus.NOT_FOUND, f"Arquivo inexistente: {caminho}")
+        with open(arquivo, 'rb') as f:
+            dados = f.read()
+        tipo = mimetypes.guess_type(arquivo)[0] or 'application/octet-stream'
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', tipo + ('; charset=utf-8' if tipo.startswith('text/') or tipo.endswith('javascript') else ''))
+        self.send_header('Content-Length', str(len(dados)))
+        self._cabecalhos_comuns()
+        self.end_headers()
+        if corpo:
+            self.wfile.write(dados)
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+
+class ServidorRotas(ThreadingHTTPServer):
+    """Servidor HTTP com uma thread por conexão sobre um ServicoRotas"""
+
+    daemon_threads = True
+
+    def __init__(self, servico, host='127.0.0.1', porta=8000, verboso=False):
+        """
+        Cria o servidor (comece a atender com serve_forever)
+
+        Args:
+            servico: objeto ServicoRotas
+            host: endereço de escuta (padrão: só a máquina local)
+            porta: porta TCP (0 = qualquer livre; veja server_address)
+            verboso: se True, registra cada requisição em stderr
+        """
+        self.servico = servico
+        self.verboso = verboso
+        super().__init__((host, porta), _ManipuladorRotas)
+
+
+def carregar_grafo(persistencia, binario=False):
+    """
+    Carrega o grafo salvo na forma compacta (cria o padrão se não houver)
+
+    Args:
+        persistencia: objeto SistemaPersistencia
+        binario: se True, usa o instantâneo binário (grafo_cidade.bin) se
+            existir e estiver em dia com pesos_atuais.json (com o registro de
+            pesos reaplicado)
+
+    Returns:
+        objeto GrafoCompacto
+    """
+    grafo = None
+    if binario:
+        try:
+            grafo = persistencia.carregar_grafo_binario()
+        except ValueError as erro:
+            print(f"⚠️  {erro}; carregando os arquivos JSON")
+    if grafo is None:
+        grafo = persistencia.carregar_grafo_compacto()
+    if grafo is None:
+        grafo = persistencia.criar_grafo_padrao()
+        GeradorPesos.gerar_pesos_para_grafo(grafo)
+        persistencia.salvar_estado(grafo)
+        grafo = GrafoCSR.from_grafo(grafo).como_grafo()
+    return grafo
+
+
+def main(argumentos=None):
+    """
+    Sobe o servidor pela linha de comando
+
+    Args:
+        argumentos: lista de argumentos (None = sys.argv)
+
+    Returns:
+        código de saída
+    """
+    parser = argparse.ArgumentParser(description="Servidor HTTP local de rotas")
+    parser.add_argument('--dados', default='dados', help="diretório dos dados (padrão: dados)")
+    parser.add_argument('--host', default='127.0.0.1', help="endereço de escuta (padrão: 127.0.0.1)")
+    parser.add_argument('--porta', type=int, default=8000, help="porta (padrão: 8000)")
+    parser.add_argument('--algoritmo', choices=Dijkstra.ALGORITMOS, default='dijkstra',
+                        help="algoritmo padrão das rotas")
+    parser.add_argument('--armazenamento', choices=SistemaPersistencia.ARMAZENAMENTOS, default='json',
+                        help="onde estão grafo e pesos (padrão: json)")
+    parser.add_argument('--binario', action='store_true', help="carrega grafo_cidade.bin se existir")
+    parser.add_argument('--cache', type=int, default=ServicoRotas.TAMANHO_CACHE,
+                        help=f"respostas em cache (padrão: {ServicoRotas.TAMANHO_CACHE}; 0 = sem cache)")
+    parser.add_argument('--verboso', action='store_true', help="registra cada requisição")
+    args = parser.parse_args(argumentos)
+
+    persistencia = SistemaPersistencia(args.dados, armazenamento=args.armazenamento)
+    inicio = time.perf_counter()
+    grafo = carregar_grafo(persistencia, args.binario)
+    print(f"✅ Grafo carregado: {len(grafo.vertices)} vértices ({time.perf_counter() - inicio:.1f}s)")
+
+    servico = ServicoRotas(grafo, args.algoritmo, args.cache, persistencia)
+    servidor = ServidorRotas(servico, args.host, args.porta, args.verboso)
+    host, porta = servidor.server_address[:2]
+    print(f"🌐 Servindo em http://{host}:{porta}/ (Ctrl+C para sair)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor encerrado")
+    finally:
+        servidor.server_close()
+        persistencia.fechar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Módulo simulacao_rotas.py
+Simulação de Monte Carlo da robustez de rotas
+
+O GeradorPesos funciona como um modelo de trânsito: cada sorteio é um
+cenário possível das condições das ruas. Aqui são sorteados milhares de
+cenários (de forma vetorizada, com a mesma distribuição do gerador) e, em
+cada um, resolvidos os pares origem/destino pedidos. O resultado mostra a
+distribuição do custo de cada rota e com que frequência cada rua aparece no
+caminho ótimo.
+
+Cada peso é um sorteio baseado em contador (GeradorPesos.sortear_chaves)
+sobre (semente, cenário, rua), feito para vários cenários de uma vez; o
+resultado não depende de quantos processos dividiram o trabalho. Os pesos
+das ruas viram, também de uma vez, os arrays de pesos por aresta de cada
+cenário, e as buscas são as mesmas do Dijkstra sobre arrays CSR
+(Dijkstra.buscar_csr, com baldes de Dial: os pesos sorteados são inteiros
+pequenos).
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dijkstra import Dijkstra
+from gerador_pesos import GeradorPesos
+from grafo_csr import GrafoCSR
+from matriz_distancias import GrafoCompartilhado
+
+
+def _pesos_cenarios(semente, inicio, fim, num_ruas):
+    """
+    Sorteia os pesos das ruas dos cenários inicio..fim-1
+
+    Returns:
+        matriz (cenários x ruas) de pesos
+    """
+    chaves = (np.arange(inicio, fim, dtype=np.uint64)[:, None] * np.uint64(num_ruas)
+              + np.arange(num_ruas, dtype=np.uint64)[None, :])
+    _, pesos = GeradorPesos.sortear_chaves(semente, chaves)
+    return pesos
+
+
+class _Simulador:
+    """Resolve os pares pedidos em uma faixa de cenários"""
+
+    # Limite de sorteios (cenários x ruas) gerados de uma vez
+    SORTEIOS_POR_BLOCO = 1 << 20
+
+    def __init__(self, deslocamentos, vizinhos, grupos, num_ruas, consultas, semente):
+        """
+        Args:
+            deslocamentos: deslocamentos CSR do grafo
+            vizinhos: vizinhos CSR do grafo
+            grupos: rua (índice em ruas) de cada posição dos arrays CSR
+            num_ruas: quantidade de ruas sorteadas por cenário
+            consultas: lista de (origem, [(par, destino), ...]) em índices inteiros
+            semente: semente da simulação
+        """
+        self.deslocamentos = deslocamentos
+        self.vizinhos = vizinhos
+        self.grupos = np.asarray(grupos)
+        self.num_ruas = num_ruas
+        self.consultas = consultas
+        self.num_pares = sum(len(itens) for _, itens in consultas)
+        self.semente = semente
+
+    def pesos_cenarios(self, inicio, fim):
+        """
+        Sorteia os pesos das ruas dos cenários inicio..fim-1
+
+        Returns:
+            matriz (cenários x ruas) de pesos
+        """
+        return _pesos_cenarios(self.semente, inicio, fim, self.num_ruas)
+
+    def lote(self, inicio, fim):
+        """
+        Simula os cenários inicio..fim-1
+
+        Returns:
+            tupla (inicio, custos, contagens): custos é um array
+            (cenários x pares) com infinito onde não há caminho e contagens,
+            por par, um Counter rua -> vezes no caminho ótimo
+        """
+        custos = np.full((fim - inicio, self.num_pares), np.inf)
+        contagens = [Counter() for _ in range(self.num_pares)]
+        grupos = self.grupos
+        grupos_lista = grupos.tolist()
+        destinos = [[destino for _, destino in itens] for _, itens in self.consultas]
+        # A matriz de pesos por aresta tem o dobro de colunas da de ruas
+        bloco = max(1, self.SORTEIOS_POR_BLOCO // max(1, len(grupos)))
+        for linha, cenario in enumerate(range(inicio, fim)):
+            if linha % bloco == 0:
+                pesos_ruas = self.pesos_cenarios(cenario, min(cenario + bloco, fim))
+                # Rua -> aresta para todo o bloco numa única indexação
+                pesos_bloco = pesos_ruas[:, grupos]
+                maior_peso = int(pesos_ruas.max(initial=0))
+            pesos = pesos_bloco[linha % bloco].tolist()
+            for (origem, itens), alvos in zip(self.consultas, destinos):
+                distancias, predecessores, arestas_pred = Dijkstra.buscar_csr(
+                    self.deslocamentos, self.vizinhos, pesos, origem, alvos, maior_peso
+                )
+                for par, destino in itens:
+                    if arestas_pred[destino] < 0 and destino != origem:
+                        continue
+                    custos[linha, par] = distancias[destino]
+                    atual = destino
+                    while atual != origem:
+                        contagens[par][grupos_lista[arestas_pred[atual]]] += 1
+                        atual = predecessores[atual]
+        return inicio, custos, contagens
+
+
+# Simulador de cada processo trabalhador, criado uma vez por _iniciar_trabalhador
+_simulador_trabalhador = None
+_blocos_trabalhador = []
+
+
+def _iniciar_trabalhador(descritor, grupos, num_ruas, consultas, semente):
+    """Conecta o processo trabalhador aos arrays compartilhados"""
+    global _simulador_trabalhador
+    (deslocamentos, vizinhos, _), blocos = GrafoCompartilhado.conectar(descritor)
+    _blocos_trabalhador.extend(blocos)
+    _simulador_trabalhador = _Simulador(deslocamentos, vizinhos, grupos, num_ruas, consultas, semente)
+
+
+def _lote_trabalhador(faixa):
+    """Simula uma faixa (inicio, fim) de cenários no processo trabalhador"""
+    return _simulador_trabalhador.lote(*faixa)
+
+
+class SimulacaoRotas:
+    """Distribuição de custos e ruas usadas por rotas em cenários aleatórios"""
+
+    def __init__(self, grafo):
+        """
+        Inicializa a simulação
+
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR (só a estrutura é
+                usada; os pesos de cada cenário são sorteados)
+        """
+        csr = grafo if isinstance(grafo, GrafoCSR) else getattr(grafo, 'csr', None)
+        if csr is None:
+            csr = GrafoCSR.from_grafo(grafo)
+        self.csr = csr
+        self.ruas, self.grupos = GeradorPesos._ruas(csr)
+
+    def pesos_cenario(self, semente, cenario):
+        """
+        Pesos sorteados em um cenário da simulação
+
+        Args:
+            semente: semente da simulação
+            cenario: número do cenário
+
+        Returns:
+            dicionário (origem_id, destino_id) -> peso, uma entrada por rua
+        """
+        pesos = _pesos_cenarios(semente, cenario, cenario + 1, len(self.ruas))[0].tolist()
+        return dict(zip(self.ruas, pesos))
+
+    def simular(self, pares, cenarios=1000, semente=0, processos=None, tamanho_lote=None, percentis=(5, 50, 95)):
+        """
+        Sorteia cenários e resolve cada par origem/destino em todos eles
+
+        Args:
+            pares: lista de tuplas (origem_id, destino_id)
+            cenarios: número de cenários
+            semente: semente da simulação (mesma semente, mesmo resultado)
+            processos: número de processos (None = núcleos da máquina;
+                1 = simula no próprio processo)
+            tamanho_lote: cenários por tarefa enviada a um processo
+            percentis: percentis do custo a informar
+
+        Returns:
+            lista de dicionários, na ordem de pares, com origem, destino,
+            custos (array com o custo em cada cenário; infinito sem caminho),
+            custo_medio e desvio_padrao (dos cenários com caminho), percentis
+            (percentil -> custo), taxa_sem_caminho e frequencia_ruas (lista de
+            ((origem_id, destino_id), fração dos cenários com a rua no caminho
+            ótimo), da mais para a menos usada)
+        """
+        csr = self.csr
+        pares = list(pares)
+        for origem_id, destino_id in pares:
+            for v_id in (origem_id, destino_id):
+                if v_id not in csr.indices:
+                    raise KeyError(f"Vértice inexistente: {v_id!r}")
+
+        # Pares com a mesma origem compartilham a busca de cada cenário
+        por_origem = {}
+        for par, (origem_id, destino_id) in enumerate(pares):
+            por_origem.setdefault(csr.indices[origem_id], []).append((par, csr.indices[destino_id]))
+        consultas = list(por_origem.items())
+
+        custos = np.full((cenarios, len(pares)), np.inf)
+        contagens = [Counter() for _ in pares]
+
+        def acumular(resultado):
+            inicio, custos_lote, contagens_lote = resultado
+            custos[inicio:inicio + len(custos_lote)] = custos_lote
+            for total, parcial in zip(contagens, contagens_lote):
+                total.update(parcial)
+
+        processos = processos or os.cpu_count() or 1
+        processos = min(processos, cenarios)
+        if processos <= 1:
+            simulador = _Simulador(csr.deslocamentos, csr.vizinhos, self.grupos, len(self.ruas), consultas, semente)
+            if cenarios > 0:
+                acumular(simulador.lote(0, cenarios))
+        else:
+            if tamanho_lote is None:
+                # Alguns lotes por processo equilibram a carga sem excesso de tarefas
+                tamanho_lote = max(1, cenarios // (processos * 4))
+            faixas = [(i, min(i + tamanho_lote, cenarios)) for i in range(0, cenarios, tamanho_lote)]
+            with GrafoCompartilhado(csr) as compartilhado:
+                with ProcessPoolExecutor(
+                    max_workers=processos,
+                    initializer=_iniciar_trabalhador,
+                    initargs=(compartilhado.descritor, self.grupos, len(self.ruas), consultas, semente)
+                ) as executor:
+                    for resultado in executor.map(_lote_trabalhador, faixas):
+                        acumular(resultado)
+
+        return [
+            self._resumir(origem_id, destino_id, custos[:, par], contagens[par], cenarios, percentis)
+            for par, (origem_id, destino_id) in enumerate(pares)
+        ]
+
+    def _resumir(self, origem_id, destino_id, custos, contagem, cenarios, percentis):
+        """Agrega os custos e a contagem de ruas de um par"""
+        com_caminho = custos[np.isfinite(custos)]
+        resumo = {
+            'origem': origem_id,
+            'destino': destino_id,
+            'custos': custos,
+            'custo_medio': float(com_caminho.mean()) if len(com_caminho) else None,
+            'desvio_padrao': float(com_caminho.std()) if len(com_caminho) else None,
+            # 'inverted_cdf' devolve sempre um custo observado (nunca inf - inf)
+            'percentis': {
+                p: float(v) for p, v in zip(percentis, np.percentile(custos, percentis, method='inverted_cdf'))
+            } if cenarios else {},
+            'taxa_sem_caminho': 1 - len(com_caminho) / cenarios if cenarios else 0.0,
+            'frequencia_ruas': [
+                (self.ruas[rua], vezes / cenarios) for rua, vezes in contagem.most_common()
+            ]
+        }
+        return resumo
@@ -3,10 +3,33 @@ Script de teste do sistema
 Testa as funcionalidades principais sem interação do usuário
 """
 
+import http.client
+import json
+import os
+import pickle
+import random
+import sys
+import threading
+
+import numpy as np
+
 from grafo import Grafo, Vertice
 from dijkstra import Dijkstra
 from gerador_pesos import GeradorPesos
 from persistencia import SistemaPersistencia
+from grafo_csr import GrafoCSR
+from fila_prioridade import FilaBaldes
+from matriz_distancias import MatrizDistancias
+from todos_pares import CaminhosTodosPares
+from rotas_lote import RotasLote
+from caminhos_dinamicos import CaminhosDinamicos
+from simulacao_rotas import SimulacaoRotas
+from leitor_json import LeitorRegistrosJSON, ler_registros
+from grafo_binario import carregar_grafo_binario, salvar_grafo_binario
+from gerador_cidade import gerar_cidade, salvar_cidade
+from benchmark import executar, comparar
+from monitor_busca import HistogramaBusca
+from servidor_rotas import ServicoRotas, ServidorRotas, carregar_grafo
 
 
 def teste_criar_grafo():
@@ -30,6 +53,16 @@ def teste_criar_grafo():
     
     print(f"Vértices: {len(grafo.vertices)}")
     print(f"Arestas: {len(grafo.obter_todas_arestas())}")
+    
+    # Consultas pelo índice de arestas
+    assert grafo.obter_peso('B', 'A') == 5, "Peso incorreto!"
+    assert grafo.obter_motivo('A', 'C') == 'Trânsito intenso', "Motivo incorreto!"
+    assert grafo.obter_peso('A', 'Z') is None, "Aresta inexistente encontrada!"
+    
+    # O índice e a lista de adjacências continuam sincronizados
+    grafo.atualizar_peso('A', 'C', 12, 'Rua em obras')
+    assert grafo.adjacencias['C'][-1]['peso'] == 12, "Atualização fora de sincronia!"
+    grafo.atualizar_peso('A', 'C', 10, 'Trânsito intenso')
     print("✅ Teste de criação de grafo passou!")
     
     return grafo
@@ -96,6 +129,19 @@ def teste_persistencia():
     
     assert len(grafo.vertices) == len(grafo_carregado.vertices), "Número de vértices diferente!"
     
+    # Uma aresta paralela não é gravada: vale a primeira, como nas buscas
+    paralelo = Grafo()
+    for i, v_id in enumerate('AB'):
+        paralelo.adicionar_vertice(Vertice(v_id, f"Ponto {v_id}", i, 0))
+    paralelo.adicionar_aresta('A', 'B', 4, 'Trânsito livre')
+    paralelo.adicionar_aresta('A', 'B', 9, 'Trânsito intenso')
+    persistencia_paralelo = SistemaPersistencia(os.path.join('dados_teste', 'paralelo'))
+    persistencia_paralelo.salvar_estado(paralelo)
+    recarregado = persistencia_paralelo.carregar_grafo_estrutura()
+    persistencia_paralelo.carregar_pesos_atuais(recarregado)
+    assert len(recarregado.obter_vizinhos('A')) == 1, "Aresta paralela gravada!"
+    assert recarregado.obter_peso('A', 'B') == 4 and recarregado.obter_peso('B', 'A') == 4, "Peso da paralela venceu!"
+    
     print("✅ Teste de persistência passou!")
     
     return grafo_carregado
@@ -129,6 +175,1085 @@ def teste_caminho_completo(grafo):
     print("\n✅ Teste de caminho completo passou!")
 
 
+def teste_grafo_csr(grafo):
+    """Testa a representação compacta (CSR) e o Dijkstra sobre ela"""
+    print("\n=== Teste 6: Grafo Compacto (CSR) ===")
+    
+    csr = GrafoCSR.from_grafo(grafo)
+    compacto = csr.como_grafo()
+    print(f"Arestas dirigidas: {csr.num_arestas} ({csr.tamanho_bytes()} bytes)")
+    
+    assert len(compacto.obter_todas_arestas()) == len(grafo.obter_todas_arestas()), "Número de arestas diferente!"
+    
+    # O Dijkstra sobre arrays deve dar o mesmo custo que sobre dicionários
+    dijkstra = Dijkstra(grafo)
+    dijkstra_csr = Dijkstra(csr)
+    for origem in grafo.vertices:
+        for destino in grafo.vertices:
+            _, custo, _ = dijkstra.calcular_menor_caminho(origem, destino)
+            caminho, custo_csr, detalhes = dijkstra_csr.calcular_menor_caminho(origem, destino)
+            assert custo == custo_csr, f"Custo diferente em {origem}->{destino}!"
+            assert sum(d['peso'] for d in detalhes) == custo_csr, "Detalhes incoerentes!"
+    
+    # Atualização pela visão reflete nos arrays
+    compacto.atualizar_peso('A', 'B', 42, 'Rua em obras')
+    assert compacto.obter_peso('B', 'A') == 42, "Peso não atualizado!"
+    assert compacto.obter_motivo('A', 'B') == 'Rua em obras', "Motivo não atualizado!"
+    
+    # Carregamento direto dos arquivos JSON
+    persistencia = SistemaPersistencia('dados_teste')
+    carregado = persistencia.carregar_grafo_compacto()
+    assert carregado.obter_peso('A', 'B') == grafo.obter_peso('A', 'B'), "Peso carregado diferente!"
+    
+    # A estrutura compacta é fixa: editar exige converter para o grafo de dicionários
+    try:
+        carregado.adicionar_aresta('A', 'Z', 3)
+        assert False, "GrafoCompacto aceitou uma aresta nova!"
+    except TypeError:
+        pass
+    editavel = carregado.csr.para_grafo()
+    editavel.adicionar_aresta('A', 'Z', 3)
+    assert GrafoCSR.from_grafo(editavel).como_grafo().obter_peso('Z', 'A') == 3, "Aresta nova perdida na conversão!"
+    
+    print("✅ Teste de grafo compacto passou!")
+
+
+def teste_a_estrela(grafo):
+    """Testa o modo A* contra o Dijkstra tradicional"""
+    print("\n=== Teste 7: Busca A* ===")
+    
+    dijkstra = Dijkstra(grafo)
+    a_estrela = Dijkstra(grafo, algoritmo='a_estrela')
+    
+    # Repete após novos pesos para garantir que o fator da heurística acompanha
+    for rodada in range(3):
+        for origem in grafo.vertices:
+            for destino in grafo.vertices:
+                _, custo, _ = dijkstra.calcular_menor_caminho(origem, destino)
+                caminho, custo_a, detalhes = a_estrela.calcular_menor_caminho(origem, destino)
+                assert custo == custo_a, f"A* divergiu em {origem}->{destino}!"
+                assert sum(d['peso'] for d in detalhes) == custo_a, "Detalhes incoerentes!"
+        GeradorPesos.gerar_pesos_para_grafo(grafo)
+    
+    print("✅ Teste de A* passou!")
+
+
+def teste_bidirecional(grafo):
+    """Testa o Dijkstra bidirecional, inclusive com ruas de mão única"""
+    print("\n=== Teste 8: Dijkstra Bidirecional ===")
+    
+    dijkstra = Dijkstra(grafo)
+    for origem in grafo.vertices:
+        for destino in grafo.vertices:
+            _, custo, _ = dijkstra.calcular_menor_caminho(origem, destino)
+            caminho, custo_bi, detalhes = dijkstra.calcular_menor_caminho(origem, destino, algoritmo='bidirecional')
+            assert custo == custo_bi, f"Bidirecional divergiu em {origem}->{destino}!"
+            assert caminho[0] == origem and caminho[-1] == destino, "Caminho incompleto!"
+    
+    # Ruas de mão única: A -> B -> C -> D, e D -> A direto
+    mao_unica = Grafo()
+    for v_id in 'ABCD':
+        mao_unica.adicionar_vertice(Vertice(v_id, v_id))
+    mao_unica.adicionar_aresta('A', 'B', 1, 'Via expressa', bidirecional=False)
+    mao_unica.adicionar_aresta('B', 'C', 1, 'Via expressa', bidirecional=False)
+    mao_unica.adicionar_aresta('C', 'D', 1, 'Via expressa', bidirecional=False)
+    mao_unica.adicionar_aresta('D', 'A', 1, 'Via expressa', bidirecional=False)
+    
+    for g in (mao_unica, GrafoCSR.from_grafo(mao_unica)):
+        bidirecional = Dijkstra(g, algoritmo='bidirecional')
+        caminho, custo, _ = bidirecional.calcular_menor_caminho('B', 'A')
+        assert caminho == ['B', 'C', 'D', 'A'] and custo == 3, "Mão única desrespeitada!"
+    
+    print("✅ Teste de Dijkstra bidirecional passou!")
+
+
+def teste_hierarquia_contracao(grafo):
+    """Testa a hierarquia de contração, sua persistência e a customização"""
+    print("\n=== Teste 9: Hierarquia de Contração ===")
+    
+    dijkstra = Dijkstra(grafo)
+    hierarquia = dijkstra.preparar_hierarquia()
+    print(f"Atalhos criados: {hierarquia.num_atalhos}")
+    
+    def comparar():
+        for origem in grafo.vertices:
+            for destino in grafo.vertices:
+                _, custo, _ = dijkstra.calcular_menor_caminho(origem, destino)
+                caminho, custo_ch, detalhes = dijkstra.calcular_menor_caminho(origem, destino, algoritmo='hierarquia')
+                assert custo == custo_ch, f"Hierarquia divergiu em {origem}->{destino}!"
+                assert sum(d['peso'] for d in detalhes) == custo_ch, "Atalho mal desempacotado!"
+    
+    comparar()
+    
+    # Poucas ruas mudaram: a customização mantém a ordem e os atalhos
+    arestas = grafo.obter_todas_arestas()
+    for aresta in random.Random(3).sample(arestas, max(1, len(arestas) // 10)):
+        grafo.atualizar_peso(aresta['origem'], aresta['destino'], aresta['peso'] * 3 + 1, 'Rua em obras')
+    comparar()
+    assert dijkstra.hierarquia is not hierarquia, "Hierarquia não customizada!"
+    assert dijkstra.hierarquia.ordem == hierarquia.ordem, "Ordem de contração não reaproveitada!"
+    assert set(hierarquia.arestas) <= set(dijkstra.hierarquia.arestas), "Atalhos descartados na customização!"
+    
+    # Um vértice novo (com sua rua) entre duas consultas: a hierarquia é
+    # montada de novo em vez de customizada
+    ampliado = GrafoCSR.from_grafo(grafo).para_grafo()
+    consulta = Dijkstra(ampliado, algoritmo='hierarquia')
+    consulta.calcular_menor_caminho('A', 'C')
+    ampliado.adicionar_vertice(Vertice('NOVO', 'Bairro novo', 3, 0))
+    ampliado.adicionar_aresta('C', 'NOVO', 2, 'Trânsito livre')
+    _, custo_ch, _ = consulta.calcular_menor_caminho('A', 'NOVO')
+    assert custo_ch == Dijkstra(ampliado).calcular_menor_caminho('A', 'NOVO')[1], "Vértice novo fora da hierarquia!"
+    
+    # Com persistência a hierarquia montada é salva e, numa nova execução,
+    # carregada em vez de montada; com outros pesos o arquivo deixa de valer
+    persistencia = SistemaPersistencia('dados_teste')
+    if os.path.exists(persistencia.arquivo_hierarquia):
+        os.remove(persistencia.arquivo_hierarquia)
+    montada = Dijkstra(grafo, persistencia=persistencia).preparar_hierarquia()
+    assert persistencia.carregar_hierarquia(grafo) is not None, "Hierarquia não salva após montar!"
+    recarregada = Dijkstra(grafo, persistencia=persistencia)
+    assert recarregada.preparar_hierarquia().arestas == montada.arestas, "Hierarquia salva não carregada!"
+    
+    GeradorPesos.gerar_pesos_para_grafo(grafo)
+    assert persistencia.carregar_hierarquia(grafo) is None, "Hierarquia desatualizada aceita!"
+    comparar()
+    recarregada.preparar_hierarquia()
+    assert persistencia.carregar_hierarquia(grafo) is not None, "Hierarquia customizada não salva!"
+    
+    print("✅ Teste de hierarquia de contração passou!")
+
+
+def teste_marcos_alt(grafo):
+    """Testa a busca ALT e as tabelas de marcos salvas em disco"""
+    print("\n=== Teste 10: Marcos (ALT) ===")
+    
+    dijkstra = Dijkstra(grafo)
+    for selecao in ('distante', 'planar'):
+        dijkstra.marcos = None
+        marcos = dijkstra.preparar_marcos(quantidade=4, selecao=selecao)
+        print(f"Marcos ({selecao}): {[marcos.ids[m] for m in marcos.marcos]}")
+        for origem in grafo.vertices:
+            for destino in grafo.vertices:
+                _, custo, _ = dijkstra.calcular_menor_caminho(origem, destino)
+                _, custo_alt, _ = dijkstra.calcular_menor_caminho(origem, destino, algoritmo='alt')
+                assert custo == custo_alt, f"ALT divergiu em {origem}->{destino}!"
+    
+    persistencia = SistemaPersistencia('dados_teste')
+    persistencia.salvar_marcos(marcos)
+    carregados = persistencia.carregar_marcos(grafo)
+    assert carregados is not None and carregados.marcos == marcos.marcos, "Tabela não recarregada!"
+    assert list(carregados.distancias_de[0]) == list(marcos.distancias_de[0]), "Distâncias diferentes!"
+    
+    # Com persistência a tabela montada é salva e, numa nova execução,
+    # carregada em vez de montada
+    os.remove(persistencia.arquivo_marcos)
+    montada = Dijkstra(grafo, persistencia=persistencia).preparar_marcos()
+    assert persistencia.carregar_marcos(grafo) is not None, "Tabela não salva após montar!"
+    recarregada = Dijkstra(grafo, persistencia=persistencia)
+    assert recarregada.preparar_marcos().marcos == montada.marcos, "Tabela salva não carregada!"
+    assert recarregada.marcos.versao_grafo == grafo.versao, "Tabela carregada sem versão!"
+    
+    GeradorPesos.gerar_pesos_para_grafo(grafo)
+    assert persistencia.carregar_marcos(grafo) is None, "Tabela desatualizada aceita!"
+    recarregada.calcular_menor_caminho('A', 'Z', algoritmo='alt')
+    assert persistencia.carregar_marcos(grafo) is not None, "Tabela refeita não salva!"
+    
+    # Um vértice novo, mesmo sem ruas, entra na tabela na consulta seguinte
+    ampliado = GrafoCSR.from_grafo(grafo).para_grafo()
+    consulta = Dijkstra(ampliado, algoritmo='alt')
+    consulta.calcular_menor_caminho('A', 'B')
+    ampliado.adicionar_vertice(Vertice('NOVO', 'Bairro isolado', 3, 0))
+    assert consulta.calcular_menor_caminho('NOVO', 'B')[:2] == (None, None), "Vértice novo fora da tabela!"
+    
+    print("✅ Teste de marcos ALT passou!")
+
+
+def teste_fila_baldes(grafo):
+    """Testa a fila de baldes e a escolha automática da fila no Dijkstra"""
+    print("\n=== Teste 11: Fila de Baldes (Dial) ===")
+    
+    fila = FilaBaldes(maior_peso=10)
+    for prioridade, item in [(3, 'c'), (0, 'a'), (7, 'd'), (1, 'b')]:
+        fila.inserir(prioridade, item)
+    extraidos = [fila.extrair() for _ in range(len(fila))]
+    assert extraidos == [(0, 'a'), (1, 'b'), (3, 'c'), (7, 'd')], "Ordem incorreta!"
+    
+    dijkstra = Dijkstra(grafo)
+    assert isinstance(dijkstra._nova_fila(), FilaBaldes), "Pesos inteiros deveriam usar baldes!"
+    _, custo_inteiro, _ = dijkstra.calcular_menor_caminho('A', 'Z')
+    
+    # Um peso real obriga a voltar para o heap, sem mudar o resultado
+    aresta = grafo.obter_todas_arestas()[0]
+    grafo.atualizar_peso(aresta['origem'], aresta['destino'], aresta['peso'] + 0.0, aresta['motivo'])
+    assert not isinstance(dijkstra._nova_fila(), FilaBaldes), "Peso real deveria usar heap!"
+    _, custo_real, _ = dijkstra.calcular_menor_caminho('A', 'Z')
+    assert custo_inteiro == custo_real, "Custo mudou com a troca de fila!"
+    grafo.atualizar_peso(aresta['origem'], aresta['destino'], aresta['peso'], aresta['motivo'])
+    
+    print("✅ Teste de fila de baldes passou!")
+
+
+def teste_cache_rotas():
+    """Testa o cache de rotas e sua invalidação pelas mudanças de peso"""
+    print("\n=== Teste 12: Cache de Rotas ===")
+    
+    grafo = Grafo()
+    for i, v_id in enumerate('ABCD'):
+        grafo.adicionar_vertice(Vertice(v_id, f"Ponto {v_id}", i, 0))
+    grafo.adicionar_aresta('A', 'B', 5, 'Trânsito moderado')
+    grafo.adicionar_aresta('B', 'C', 3, 'Trânsito livre')
+    grafo.adicionar_aresta('A', 'C', 10, 'Trânsito intenso')
+    grafo.adicionar_aresta('C', 'D', 2, 'Trânsito livre')
+    dijkstra = Dijkstra(grafo, tamanho_cache=8)
+    
+    dijkstra.calcular_menor_caminho('A', 'C')
+    caminho, custo, _ = dijkstra.calcular_menor_caminho('A', 'C')
+    assert caminho == ['A', 'B', 'C'] and custo == 8, "Rota em cache incorreta!"
+    assert dijkstra.cache.acertos == 1 and dijkstra.cache.falhas == 1, "Contadores incorretos!"
+    
+    # Rua fora da rota piorou: a rota continua no cache
+    grafo.atualizar_peso('C', 'D', 9, 'Trânsito intenso')
+    dijkstra.calcular_menor_caminho('A', 'C')
+    assert dijkstra.cache.acertos == 2, "Invalidação desnecessária!"
+    
+    # Rua da rota piorou: só essa rota sai do cache
+    dijkstra.calcular_menor_caminho('C', 'D')
+    grafo.atualizar_peso('A', 'B', 15, 'Rua em obras')
+    caminho, custo, _ = dijkstra.calcular_menor_caminho('A', 'C')
+    assert caminho == ['A', 'C'] and custo == 10, "Rota desatualizada devolvida!"
+    assert ('C', 'D') in dijkstra.cache.rotas, "Rota não afetada foi descartada!"
+    
+    # Rua ficou mais barata: qualquer rota pode melhorar
+    grafo.atualizar_peso('A', 'B', 1, 'Via expressa')
+    assert dijkstra.calcular_menor_caminho('A', 'C')[1] == 4, "Rota desatualizada devolvida!"
+    print(f"Estatísticas: {dijkstra.cache.estatisticas()}")
+    
+    # Fechado, o cache deixa de observar (e de prender) o grafo
+    observadores = len(grafo.observadores)
+    dijkstra.fechar()
+    assert len(grafo.observadores) == observadores - 1, "Cache ainda observa o grafo!"
+    assert dijkstra.calcular_menor_caminho('A', 'C')[1] == 4, "Dijkstra fechado inutilizável!"
+    
+    print("✅ Teste de cache de rotas passou!")
+
+
+def teste_arvore_caminhos(grafo):
+    """Testa a árvore de menores caminhos de uma origem"""
+    print("\n=== Teste 13: Árvore de Menores Caminhos ===")
+    
+    for g in (grafo, GrafoCSR.from_grafo(grafo)):
+        dijkstra = Dijkstra(g)
+        referencia = Dijkstra(grafo)
+        arvore = dijkstra.arvore_caminhos('C')
+        for destino in grafo.vertices:
+            _, custo, _ = referencia.calcular_menor_caminho('C', destino)
+            caminho, custo_arvore, detalhes = arvore.caminho_para(destino)
+            assert custo == custo_arvore, f"Árvore divergiu em C->{destino}!"
+            assert caminho[0] == 'C' and caminho[-1] == destino, "Caminho incompleto!"
+            assert sum(d['peso'] for d in detalhes) == custo_arvore, "Detalhes incoerentes!"
+        assert dijkstra.arvore_caminhos('C') is arvore, "Árvore não reaproveitada!"
+    
+    # Mudança de peso expira a árvore
+    dijkstra = Dijkstra(grafo)
+    arvore = dijkstra.arvore_caminhos('C')
+    aresta = grafo.obter_todas_arestas()[0]
+    grafo.atualizar_peso(aresta['origem'], aresta['destino'], aresta['peso'] + 1, aresta['motivo'])
+    assert dijkstra.arvore_caminhos('C') is not arvore, "Árvore desatualizada reaproveitada!"
+    
+    print("✅ Teste de árvore de menores caminhos passou!")
+
+
+def teste_matriz_distancias(grafo):
+    """Testa a matriz de distâncias origem x destino"""
+    print("\n=== Teste 14: Matriz de Distâncias ===")
+    
+    dijkstra = Dijkstra(grafo)
+    origens = ['A', 'C', 'F', 'A']
+    destinos = list(grafo.vertices)
+    for processos in (1, 2):
+        matriz, linhas, colunas = MatrizDistancias(grafo).calcular(origens, destinos, processos=processos)
+        assert matriz.shape == (3, len(destinos)), "Origens repetidas não foram agrupadas!"
+        for origem in origens:
+            for destino in destinos:
+                _, custo, _ = dijkstra.calcular_menor_caminho(origem, destino)
+                assert matriz[linhas[origem], colunas[destino]] == custo, \
+                    f"Matriz divergiu em {origem}->{destino} ({processos} processo(s))!"
+        print(f"{processos} processo(s): matriz {matriz.shape[0]}x{matriz.shape[1]} confere com Dijkstra")
+    
+    print("✅ Teste de matriz de distâncias passou!")
+
+
+def teste_todos_pares(grafo):
+    """Testa os menores caminhos entre todos os pares"""
+    print("\n=== Teste 15: Todos os Pares (Floyd-Warshall) ===")
+    
+    dijkstra = Dijkstra(grafo)
+    todos_pares = CaminhosTodosPares(grafo)
+    for origem in grafo.vertices:
+        for destino in grafo.vertices:
+            _, custo, _ = dijkstra.calcular_menor_caminho(origem, destino)
+            caminho, custo_matriz, detalhes = todos_pares.caminho(origem, destino)
+            assert custo == custo_matriz, f"Floyd-Warshall divergiu em {origem}->{destino}!"
+            assert caminho[0] == origem and caminho[-1] == destino, "Caminho incompleto!"
+            assert sum(d['peso'] for d in detalhes) == custo_matriz, "Detalhes incoerentes!"
+    
+    # Sem memória para as matrizes o cálculo é recusado
+    try:
+        CaminhosTodosPares(grafo, limite_memoria=1024).calcular()
+        assert False, "Limite de memória ignorado!"
+    except MemoryError:
+        pass
+    
+    print("✅ Teste de todos os pares passou!")
+
+
+def teste_rotas_lote(grafo):
+    """Testa o cálculo de rotas em lote"""
+    print("\n=== Teste 16: Rotas em Lote ===")
+    
+    dijkstra = Dijkstra(grafo)
+    pares = [('A', 'J'), ('C', 'F'), ('A', 'C'), ('B', 'J'), ('A', 'J'), ('A', 'X')]
+    for executor in RotasLote.EXECUTORES:
+        resultados = RotasLote(Dijkstra(grafo), executor, trabalhadores=2, tamanho_lote=1).calcular(pares)
+        assert [(r['origem'], r['destino']) for r in resultados] == pares, "Ordem dos pedidos perdida!"
+        for resultado in resultados:
+            caminho, custo, _ = dijkstra.calcular_menor_caminho(resultado['origem'], resultado['destino'])
+            assert resultado['custo_total'] == custo, f"Lote divergiu em {resultado['origem']}->{resultado['destino']}!"
+            assert (resultado['caminho'] is None) == (caminho is None), "Caminho inconsistente!"
+            assert resultado['tempo'] >= 0, "Tempo da consulta ausente!"
+            if resultado['origem'] != 'A':
+                assert resultado['tempo_busca'] == 0, "Origem única não faz busca compartilhada!"
+        # A busca compartilhada é informada à parte, igual para todo o grupo
+        tempos_busca = {r['tempo_busca'] for r in resultados if r['origem'] == 'A'}
+        assert len(tempos_busca) == 1 and tempos_busca.pop() > 0, "Busca compartilhada não medida!"
+        print(f"{executor}: {len(resultados)} rotas conferem com Dijkstra")
+    
+    # Forma em fluxo entrega cada posição exatamente uma vez
+    posicoes = sorted(p for p, _ in RotasLote(dijkstra, 'threads', 2, 1).calcular_em_fluxo(pares))
+    assert posicoes == list(range(len(pares))), "Fluxo perdeu ou repetiu pedidos!"
+    
+    print("✅ Teste de rotas em lote passou!")
+
+
+def teste_caminhos_dinamicos():
+    """Testa a manutenção incremental dos menores caminhos"""
+    print("\n=== Teste 17: Caminhos Dinâmicos ===")
+    
+    persistencia = SistemaPersistencia("dados_teste")
+    grafo = persistencia.criar_grafo_padrao()
+    dinamicos = CaminhosDinamicos(grafo)
+    for origem in ('A', 'F'):
+        dinamicos.acompanhar(origem)
+    
+    arestas = grafo.obter_todas_arestas()
+    random.seed(7)
+    for _ in range(40):
+        aresta = random.choice(arestas)
+        grafo.atualizar_peso(aresta['origem'], aresta['destino'], random.choice([1, 5, 12, 999]), "Teste")
+        for origem in ('A', 'F'):
+            for destino in grafo.vertices:
+                _, custo, _ = Dijkstra(grafo).calcular_menor_caminho(origem, destino)
+                assert dinamicos.distancia(origem, destino) == custo, f"Árvore de {origem} desatualizada em {destino}!"
+    
+    caminho, custo, detalhes = dinamicos.caminho('A', 'J')
+    assert caminho[0] == 'A' and caminho[-1] == 'J', "Caminho incompleto!"
+    assert sum(d['peso'] for d in detalhes) == custo, "Detalhes incoerentes!"
+    print(f"Vértices revistos em 40 mudanças: {dinamicos.reparados}")
+    
+    print("✅ Teste de caminhos dinâmicos passou!")
+
+
+def teste_gerador_vetorizado():
+    """Testa a geração de pesos vetorizada"""
+    print("\n=== Teste 18: Gerador de Pesos Vetorizado ===")
+    
+    faixas = {c['tipo']: (c['peso_min'], c['peso_max']) for c in GeradorPesos.CONDICOES}
+    persistencia = SistemaPersistencia("dados_teste")
+    grafo = persistencia.criar_grafo_padrao()
+    for g in (grafo, GrafoCSR.from_grafo(grafo).como_grafo()):
+        versao = g.versao
+        GeradorPesos.gerar_pesos_vetorizado(g, semente=42)
+        assert g.versao > versao, "Versão do grafo não mudou!"
+        pesos = [(a['origem'], a['destino'], a['peso'], a['motivo']) for a in g.obter_todas_arestas()]
+        for origem, destino, peso, motivo in pesos:
+            minimo, maximo = faixas[motivo]
+            assert minimo <= peso <= maximo, f"Peso fora da faixa de {motivo}!"
+            assert g.obter_peso(destino, origem) == peso, "Sentidos da rua com pesos diferentes!"
+        GeradorPesos.gerar_pesos_vetorizado(g, semente=42)
+        assert pesos == [(a['origem'], a['destino'], a['peso'], a['motivo']) for a in g.obter_todas_arestas()], \
+            "Mesma semente gerou pesos diferentes!"
+    
+    # Distribuição das condições igual à de gerar_peso_e_motivo
+    gerador = np.random.default_rng(1)
+    indices, _ = GeradorPesos.sortear_vetorizado(gerador.random(200000), gerador.random(200000))
+    for i, condicao in enumerate(GeradorPesos.CONDICOES):
+        frequencia = (indices == i).mean()
+        print(f"{condicao['tipo']}: {frequencia:.3f} (esperado {condicao['probabilidade']:.2f})")
+        assert abs(frequencia - condicao['probabilidade']) < 0.01, f"Distribuição de {condicao['tipo']} alterada!"
+    
+    print("✅ Teste de gerador de pesos vetorizado passou!")
+
+
+def teste_cenario_reproduzivel():
+    """Testa a geração de pesos reproduzível por rua"""
+    print("\n=== Teste 19: Cenário Reproduzível por Rua ===")
+    
+    persistencia = SistemaPersistencia("dados_teste")
+    grafo = persistencia.criar_grafo_padrao()
+    compacto = GrafoCSR.from_grafo(grafo).como_grafo()
+    GeradorPesos.gerar_pesos_cenario(grafo, 2024)
+    GeradorPesos.gerar_pesos_cenario(compacto, 2024)
+    ruas = [(a['origem'], a['destino']) for a in grafo.obter_todas_arestas()]
+    cenario = {rua: (grafo.obter_peso(*rua), grafo.obter_motivo(*rua)) for rua in ruas}
+    for rua, (peso, motivo) in cenario.items():
+        assert compacto.obter_peso(*rua) == peso, "Grafo compacto sorteou outro peso!"
+        assert compacto.obter_motivo(*rua) == motivo, "Grafo compacto sorteou outro motivo!"
+    
+    # Partes sorteadas em qualquer ordem (como em processos separados) coincidem
+    metade = len(ruas) // 2
+    partes = [ruas[metade:], [(d, o) for o, d in reversed(ruas[:metade])]]
+    for parte in partes:
+        _, pesos = GeradorPesos.sortear_ruas(2024, parte)
+        for rua, peso in zip(parte, pesos.tolist()):
+            assert grafo.obter_peso(*rua) == peso, "Sorteio dependeu da ordem ou do sentido!"
+    
+    # Refazer só um bairro não mexe nas outras ruas
+    GeradorPesos.gerar_pesos_vetorizado(grafo, semente=1)
+    bairro = ruas[:5]
+    outras = {rua: grafo.obter_peso(*rua) for rua in ruas[5:]}
+    GeradorPesos.gerar_pesos_cenario(grafo, 2024, bairro)
+    for rua in bairro:
+        assert grafo.obter_peso(*rua) == cenario[rua][0], "Rua do bairro não voltou ao cenário!"
+    for rua, peso in outras.items():
+        assert grafo.obter_peso(*rua) == peso, "Rua fora do bairro foi alterada!"
+    
+    print("✅ Teste de cenário reproduzível passou!")
+
+
+def teste_simulacao_rotas(grafo):
+    """Testa a simulação de Monte Carlo das rotas"""
+    print("\n=== Teste 20: Simulação de Robustez de Rotas ===")
+    
+    simulacao = SimulacaoRotas(grafo)
+    pares = [('A', 'J'), ('A', 'F'), ('C', 'H')]
+    resultados = simulacao.simular(pares, cenarios=200, semente=5, processos=1)
+    paralelo = simulacao.simular(pares, cenarios=200, semente=5, processos=2, tamanho_lote=30)
+    for resultado, outro in zip(resultados, paralelo):
+        assert (resultado['custos'] == outro['custos']).all(), "Resultado dependeu do número de processos!"
+        assert resultado['frequencia_ruas'] == outro['frequencia_ruas'], "Frequências dependeram dos processos!"
+        p5, p50, p95 = (resultado['percentis'][p] for p in (5, 50, 95))
+        assert p5 <= p50 <= p95, "Percentis fora de ordem!"
+        assert all(0 < f <= 1 for _, f in resultado['frequencia_ruas']), "Frequência inválida!"
+        print(f"{resultado['origem']}->{resultado['destino']}: média {resultado['custo_medio']:.1f}, "
+              f"p5/p50/p95 = {p5:.0f}/{p50:.0f}/{p95:.0f}")
+    
+    # Alguns cenários conferem com o Dijkstra sobre os mesmos pesos
+    compacto = GrafoCSR.from_grafo(grafo)
+    for cenario in (0, 17, 199):
+        for (origem, destino), peso in simulacao.pesos_cenario(5, cenario).items():
+            compacto.atualizar_peso(origem, destino, peso, "Cenário")
+        dijkstra = Dijkstra(compacto)
+        for resultado in resultados:
+            _, custo, _ = dijkstra.calcular_menor_caminho(resultado['origem'], resultado['destino'])
+            assert resultado['custos'][cenario] == custo, f"Cenário {cenario} divergiu do Dijkstra!"
+    
+    print("✅ Teste de simulação de rotas passou!")
+
+
+def teste_leitor_json():
+    """Testa a leitura incremental dos arquivos JSON"""
+    print("\n=== Teste 21: Leitura Incremental de JSON ===")
+    
+    persistencia = SistemaPersistencia('dados_teste')
+    grafo = persistencia.criar_grafo_padrao()
+    GeradorPesos.gerar_pesos_para_grafo(grafo)
+    persistencia.salvar_grafo_estrutura(grafo)
+    persistencia.salvar_pesos_atuais(grafo)
+    
+    # Blocos minúsculos cortam registros, strings e números no meio
+    for arquivo in (persistencia.arquivo_grafo, persistencia.arquivo_pesos):
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        for tamanho_bloco in (1, 7, 100):
+            lidos = {}
+            for chave, registro in ler_registros(arquivo, tamanho_bloco=tamanho_bloco):
+                if isinstance(dados[chave], list):
+                    lidos.setdefault(chave, []).append(registro)
+                else:
+                    lidos[chave] = registro
+            assert lidos == dados, f"Leitura incremental divergiu com blocos de {tamanho_bloco} bytes!"
+    
+    # Um registro inválido no meio falha logo, com a posição, sem ler o resto
+    invalido = os.path.join('dados_teste', 'invalido.json')
+    with open(invalido, 'w', encoding='utf-8') as f:
+        f.write('{"arestas": [{"origem": "Ç"}, {"origem": "A", ' + '"x": 1, ' * 2000 + '}]}')
+    leitor = LeitorRegistrosJSON(invalido, tamanho_bloco=64, limite_registro=1000)
+    try:
+        list(leitor.registros())
+        assert False, "JSON inválido aceito!"
+    except ValueError as erro:
+        assert 'byte 31' in str(erro), f"Posição do erro ausente: {erro}"
+    assert leitor._lidos < os.path.getsize(invalido) / 2, "Arquivo lido até o fim antes do erro!"
+    
+    chamadas = []
+    carregado = persistencia.carregar_grafo_estrutura(lambda lidos, total, registros: chamadas.append((lidos, total)))
+    persistencia.carregar_pesos_atuais(carregado)
+    assert chamadas and chamadas[-1][0] == chamadas[-1][1], "Progresso não chegou ao fim do arquivo!"
+    for aresta in grafo.obter_todas_arestas():
+        assert carregado.obter_peso(aresta['origem'], aresta['destino']) == aresta['peso'], "Peso carregado divergiu!"
+        assert carregado.obter_motivo(aresta['origem'], aresta['destino']) == aresta['motivo'], "Motivo carregado divergiu!"
+    print(f"{len(carregado.vertices)} vértices e {len(carregado.obter_todas_arestas())} ruas carregados")
+    
+    print("✅ Teste de leitura incremental passou!")
+
+
+def teste_grafo_binario(grafo):
+    """Testa o instantâneo binário carregado por mmap"""
+    print("\n=== Teste 22: Instantâneo Binário ===")
+    
+    persistencia = SistemaPersistencia('dados_teste')
+    persistencia.salvar_grafo_binario(grafo)
+    compacto = persistencia.carregar_grafo_binario()
+    csr = compacto.csr
+    assert isinstance(csr.pesos, memoryview), "Pesos deveriam vir do arquivo mapeado, sem cópia!"
+    
+    original = Dijkstra(grafo)
+    em_memoria = Dijkstra(GrafoCSR.from_grafo(grafo).como_grafo())
+    mapeado = Dijkstra(compacto)
+    for origem in grafo.vertices:
+        for destino in grafo.vertices:
+            esperado = em_memoria.calcular_menor_caminho(origem, destino)
+            assert mapeado.calcular_menor_caminho(origem, destino) == esperado, "Rota divergiu no grafo mapeado!"
+    assert [compacto.vertices[v].nome for v in grafo.vertices] == [v.nome for v in grafo.vertices.values()], "Nomes divergiram!"
+    
+    # Sem mudanças o grafo viaja como referência ao arquivo; com mudanças, como cópia
+    assert len(pickle.dumps(csr)) < 200, "Grafo inalterado deveria ser remapeado, não copiado!"
+    aresta = grafo.obter_todas_arestas()[0]
+    compacto.atualizar_peso(aresta['origem'], aresta['destino'], 2.5, "Teste")
+    copia = pickle.loads(pickle.dumps(csr))
+    assert copia.obter_peso(aresta['origem'], aresta['destino']) == 2.5, "Cópia perdeu o peso alterado!"
+    # A mudança é privada deste processo: o arquivo continua igual
+    assert carregar_grafo_binario(persistencia.arquivo_binario).obter_peso(aresta['origem'], aresta['destino']) == aresta['peso'], \
+        "Mudança de peso vazou para o arquivo!"
+    
+    resultados = RotasLote(Dijkstra(persistencia.carregar_grafo_binario()), 'processos', trabalhadores=2, tamanho_lote=1).calcular(
+        [('A', 'J'), ('C', 'G'), ('J', 'A')]
+    )
+    for resultado in resultados:
+        assert resultado['custo_total'] == original.calcular_menor_caminho(resultado['origem'], resultado['destino'])[1], \
+            "Rota em processo trabalhador divergiu!"
+    
+    # Ids que não são texto e volta para JSON
+    numerico = Grafo()
+    for i in range(3):
+        numerico.adicionar_vertice(Vertice(i, f"Ponto {i}", i, 0))
+    numerico.adicionar_aresta(0, 1, 3, "Trânsito livre")
+    numerico.adicionar_aresta(1, 2, 4.5, "Trânsito moderado")
+    salvar_grafo_binario(numerico, persistencia.arquivo_binario)
+    assert carregar_grafo_binario(persistencia.arquivo_binario).obter_peso(1, 2) == 4.5, "Ids numéricos não sobreviveram!"
+    assert persistencia.converter_binario_para_json(), "Conversão para JSON falhou!"
+    assert persistencia.carregar_grafo_compacto().obter_motivo(2, 1) == "Trânsito moderado", "JSON convertido divergiu!"
+    print(f"{csr.num_vertices} vértices e {csr.num_arestas} arestas mapeados de {persistencia.arquivo_binario}")
+    
+    print("✅ Teste de instantâneo binário passou!")
+
+
+def teste_registro_pesos():
+    """Testa o registro de mudanças de peso com compactação"""
+    print("\n=== Teste 23: Registro de Pesos ===")
+    
+    persistencia = SistemaPersistencia(os.path.join('dados_teste', 'registro'), limite_registro=50)
+    grafo = persistencia.criar_grafo_padrao()
+    persistencia.salvar_grafo_estrutura(grafo)
+    GeradorPesos.gerar_pesos_para_grafo(grafo)
+    persistencia.salvar_pesos_atuais(grafo)
+    
+    # Cada mudança acrescenta uma linha, sem regravar a base
+    tamanho_base = os.path.getsize(persistencia.arquivo_pesos)
+    arestas = grafo.obter_todas_arestas()
+    aleatorio = random.Random(23)
+    for i in range(30):
+        aresta = aleatorio.choice(arestas)
+        persistencia.atualizar_peso(grafo, aresta['origem'], aresta['destino'], aleatorio.randint(1, 20), f"Mudança {i}",
+                                    bidirecional=i % 3 != 0)
+    assert persistencia.registro.quantidade == 30, "Mudanças deveriam ir para o registro!"
+    assert os.path.getsize(persistencia.arquivo_pesos) == tamanho_base, "A base não deveria ser regravada!"
+    
+    def conferir(mensagem):
+        nova = SistemaPersistencia(persistencia.diretorio_dados)
+        carregado = nova.carregar_grafo_estrutura()
+        nova.carregar_pesos_atuais(carregado)
+        compacto = nova.carregar_grafo_compacto()
+        for v_id in grafo.vertices:
+            for vizinho in grafo.obter_vizinhos(v_id):
+                for outro in (carregado, compacto):
+                    assert outro.obter_peso(v_id, vizinho['destino']) == vizinho['peso'], mensagem
+                    assert outro.obter_motivo(v_id, vizinho['destino']) == vizinho['motivo'], mensagem
+    
+    conferir("Base mais registro divergiu do grafo!")
+    
+    # Uma queda no meio da escrita deixa uma linha incompleta, que é descartada
+    persistencia.registro.fechar()
+    with open(persistencia.arquivo_registro, 'ab') as f:
+        f.write(b'0badc0de {"sequencia": 99, "orig')
+    conferir("Linha incompleta no fim do registro não foi descartada!")
+    persistencia = SistemaPersistencia(persistencia.diretorio_dados, limite_registro=50)
+    aresta = arestas[0]
+    persistencia.atualizar_peso(grafo, aresta['origem'], aresta['destino'], 4, "Depois da queda")
+    conferir("Acréscimo após linha incompleta se perdeu!")
+    
+    # Compactação automática: ao atingir o limite a base absorve o registro
+    for i in range(20):
+        persistencia.atualizar_peso(grafo, aresta['origem'], aresta['destino'], i + 1, "Compactação")
+    assert persistencia.registro.quantidade < 50, "Registro deveria ter sido compactado!"
+    conferir("Compactação perdeu mudanças!")
+    
+    # Queda entre gravar a base e esvaziar o registro: entradas antigas são ignoradas
+    persistencia.atualizar_peso(grafo, aresta['origem'], aresta['destino'], 7, "Antiga")
+    with open(persistencia.arquivo_registro, 'rb') as f:
+        registro_antigo = f.read()
+    persistencia.atualizar_peso(grafo, aresta['origem'], aresta['destino'], 8, "Nova")
+    persistencia.salvar_pesos_atuais(grafo)
+    with open(persistencia.arquivo_registro, 'wb') as f:
+        f.write(registro_antigo)
+    conferir("Registro já compactado foi reaplicado!")
+    
+    # Instantâneo binário: mudanças registradas depois dele são reaplicadas ao carregar
+    persistencia.salvar_grafo_binario(grafo)
+    persistencia.atualizar_peso(grafo, aresta['origem'], aresta['destino'], 9, "Depois do binário")
+    nova = SistemaPersistencia(persistencia.diretorio_dados)
+    assert nova.carregar_grafo_binario().obter_peso(aresta['origem'], aresta['destino']) == 9, \
+        "Registro não reaplicado sobre o instantâneo binário!"
+    # e a conversão para JSON só compacta o registro depois de aplicá-lo
+    assert nova.converter_binario_para_json(), "Conversão para JSON falhou!"
+    conferir("Conversão do binário perdeu mudanças do registro!")
+    # Base mais nova que o instantâneo: o binário não é usado em silêncio
+    persistencia.atualizar_peso(grafo, aresta['origem'], aresta['destino'], 10, "Compactada")
+    persistencia.salvar_pesos_atuais(grafo)
+    try:
+        SistemaPersistencia(persistencia.diretorio_dados).carregar_grafo_binario()
+        assert False, "Instantâneo desatualizado foi carregado!"
+    except ValueError:
+        pass
+    
+    # Salvar sem nunca ter usado o registro não cria o arquivo de registro
+    sem_registro = SistemaPersistencia(os.path.join('dados_teste', 'sem_registro'))
+    sem_registro.salvar_estado(grafo)
+    assert not os.path.exists(sem_registro.arquivo_registro), "Registro criado sem nenhuma mudança!"
+    print(f"{len(arestas)} ruas; registro com limite de {persistencia.limite_registro} entradas")
+    
+    print("✅ Teste de registro de pesos passou!")
+
+
+def teste_armazenamento_sqlite():
+    """Testa o armazenamento em SQLite contra o padrão em JSON"""
+    print("\n=== Teste 24: Armazenamento SQLite ===")
+    
+    grafo = SistemaPersistencia('dados_teste').criar_grafo_padrao()
+    GeradorPesos.gerar_pesos_para_grafo(grafo)
+    aleatorio = random.Random(24)
+    mudancas = [
+        (aresta['origem'], aresta['destino'], aleatorio.randint(1, 20), "Mudança", i % 4 != 0)
+        for i, aresta in enumerate(aleatorio.sample(grafo.obter_todas_arestas(), 10))
+    ]
+    
+    carregados = {}
+    for armazenamento in ('json', 'sqlite'):
+        persistencia = SistemaPersistencia(os.path.join('dados_teste', armazenamento), armazenamento=armazenamento)
+        assert persistencia.carregar_grafo_estrutura() is None, "Armazenamento novo deveria estar vazio!"
+        persistencia.salvar_grafo_estrutura(grafo)
+        persistencia.salvar_pesos_atuais(grafo)
+        for origem, destino, peso, motivo, bidirecional in mudancas:
+            persistencia.atualizar_peso(grafo, origem, destino, peso, motivo, bidirecional)
+        persistencia.fechar()
+        
+        persistencia = SistemaPersistencia(os.path.join('dados_teste', armazenamento), armazenamento=armazenamento)
+        carregado = persistencia.carregar_grafo_estrutura()
+        assert persistencia.carregar_pesos_atuais(carregado), "Pesos salvos não foram encontrados!"
+        compacto = persistencia.carregar_grafo_compacto()
+        for v_id in grafo.vertices:
+            for vizinho in grafo.obter_vizinhos(v_id):
+                for outro in (carregado, compacto):
+                    assert outro.obter_peso(v_id, vizinho['destino']) == vizinho['peso'], f"Peso divergiu em {armazenamento}!"
+                    assert outro.obter_motivo(v_id, vizinho['destino']) == vizinho['motivo'], f"Motivo divergiu em {armazenamento}!"
+        
+        regiao = persistencia.carregar_subgrafo(0, 0, 9, 9)
+        assert regiao.vertices and all(v.x <= 9 and v.y <= 9 for v in regiao.vertices.values()), "Região incorreta!"
+        carregados[armazenamento] = regiao
+        persistencia.fechar()
+    
+    # Os dois armazenamentos devolvem a mesma região
+    json_regiao, sqlite_regiao = carregados['json'], carregados['sqlite']
+    assert set(json_regiao.vertices) == set(sqlite_regiao.vertices), "Regiões com vértices diferentes!"
+    for v_id in json_regiao.vertices:
+        esperado = sorted((a['destino'], a['peso'], a['motivo']) for a in json_regiao.obter_vizinhos(v_id))
+        assert sorted((a['destino'], a['peso'], a['motivo']) for a in sqlite_regiao.obter_vizinhos(v_id)) == esperado, \
+            "Regiões com arestas diferentes!"
+    
+    # Mudanças em lote só chegam ao banco ao completar o lote (ou em confirmar)
+    persistencia = SistemaPersistencia(os.path.join('dados_teste', 'sqlite'), armazenamento='sqlite')
+    origem, destino = mudancas[0][:2]
+    persistencia.atualizar_peso(grafo, origem, destino, 123, "Pendente")
+    leitor = SistemaPersistencia(os.path.join('dados_teste', 'sqlite'), armazenamento='sqlite')
+    assert leitor.carregar_subgrafo(-1e9, -1e9, 1e9, 1e9).obter_peso(origem, destino) != 123, "Lote gravado antes da hora!"
+    persistencia.confirmar()
+    assert leitor.carregar_subgrafo(-1e9, -1e9, 1e9, 1e9).obter_peso(origem, destino) == 123, "Lote confirmado não foi gravado!"
+    leitor.fechar()
+    persistencia.fechar()
+    print(f"Região (0,0)-(9,9): {len(sqlite_regiao.vertices)} vértices, {len(sqlite_regiao.obter_todas_arestas())} ruas")
+    
+    print("✅ Teste de armazenamento SQLite passou!")
+
+
+def teste_salvamento_atomico():
+    """Testa o salvamento em uma passada, comprimido e atômico"""
+    print("\n=== Teste 25: Salvamento Atômico e Comprimido ===")
+    
+    diretorio = os.path.join('dados_teste', 'salvamento')
+    grafo = SistemaPersistencia(diretorio).criar_grafo_padrao()
+    GeradorPesos.gerar_pesos_para_grafo(grafo)
+    aresta = grafo.obter_todas_arestas()[0]
+    # Mudança num só sentido também precisa sobreviver
+    grafo.atualizar_peso(aresta['destino'], aresta['origem'], 42, "Só na volta", bidirecional=False)
+    
+    for compressao in (None, 'gzip', 'lzma'):
+        persistencia = SistemaPersistencia(diretorio, compressao=compressao)
+        persistencia.salvar_estado(grafo)
+        gravados = sorted(f for f in os.listdir(diretorio) if f.startswith(('grafo_cidade', 'pesos_atuais.json')))
+        extensao = {None: '', 'gzip': '.gz', 'lzma': '.xz'}[compressao]
+        assert gravados == ['grafo_cidade.json' + extensao, 'pesos_atuais.json' + extensao], \
+            f"Arquivos inesperados com {compressao}: {gravados}"
+        
+        # A leitura descobre sozinha a compressão usada
+        leitor = SistemaPersistencia(diretorio)
+        carregado = leitor.carregar_grafo_estrutura()
+        leitor.carregar_pesos_atuais(carregado)
+        compacto = leitor.carregar_grafo_compacto()
+        for v_id in grafo.vertices:
+            for vizinho in grafo.obter_vizinhos(v_id):
+                for outro in (carregado, compacto):
+                    assert outro.obter_peso(v_id, vizinho['destino']) == vizinho['peso'], f"Peso divergiu com {compressao}!"
+                    assert outro.obter_motivo(v_id, vizinho['destino']) == vizinho['motivo'], f"Motivo divergiu com {compressao}!"
+        print(f"{compressao or 'sem compressão'}: {', '.join(f'{f} ({os.path.getsize(os.path.join(diretorio, f))} bytes)' for f in gravados)}")
+    
+    # Falha no meio da gravação: os arquivos anteriores continuam intactos
+    conteudo = {f: open(os.path.join(diretorio, f), 'rb').read() for f in os.listdir(diretorio)}
+    quebrado = persistencia.criar_grafo_padrao()
+    
+    def falhar(vertice_id):
+        raise OSError("Disco cheio")
+    
+    quebrado.obter_vizinhos = falhar
+    try:
+        SistemaPersistencia(diretorio).salvar_estado(quebrado)
+        assert False, "A falha deveria ter sido propagada!"
+    except OSError:
+        pass
+    assert {f: open(os.path.join(diretorio, f), 'rb').read() for f in os.listdir(diretorio)} == conteudo, \
+        "Gravação interrompida alterou os arquivos!"
+    
+    print("✅ Teste de salvamento atômico passou!")
+
+
+def teste_gerador_cidade():
+    """Testa a cidade sintética em grade e a gravação nos formatos do sistema"""
+    print("\n=== Teste 26: Gerador de Cidade Sintética ===")
+    
+    csr = gerar_cidade(20, 30, semente=7)
+    assert csr.num_vertices == 600, "Quantidade de vértices errada!"
+    assert csr.ids[0] == 'L0C0' and csr.ids[-1] == 'L19C29', "Ids inesperados!"
+    assert csr.nomes[31] == "Rua 2 com Avenida 2", "Nome inesperado!"
+    
+    # Cada linha do CSR ordenada pelo destino, só entre cruzamentos vizinhos
+    for i in range(csr.num_vertices):
+        destinos = list(csr.vizinhos[csr.deslocamentos[i]:csr.deslocamentos[i + 1]])
+        assert destinos == sorted(set(destinos)), f"Linha {i} fora de ordem!"
+        for j in destinos:
+            assert abs(i // 30 - j // 30) <= 1 and abs(i % 30 - j % 30) <= 1, "Aresta entre cruzamentos distantes!"
+    
+    # Ruas de mão única e diagonais presentes
+    grafo = csr.como_grafo()
+    arestas = grafo.obter_todas_arestas()
+    mao_unica = [a for a in arestas if grafo.obter_aresta(a['destino'], a['origem']) is None]
+    diagonais = [a for a in arestas if a['origem'][1:].split('C')[0] != a['destino'][1:].split('C')[0]
+                 and a['origem'].split('C')[1] != a['destino'].split('C')[1]]
+    assert mao_unica and diagonais, "Faltaram ruas de mão única ou diagonais!"
+    print(f"{csr.num_vertices} vértices, {csr.num_arestas} arestas ({len(mao_unica)} de mão única, {len(diagonais)} diagonais)")
+    
+    # Mesma semente, mesma cidade
+    assert gerar_cidade(20, 30, semente=7).assinatura() == csr.assinatura(), "Semente não reproduziu a cidade!"
+    assert gerar_cidade(20, 30, semente=8).assinatura() != csr.assinatura(), "Sementes diferentes geraram a mesma cidade!"
+    
+    caminho, custo, _ = Dijkstra(grafo).calcular_menor_caminho('L0C0', 'L19C29')
+    print(f"Rota L0C0 -> L19C29: {len(caminho) if caminho else 0} cruzamentos, custo {custo}")
+    
+    # Gravada em cada formato, volta igual (inclusive o sentido das ruas)
+    for formato in ('json', 'binario', 'sqlite'):
+        diretorio = os.path.join('dados_teste', 'cidade_' + formato)
+        salvar_cidade(csr, diretorio, formato)
+        if formato == 'binario':
+            carregado = SistemaPersistencia(diretorio).carregar_grafo_binario()
+        else:
+            persistencia = SistemaPersistencia(diretorio, armazenamento='sqlite' if formato == 'sqlite' else 'json')
+            carregado = persistencia.carregar_grafo_compacto()
+            persistencia.fechar()
+        assert carregado.csr.assinatura() == csr.assinatura(), f"Cidade divergiu no formato {formato}!"
+    
+    # O grafo comum também respeita a mão única do JSON
+    persistencia = SistemaPersistencia(os.path.join('dados_teste', 'cidade_json'))
+    carregado = persistencia.carregar_grafo_estrutura()
+    persistencia.carregar_pesos_atuais(carregado)
+    assert GrafoCSR.from_grafo(carregado).assinatura() == csr.assinatura(), "Mão única perdida no JSON!"
+    
+    print("✅ Teste de gerador de cidade passou!")
+
+
+def teste_benchmark():
+    """Testa o relatório do benchmark e a comparação com uma referência"""
+    print("\n=== Teste 27: Benchmark ===")
+    
+    relatorio = executar(tamanhos=(150,), consultas=20, semente=3, processo_separado=False, cenarios=100)
+    resultado = relatorio['resultados']['150']
+    for etapa in ('gerar_cidade', 'dijkstra', 'simulacao', 'gerar_pesos', 'salvar_json', 'carregar_json',
+                  'salvar_binario', 'carregar_binario', 'desenhar_mapa'):
+        assert etapa in resultado, f"Etapa {etapa} não medida!"
+    rotas = resultado['dijkstra']
+    assert rotas['consultas'] == 20 and rotas['p50_ms'] <= rotas['p99_ms'], "Latências inconsistentes!"
+    print(f"{resultado['vertices']} vértices: p50 {rotas['p50_ms']} ms, p99 {rotas['p99_ms']} ms, "
+          f"{rotas['consultas_por_segundo']} consultas/s")
+    simulacao = resultado['simulacao']
+    assert simulacao['cenarios'] == 100 and simulacao['cenarios_por_segundo'] > 0, "Simulação não medida!"
+    print(f"Simulação: {simulacao['cenarios_por_segundo']} cenários/s")
+    
+    # O relatório é JSON puro
+    relatorio = json.loads(json.dumps(relatorio))
+    assert comparar(relatorio, relatorio) == [], "Relatório regrediu em relação a si mesmo!"
+    
+    # Referência com o dobro da vazão e metade da memória: as duas pioras aparecem
+    referencia = json.loads(json.dumps(relatorio))
+    referencia['resultados']['150']['dijkstra']['consultas_por_segundo'] *= 2
+    referencia['resultados']['150']['carregar_json']['pico_memoria_mb'] /= 2
+    # Medida sem referência válida não é comparada
+    referencia['resultados']['150']['salvar_json']['segundos'] = 0
+    regressoes = comparar(relatorio, referencia, limite=0.5)
+    assert {(r['etapa'], r['metrica']) for r in regressoes} == {
+        ('dijkstra', 'consultas_por_segundo'), ('carregar_json', 'pico_memoria_mb')
+    }, f"Regressões inesperadas: {regressoes}"
+    assert comparar(relatorio, referencia, limite=1.5) == [], "Limite de regressão ignorado!"
+    
+    print("✅ Teste de benchmark passou!")
+
+
+def teste_monitor_busca():
+    """Testa as estatísticas por consulta e a agregação em histogramas"""
+    print("\n=== Teste 28: Monitor de Buscas ===")
+    
+    csr = gerar_cidade(15, 15, semente=4)
+    ids = list(csr.ids)
+    sorteio = random.Random(5)
+    pares = [(sorteio.choice(ids), sorteio.choice(ids)) for _ in range(30)]
+    
+    for grafo in (csr.como_grafo(), csr.para_grafo()):
+        for algoritmo in Dijkstra.ALGORITMOS:
+            normal = Dijkstra(grafo, algoritmo)
+            monitorado = Dijkstra(grafo, algoritmo)
+            histograma = HistogramaBusca()
+            monitorado.adicionar_monitor(histograma)
+            for origem_id, destino_id in pares:
+                assert monitorado.calcular_menor_caminho(origem_id, destino_id) == \
+                    normal.calcular_menor_caminho(origem_id, destino_id), f"Monitor mudou a rota ({algoritmo})!"
+                estatisticas = monitorado.ultimas_estatisticas
+                assert estatisticas.tempo_total >= estatisticas.tempo_detalhes >= 0, "Tempos inconsistentes!"
+                if algoritmo != 'hierarquia':
+                    assert estatisticas.insercoes >= estatisticas.vertices_fechados, "Contagem inconsistente!"
+                    assert estatisticas.vertices_fechados >= 1 or origem_id == destino_id, "Nenhum vértice fechado!"
+                    assert estatisticas.extracoes_descartadas >= 0, "Extrações descartadas negativas!"
+            assert histograma.consultas == len(pares), "Histograma perdeu consultas!"
+    
+    # Grafo comum e compacto fazem a mesma busca: mesmas contagens
+    contagens = []
+    for grafo in (csr.como_grafo(), csr.para_grafo()):
+        dijkstra = Dijkstra(grafo)
+        dijkstra.adicionar_monitor(lambda e: None)
+        dijkstra.calcular_menor_caminho('L0C0', 'L14C14')
+        e = dijkstra.ultimas_estatisticas
+        contagens.append((e.vertices_fechados, e.arestas_relaxadas, e.insercoes, e.extracoes, e.maior_fila))
+    assert contagens[0] == contagens[1], f"Contagens divergiram: {contagens}"
+    print(f"L0C0 -> L14C14: {e}")
+    
+    # Várias threads no mesmo Dijkstra: cada consulta conta só a sua busca
+    compartilhado = Dijkstra(csr.como_grafo())
+    referencias = {}
+    compartilhado.adicionar_monitor(lambda e: referencias.__setitem__((e.origem_id, e.destino_id), e.vertices_fechados))
+    for origem_id, destino_id in pares:
+        compartilhado.calcular_menor_caminho(origem_id, destino_id)
+    coletadas = []
+    compartilhado.monitores = [coletadas.append]
+    
+    def consultar_pares():
+        for _ in range(5):
+            for origem_id, destino_id in pares:
+                compartilhado.calcular_menor_caminho(origem_id, destino_id)
+    
+    # Trocas de thread frequentes, para as consultas se intercalarem de fato
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        threads = [threading.Thread(target=consultar_pares) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(intervalo)
+    assert len(coletadas) == 4 * 5 * len(pares), "Consultas monitoradas perdidas!"
+    for e in coletadas:
+        assert e.vertices_fechados == referencias[(e.origem_id, e.destino_id)], "Estatísticas misturadas entre threads!"
+    
+    # Resultado vindo do cache
+    dijkstra = Dijkstra(csr.como_grafo(), tamanho_cache=10)
+    histograma = HistogramaBusca()
+    dijkstra.adicionar_monitor(histograma)
+    dijkstra.calcular_menor_caminho('L0C0', 'L14C14')
+    dijkstra.calcular_menor_caminho('L0C0', 'L14C14')
+    assert histograma.por_fonte == {'busca': 1, 'cache': 1}, f"Fontes inesperadas: {histograma.por_fonte}"
+    
+    resumo = histograma.resumo()
+    assert resumo['vertices_fechados']['maximo'] == contagens[0][0], "Máximo errado no resumo!"
+    faixas = histograma.histograma('vertices_fechados')
+    # Resultado pronto não tem contagem: só a busca entra nos histogramas de esforço
+    assert faixas == [(i, s, 1) for i, s, _ in faixas] and len(faixas) == 1, "Faixas erradas!"
+    assert faixas[0][0] <= contagens[0][0] < faixas[0][1], "Faixa errada!"
+    assert resumo['tempo_total_ms']['quantidade'] == 2, "Tempo do cache não registrado!"
+    print(f"Resumo: {resumo['consultas']} consultas, fechados p50 <= {resumo['vertices_fechados']['p50']}")
+    
+    # Sem monitores nada é contado
+    dijkstra.remover_monitor(histograma)
+    dijkstra.ultimas_estatisticas = None
+    dijkstra.calcular_menor_caminho('L0C0', 'L3C3')
+    assert dijkstra.ultimas_estatisticas is None and histograma.consultas == 2, "Monitor removido ainda contou!"
+    
+    print("✅ Teste de monitor de buscas passou!")
+
+
+def teste_servidor_rotas():
+    """Testa o servidor HTTP de rotas (conexão persistente, cache e troca de pesos)"""
+    print("\n=== Teste 29: Servidor de Rotas ===")
+    
+    grafo = gerar_cidade(12, 12, semente=6).como_grafo()
+    referencia = Dijkstra(grafo)
+    servidor = ServidorRotas(ServicoRotas(grafo), porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    
+    # Todas as requisições pela mesma conexão (keep-alive)
+    conexao = http.client.HTTPConnection(*servidor.server_address[:2], timeout=10)
+    
+    def pedir(caminho, metodo='GET', corpo=None, cabecalhos=None):
+        conexao.request(metodo, caminho, body=corpo, headers=cabecalhos or {})
+        resposta = conexao.getresponse()
+        dados = resposta.read()
+        return resposta.status, resposta.getheader('ETag'), json.loads(dados) if dados else None
+    
+    try:
+        status, etag, meta = pedir('/api/grafo')
+        assert status == 200 and meta['vertices'] == 144, f"Metadados errados: {status} {meta}"
+        assert meta['arestas'] == grafo.csr.num_arestas, "Quantidade de arestas errada!"
+        
+        _, _, mapa = pedir('/api/mapa')
+        assert len(mapa['vertices']) == 144, "Mapa sem todos os vértices!"
+        ruas = {(a['origem'], a['destino']) for a in mapa['arestas']}
+        assert all(grafo.obter_aresta(o, d) is not None for o, d in ruas), "Rua inexistente no mapa!"
+        assert any(a.get('mao_unica') for a in mapa['arestas']), "Mão única não marcada no mapa!"
+        
+        sorteio = random.Random(7)
+        ids = list(grafo.vertices)
+        for _ in range(10):
+            origem, destino = sorteio.choice(ids), sorteio.choice(ids)
+            status, _, rota = pedir(f'/api/rota?origem={origem}&destino={destino}&algoritmo=alt')
+            _, custo, _ = referencia.calcular_menor_caminho(origem, destino)
+            assert status == 200 and rota['custo'] == custo, f"Custo {origem}->{destino}: {rota} != {custo}"
+        
+        # Várias conexões ao mesmo tempo: hierarquia montada uma vez e
+        # compartilhada, e os Dijkstras voltam ao conjunto quando elas fecham
+        servico = servidor.servico
+        erros = []
+        
+        def consultar_em_paralelo(indice):
+            outra = http.client.HTTPConnection(*servidor.server_address[:2], timeout=30)
+            try:
+                for origem in ids[indice::6][:4]:
+                    outra.request('GET', f'/api/rota?origem={origem}&destino=L11C11&algoritmo=hierarquia')
+                    resposta = outra.getresponse()
+                    rota = json.loads(resposta.read())
+                    if rota['custo'] != referencia.calcular_menor_caminho(origem, 'L11C11')[1]:
+                        erros.append(origem)
+            finally:
+                outra.close()
+        
+        threads = [threading.Thread(target=consultar_em_paralelo, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not erros, f"Hierarquia divergiu em paralelo: {erros}"
+        conjunto = list(servico._dijkstras.queue)
+        assert len(conjunto) == ServicoRotas.TAMANHO_CONJUNTO, "Dijkstra perdido do conjunto!"
+        assert all(d.hierarquia is servico.dijkstra.hierarquia for d in conjunto if d.hierarquia), "Hierarquia montada mais de uma vez!"
+        
+        # Resposta repetida vem do cache; revalidação sem mudança devolve 304
+        pedir('/api/rota?origem=L0C0&destino=L11C11')
+        pedir('/api/rota?origem=L0C0&destino=L11C11')
+        assert servidor.servico.acertos_cache >= 1, "Cache de respostas não usado!"
+        status, _, corpo = pedir('/api/grafo', cabecalhos={'If-None-Match': etag})
+        assert status == 304 and corpo is None, f"Revalidação deveria dar 304: {status}"
+        
+        status, _, matriz = pedir('/api/matriz', 'POST', json.dumps({'origens': ['L0C0', 'L5C5'], 'destinos': ['L11C11']}))
+        assert status == 200 and len(matriz['custos']) == 2, f"Matriz errada: {matriz}"
+        _, custo, _ = referencia.calcular_menor_caminho('L5C5', 'L11C11')
+        assert matriz['custos'][1][0] == custo, "Custo da matriz diverge do Dijkstra!"
+        
+        status, _, erro = pedir('/api/rota?origem=L0C0&destino=XYZ')
+        assert status == 404 and 'erro' in erro, "Vértice inexistente deveria dar 404!"
+        status, _, _ = pedir('/api/rota?origem=L0C0&destino=L1C1&algoritmo=nenhum')
+        assert status == 400, "Algoritmo inválido deveria dar 400!"
+        
+        # Novos pesos: versão nova, ETag antiga não vale mais e a rota é recalculada
+        _, _, pesos = pedir('/api/pesos?semente=3', 'POST')
+        assert pesos['versao'] == meta['versao'] + 1, "Versão não avançou!"
+        status, novo_etag, _ = pedir('/api/grafo', cabecalhos={'If-None-Match': etag})
+        assert status == 200 and novo_etag != etag, "ETag antiga aceita depois da troca de pesos!"
+        _, _, rota = pedir('/api/rota?origem=L0C0&destino=L11C11')
+        _, custo, _ = Dijkstra(grafo).calcular_menor_caminho('L0C0', 'L11C11')
+        assert rota['custo'] == custo and rota['versao'] == pesos['versao'], "Rota com pesos antigos!"
+        for estrutura in (servico.dijkstra.hierarquia, servico.dijkstra.marcos):
+            assert estrutura.versao_grafo == grafo.versao, "Estrutura não refeita junto com os pesos!"
+        _, _, rota = pedir('/api/rota?origem=L0C0&destino=L11C11&algoritmo=hierarquia')
+        assert rota['custo'] == custo, "Hierarquia com pesos antigos!"
+        
+        _, _, estatisticas = pedir('/api/estatisticas')
+        print(f"Buscas no servidor: {estatisticas['buscas']['consultas']}, cache: {estatisticas['cache']}")
+    finally:
+        conexao.close()
+        servidor.shutdown()
+        servidor.server_close()
+    
+    # Com persistência os pesos sorteados (numa thread de requisição) são
+    # salvos junto com a hierarquia refeita: a próxima execução carrega os dois
+    for armazenamento in ('json', 'sqlite'):
+        persistencia = SistemaPersistencia(os.path.join('dados_teste', f'servidor_{armazenamento}'),
+                                           armazenamento=armazenamento)
+        servico = ServicoRotas(carregar_grafo(persistencia), 'hierarquia', persistencia=persistencia)
+        sorteio = threading.Thread(target=servico.gerar_pesos, args=(5,))
+        sorteio.start()
+        sorteio.join()
+        recarregado = persistencia.carregar_grafo_compacto()
+        assert recarregado.csr.assinatura() == servico.grafo.csr.assinatura(), f"Pesos novos não salvos ({armazenamento})!"
+        assert persistencia.carregar_hierarquia(recarregado) is not None, f"Hierarquia salva sem os pesos ({armazenamento})!"
+        persistencia.fechar()
+    
+    print("✅ Teste de servidor de rotas passou!")
+
+
 def executar_todos_testes():
     """Executa todos os testes"""
     print("\n" + "=" * 70)
@@ -151,6 +1276,78 @@ def executar_todos_testes():
         # Teste 5: Caminho completo
         teste_caminho_completo(grafo_completo)
         
+        # Teste 6: Grafo compacto
+        teste_grafo_csr(grafo_completo)
+        
+        # Teste 7: A*
+        teste_a_estrela(grafo_completo)
+        
+        # Teste 8: Dijkstra bidirecional
+        teste_bidirecional(grafo_completo)
+        
+        # Teste 9: Hierarquia de contração
+        teste_hierarquia_contracao(grafo_completo)
+        
+        # Teste 10: Marcos (ALT)
+        teste_marcos_alt(grafo_completo)
+        
+        # Teste 11: Fila de baldes
+        teste_fila_baldes(grafo_completo)
+        
+        # Teste 12: Cache de rotas
+        teste_cache_rotas()
+        
+        # Teste 13: Árvore de menores caminhos
+        teste_arvore_caminhos(grafo_completo)
+        
+        # Teste 14: Matriz de distâncias
+        teste_matriz_distancias(grafo_completo)
+        
+        # Teste 15: Todos os pares
+        teste_todos_pares(grafo_completo)
+        
+        # Teste 16: Rotas em lote
+        teste_rotas_lote(grafo_completo)
+        
+        # Teste 17: Caminhos dinâmicos
+        teste_caminhos_dinamicos()
+        
+        # Teste 18: Gerador de pesos vetorizado
+        teste_gerador_vetorizado()
+        
+        # Teste 19: Cenário reproduzível por rua
+        teste_cenario_reproduzivel()
+        
+        # Teste 20: Simulação de robustez de rotas
+        teste_simulacao_rotas(grafo_completo)
+        
+        # Teste 21: Leitura incremental de JSON
+        teste_leitor_json()
+        
+        # Teste 22: Instantâneo binário
+        teste_grafo_binario(grafo_completo)
+        
+        # Teste 23: Registro de pesos
+        teste_registro_pesos()
+        
+        # Teste 24: Armazenamento SQLite
+        teste_armazenamento_sqlite()
+        
+        # Teste 25: Salvamento atômico e comprimido
+        teste_salvamento_atomico()
+        
+        # Teste 26: Gerador de cidade sintética
+        teste_gerador_cidade()
+        
+        # Teste 27: Benchmark
+        teste_benchmark()
+        
+        # Teste 28: Monitor de buscas
+        teste_monitor_busca()
+        
+        # Teste 29: Servidor de rotas
+        teste_servidor_rotas()
+        
         print("\n" + "=" * 70)
         print("          ✅ TODOS OS TESTES PASSARAM!")
         print("=" * 70)
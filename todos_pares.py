@@ -0,0 +1,168 @@
+"""
+Módulo todos_pares.py
+Menores caminhos entre todos os pares de vértices (Floyd-Warshall vetorizado)
+
+Para mapas de até alguns milhares de vértices, calcular a matriz completa de
+uma vez com NumPy sai bem mais barato que repetir o Dijkstra em Python para
+cada origem. Além das distâncias é guardada a matriz de próximo salto, de
+onde qualquer rota (caminho e detalhes) é remontada em tempo proporcional ao
+seu comprimento.
+"""
+
+import numpy as np
+
+from dijkstra import Dijkstra
+from grafo_csr import GrafoCSR, tipo_array
+
+
+class CaminhosTodosPares:
+    """Matrizes de distância e de próximo salto entre todos os pares"""
+
+    # Memória máxima (bytes) para as matrizes e os temporários do cálculo
+    LIMITE_MEMORIA = 1 << 30
+
+    def __init__(self, grafo, limite_memoria=None):
+        """
+        Inicializa o cálculo (as matrizes só são montadas no primeiro uso)
+
+        Args:
+            grafo: objeto Grafo, GrafoCompacto ou GrafoCSR
+            limite_memoria: bytes disponíveis (None = LIMITE_MEMORIA)
+        """
+        self.dijkstra = Dijkstra(grafo)
+        self.grafo = self.dijkstra.grafo
+        self.limite_memoria = self.LIMITE_MEMORIA if limite_memoria is None else limite_memoria
+        self.csr = None
+        self.distancias = None
+        self.proximos = None
+        self.versao = None
+
+    @staticmethod
+    def memoria_necessaria(num_vertices):
+        """
+        Bytes ocupados pelas duas matrizes (float64 e int32) de um grafo
+
+        Args:
+            num_vertices: número de vértices
+
+        Returns:
+            tamanho em bytes
+        """
+        return num_vertices * num_vertices * (8 + 4)
+
+    def calcular(self):
+        """
+        Monta a matriz de pesos e executa o Floyd-Warshall
+
+        As linhas de cada iteração são processadas em faixas, de modo que os
+        temporários cabem no que sobra do limite de memória.
+
+        Returns:
+            tupla (distancias, proximos): distancias[i, j] é o custo de i até j
+            (infinito se não houver caminho) e proximos[i, j] o índice do
+            vértice seguinte a i nesse caminho (-1 se não houver)
+
+        Raises:
+            MemoryError: se as matrizes não couberem no limite de memória
+        """
+        csr = self.dijkstra.csr if self.dijkstra.csr is not None else GrafoCSR.from_grafo(self.grafo)
+        n = csr.num_vertices
+        necessaria = self.memoria_necessaria(n)
+        if necessaria > self.limite_memoria:
+            raise MemoryError(
+                f"Matrizes de {n} vértices ocupariam {necessaria / 2**20:.0f} MiB "
+                f"(limite de {self.limite_memoria / 2**20:.0f} MiB); "
+                "use MatrizDistancias para subconjuntos de origens"
+            )
+
+        # Cada faixa usa uma matriz float64 e uma máscara booleana por linha
+        faixa = max(1, min(n, (self.limite_memoria - necessaria) // max(1, n * 9)))
+
+        distancias = np.full((n, n), np.inf)
+        origens = np.repeat(np.arange(n), np.diff(np.frombuffer(csr.deslocamentos, dtype=np.int64)))
+        vizinhos = np.frombuffer(csr.vizinhos, dtype=np.int32)
+        # Em arestas paralelas fica a mais barata, como na busca
+        np.minimum.at(distancias, (origens, vizinhos), np.asarray(csr.pesos, dtype=np.float64))
+        proximos = np.where(np.isfinite(distancias), np.arange(n, dtype=np.int32), -1).astype(np.int32)
+        np.fill_diagonal(distancias, np.minimum(distancias.diagonal(), 0))
+        np.fill_diagonal(proximos, np.arange(n, dtype=np.int32))
+
+        for k in range(n):
+            # Com pesos não negativos a linha e a coluna k não mudam nesta iteração
+            linha_k = distancias[k].copy()
+            coluna_k = distancias[:, k].copy()
+            proximo_k = proximos[:, k].copy()
+            # Só as linhas que alcançam k podem melhorar
+            alcancam = np.flatnonzero(np.isfinite(coluna_k))
+            for inicio in range(0, len(alcancam), faixa):
+                linhas = alcancam[inicio:inicio + faixa]
+                via_k = coluna_k[linhas, None] + linha_k[None, :]
+                atuais = distancias[linhas]
+                melhora = via_k < atuais
+                if not melhora.any():
+                    continue
+                distancias[linhas] = np.where(melhora, via_k, atuais)
+                proximos[linhas] = np.where(melhora, proximo_k[linhas, None], proximos[linhas])
+
+        if (distancias.diagonal() < 0).any():
+            raise ValueError("O grafo tem ciclo de custo negativo")
+
+        self.csr = csr
+        self.distancias = distancias
+        self.proximos = proximos
+        self.versao = self.grafo.versao
+        return distancias, proximos
+
+    def _garantir_atualizado(self):
+        """Recalcula as matrizes se os pesos mudaram desde o último cálculo"""
+        if self.distancias is None or self.versao != self.grafo.versao:
+            self.calcular()
+
+    def custo(self, origem_id, destino_id):
+        """
+        Retorna o custo do menor caminho entre dois vértices
+
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+
+        Returns:
+            custo total ou None se não houver caminho
+        """
+        self._garantir_atualizado()
+        distancia = self.distancias[self.csr.indices[origem_id], self.csr.indices[destino_id]]
+        if distancia == np.inf:
+            return None
+        # Pesos inteiros dão custos inteiros, como no Dijkstra
+        if tipo_array(self.csr.pesos) == 'q':
+            return int(distancia)
+        return distancia.item()
+
+    def caminho(self, origem_id, destino_id):
+        """
+        Remonta a rota entre dois vértices pela matriz de próximo salto
+
+        Args:
+            origem_id: id do vértice de origem
+            destino_id: id do vértice de destino
+
+        Returns:
+            tupla (caminho, custo_total, detalhes), como
+            Dijkstra.calcular_menor_caminho
+        """
+        if origem_id not in self.grafo.vertices or destino_id not in self.grafo.vertices:
+            return None, None, None
+
+        custo_total = self.custo(origem_id, destino_id)
+        if custo_total is None:
+            return None, None, None
+
+        ids = self.csr.ids
+        atual = self.csr.indices[origem_id]
+        destino = self.csr.indices[destino_id]
+        caminho = [origem_id]
+        while atual != destino:
+            atual = int(self.proximos[atual, destino])
+            caminho.append(ids[atual])
+
+        return caminho, custo_total, self.dijkstra._obter_detalhes_caminho(caminho)